@@ -0,0 +1,107 @@
+# app/codec.py
+"""
+JSON codec used for everything we persist or return.
+
+Picks the fastest available backend (orjson, then msgspec, then stdlib json;
+JSON_CODEC forces one). Output is always compact UTF-8 bytes unless pretty=True.
+Key order is preserved, so content digests stay stable for a given backend.
+"""
+from __future__ import annotations
+
+import json
+import os
+import threading
+from pathlib import Path
+from typing import Any, Callable, Optional
+
+from fastapi.responses import JSONResponse
+
+from .config import settings
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    import msgspec
+except ImportError:
+    msgspec = None
+
+_MISSING = object()
+
+
+def _pick(requested: str) -> str:
+    available = [n for n, mod in (("orjson", orjson), ("msgspec", msgspec)) if mod is not None] + ["json"]
+    if requested in available:
+        return requested
+    return available[0]
+
+
+BACKEND = _pick((settings.JSON_CODEC or "auto").lower())
+
+if BACKEND == "orjson":
+    def _dumps(obj: Any, sort_keys: bool, pretty: bool, default: Optional[Callable]) -> bytes:
+        opts = orjson.OPT_NON_STR_KEYS | (orjson.OPT_SORT_KEYS if sort_keys else 0) | (orjson.OPT_INDENT_2 if pretty else 0)
+        return orjson.dumps(obj, default=default, option=opts)
+    _loads = orjson.loads
+elif BACKEND == "msgspec":
+    _encoders: dict = {}
+    _decoder = msgspec.json.Decoder()
+    def _dumps(obj: Any, sort_keys: bool, pretty: bool, default: Optional[Callable]) -> bytes:
+        enc = _encoders.get((sort_keys, default))
+        if enc is None:
+            enc = _encoders[(sort_keys, default)] = msgspec.json.Encoder(enc_hook=default, order="sorted" if sort_keys else None)
+        raw = enc.encode(obj)
+        return msgspec.json.format(raw, indent=2) if pretty else raw
+    def _loads(raw: Any) -> Any:
+        try: return _decoder.decode(raw)
+        except msgspec.DecodeError as e: raise ValueError(str(e)) from e
+else:
+    def _dumps(obj: Any, sort_keys: bool, pretty: bool, default: Optional[Callable]) -> bytes:
+        return json.dumps(obj, ensure_ascii=False, sort_keys=sort_keys, default=default,
+                          indent=2 if pretty else None, separators=None if pretty else (",", ":")).encode("utf-8")
+    _loads = json.loads
+
+
+def dumps(obj: Any, *, sort_keys: bool = False, pretty: bool = False, default: Optional[Callable] = None) -> bytes:
+    """Serialize to UTF-8 JSON bytes (compact unless pretty)."""
+    try:
+        return _dumps(obj, sort_keys, pretty, default)
+    except (TypeError, OverflowError):
+        if BACKEND == "json":
+            raise
+        # e.g. integers beyond 64 bits: let the stdlib have a go before giving up
+        return json.dumps(obj, ensure_ascii=False, sort_keys=sort_keys, default=default,
+                          indent=2 if pretty else None, separators=None if pretty else (",", ":")).encode("utf-8")
+
+
+def loads(raw: Any) -> Any:
+    """Parse JSON from bytes or str. Raises ValueError on malformed input."""
+    return _loads(raw)
+
+
+def read_json(path: Path, default: Any = _MISSING) -> Any:
+    """Load a JSON file; returns `default` (if given) when it's missing or unreadable."""
+    try:
+        return _loads(Path(path).read_bytes())
+    except (OSError, ValueError):
+        if default is _MISSING:
+            raise
+        return default
+
+
+def write_json(path: Path, obj: Any) -> int:
+    """Write compact JSON atomically (temp file + rename); returns the number of bytes written."""
+    path = Path(path)
+    raw = dumps(obj)
+    tmp = path.with_name(f".{path.name}.{os.getpid()}.{threading.get_ident()}.tmp")
+    tmp.write_bytes(raw)
+    os.replace(tmp, path)
+    return len(raw)
+
+
+class CodecJSONResponse(JSONResponse):
+    """FastAPI default response class backed by the same codec."""
+    def render(self, content: Any) -> bytes:
+        return dumps(content)
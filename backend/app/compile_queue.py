@@ -0,0 +1,129 @@
+# app/compile_queue.py
+"""
+Bounded-concurrency gate for async PDF compiles.
+
+At most COMPILE_CONCURRENCY compiles run at once and at most COMPILE_QUEUE_MAX
+callers wait for a slot. Anyone beyond that gets an immediate 503 with
+Retry-After instead of tying up a thread for the length of a compile.
+
+Background (speculative) compiles take a slot only when one is free and nobody
+is waiting, and at most COMPILE_BACKGROUND_MAX of them run at once, so they
+never delay an interactive compile by more than the one they already hold.
+"""
+from __future__ import annotations
+
+import asyncio
+import time
+from contextlib import asynccontextmanager
+from typing import Any, AsyncIterator, Dict, Optional
+
+from fastapi import HTTPException
+
+from .config import settings
+
+# Upper bounds (seconds) of the wait-time histogram buckets
+WAIT_BUCKETS = (0.01, 0.1, 0.5, 1, 2, 5, 10, 30, 60)
+
+
+class CompileQueue:
+    def __init__(self, concurrency: int, max_waiting: int, retry_after: int, max_background: int = 1):
+        self.concurrency = max(1, int(concurrency))
+        self.max_waiting = max(0, int(max_waiting))
+        self.retry_after = max(1, int(retry_after))
+        self.max_background = max(1, int(max_background))
+        self.waiting = 0
+        self.running = 0
+        self.background = 0
+        self._sem: Optional[asyncio.Semaphore] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._counters: Dict[str, Any] = {
+            "admitted": 0, "rejected": 0, "background_admitted": 0, "background_rejected": 0,
+            "wait_seconds_total": 0.0, "wait_seconds_max": 0.0,
+        }
+        self._buckets = [0] * (len(WAIT_BUCKETS) + 1)
+
+    def _semaphore(self) -> asyncio.Semaphore:
+        loop = asyncio.get_running_loop()
+        if self._sem is None or self._loop is not loop:
+            # asyncio primitives are bound to one loop; rebuild if the app's loop changed
+            self._sem, self._loop = asyncio.Semaphore(self.concurrency), loop
+        return self._sem
+
+    def _reject(self, counter: str = "rejected") -> HTTPException:
+        self._counters[counter] += 1
+        return HTTPException(
+            status_code=503,
+            detail={"error": "render_queue_full", "retryAfter": self.retry_after},
+            headers={"Retry-After": str(self.retry_after)},
+        )
+
+    @asynccontextmanager
+    async def slot(self, background: bool = False) -> AsyncIterator[None]:
+        """
+        Hold one compile slot for the duration of the block (raises 503 when the queue is full).
+        A background slot is granted only if it needn't wait at all; otherwise 503 right away.
+        """
+        sem = self._semaphore()
+        if background:
+            if self.waiting or sem.locked() or self.background >= self.max_background:
+                raise self._reject("background_rejected")
+            await sem.acquire()  # free and nobody queued: returns without suspending
+            self._counters["background_admitted"] += 1
+            self.background += 1
+            self.running += 1
+            try:
+                yield
+            finally:
+                self.running -= 1
+                self.background -= 1
+                sem.release()
+            return
+        if sem.locked() and self.waiting >= self.max_waiting:
+            raise self._reject()
+        self.waiting += 1
+        t0 = time.perf_counter()
+        try:
+            await sem.acquire()
+        finally:
+            self.waiting -= 1
+        self._record_wait(time.perf_counter() - t0)
+        self.running += 1
+        try:
+            yield
+        finally:
+            self.running -= 1
+            sem.release()
+
+    def _record_wait(self, waited: float) -> None:
+        c = self._counters
+        c["admitted"] += 1
+        c["wait_seconds_total"] += waited
+        c["wait_seconds_max"] = max(c["wait_seconds_max"], waited)
+        i = next((i for i, b in enumerate(WAIT_BUCKETS) if waited <= b), len(WAIT_BUCKETS))
+        self._buckets[i] += 1
+
+    def stats(self) -> Dict[str, Any]:
+        out = dict(self._counters)
+        admitted = out["admitted"]
+        out.update({
+            "depth": self.waiting,
+            "running": self.running,
+            "background": self.background,
+            "concurrency": self.concurrency,
+            "max_background": self.max_background,
+            "max_waiting": self.max_waiting,
+            "wait_seconds_avg": (out["wait_seconds_total"] / admitted) if admitted else 0.0,
+            "wait_seconds_histogram": {
+                **{f"le_{b:g}": n for b, n in zip(WAIT_BUCKETS, self._buckets)},
+                "le_inf": self._buckets[-1],
+            },
+        })
+        return out
+
+
+compile_queue = CompileQueue(
+    settings.COMPILE_CONCURRENCY,
+    settings.COMPILE_QUEUE_MAX,
+    settings.COMPILE_RETRY_AFTER,
+    settings.COMPILE_BACKGROUND_MAX,
+)
@@ -52,6 +52,108 @@ class Settings(BaseSettings):
         validation_alias=AliasChoices("CORS_ALLOW_HEADERS", "cors_allow_headers", "ALLOW_HEADERS", "allow_headers"),
     )
 
+    # --- Render cache (compiled PDFs keyed by tex hash) ---
+    RENDER_CACHE_MEMORY_BYTES: int = Field(
+        default=64 * 1024 * 1024,
+        validation_alias=AliasChoices("RENDER_CACHE_MEMORY_BYTES", "render_cache_memory_bytes"),
+    )
+    RENDER_CACHE_DIR: str = Field(
+        default="data/render_cache",
+        validation_alias=AliasChoices("RENDER_CACHE_DIR", "render_cache_dir"),
+    )
+    RENDER_CACHE_DISK_BYTES: int = Field(
+        default=512 * 1024 * 1024,
+        validation_alias=AliasChoices("RENDER_CACHE_DISK_BYTES", "render_cache_disk_bytes"),
+    )
+
+    # --- LaTeX compile workers ---
+    LATEX_POOL_SIZE: int = Field(default=2, validation_alias=AliasChoices("LATEX_POOL_SIZE", "latex_pool_size"))
+    LATEX_WORKER_MAX_JOBS: int = Field(
+        default=50,
+        validation_alias=AliasChoices("LATEX_WORKER_MAX_JOBS", "latex_worker_max_jobs"),
+    )
+    LATEX_TIMEOUT: float = Field(default=180, validation_alias=AliasChoices("LATEX_TIMEOUT", "latex_timeout"))
+    LATEX_PRELOAD_FORMAT: bool = Field(
+        default=True,
+        validation_alias=AliasChoices("LATEX_PRELOAD_FORMAT", "latex_preload_format"),
+    )
+
+    # --- Async compile queue (backpressure for /render/pdf and /resume/patch) ---
+    COMPILE_CONCURRENCY: int = Field(
+        default=2,
+        validation_alias=AliasChoices("COMPILE_CONCURRENCY", "compile_concurrency"),
+    )
+    COMPILE_QUEUE_MAX: int = Field(default=16, validation_alias=AliasChoices("COMPILE_QUEUE_MAX", "compile_queue_max"))
+    COMPILE_RETRY_AFTER: int = Field(
+        default=5,
+        validation_alias=AliasChoices("COMPILE_RETRY_AFTER", "compile_retry_after"),
+    )
+    # Slots speculative (pre-render) compiles may hold at once; they never queue
+    COMPILE_BACKGROUND_MAX: int = Field(
+        default=1,
+        validation_alias=AliasChoices("COMPILE_BACKGROUND_MAX", "compile_background_max"),
+    )
+
+    # --- Background render jobs (POST /render/jobs) ---
+    RENDER_JOBS_DIR: str = Field(default="data/render_jobs", validation_alias=AliasChoices("RENDER_JOBS_DIR", "render_jobs_dir"))
+    RENDER_JOB_TTL: int = Field(default=3600, validation_alias=AliasChoices("RENDER_JOB_TTL", "render_job_ttl"))
+
+    # --- Speculative pre-render after workspace saves/patches (opt-in) ---
+    PRERENDER_ENABLED: bool = Field(default=False, validation_alias=AliasChoices("PRERENDER_ENABLED", "prerender_enabled"))
+    PRERENDER_WORKERS: int = Field(default=1, validation_alias=AliasChoices("PRERENDER_WORKERS", "prerender_workers"))
+    PRERENDER_MAX_PENDING: int = Field(
+        default=64,
+        validation_alias=AliasChoices("PRERENDER_MAX_PENDING", "prerender_max_pending"),
+    )
+
+    # Workspace op log: rewrite current.json every N revisions; keep the last K log entries for /workspace/changes
+    WORKSPACE_COMPACT_EVERY: int = Field(
+        default=50,
+        validation_alias=AliasChoices("WORKSPACE_COMPACT_EVERY", "workspace_compact_every"),
+    )
+    WORKSPACE_OPLOG_KEEP: int = Field(
+        default=200,
+        validation_alias=AliasChoices("WORKSPACE_OPLOG_KEEP", "workspace_oplog_keep"),
+    )
+
+    # Workspace undo history bounds (edits / serialized ops+inverse bytes per user; also bounded by WORKSPACE_OPLOG_KEEP)
+    WORKSPACE_UNDO_DEPTH: int = Field(default=100, validation_alias=AliasChoices("WORKSPACE_UNDO_DEPTH", "workspace_undo_depth"))
+    WORKSPACE_UNDO_BYTES: int = Field(
+        default=256 * 1024,
+        validation_alias=AliasChoices("WORKSPACE_UNDO_BYTES", "workspace_undo_bytes"),
+    )
+
+    # Live editing websocket: ops arriving within this window are applied as one save
+    LIVE_COALESCE_MS: int = Field(default=50, validation_alias=AliasChoices("LIVE_COALESCE_MS", "live_coalesce_ms"))
+    LIVE_MAX_BATCH_OPS: int = Field(
+        default=500,
+        validation_alias=AliasChoices("LIVE_MAX_BATCH_OPS", "live_max_batch_ops"),
+    )
+
+    # Version/workspace storage: "file" (data/versions/<uid>/ tree), "sqlite" (single WAL-mode database)
+    # or "postgres" (DATABASE_URL, tables from db/init/30_versions.sql)
+    STORAGE_BACKEND: str = Field(default="file", validation_alias=AliasChoices("STORAGE_BACKEND", "storage_backend"))
+    SQLITE_PATH: str = Field(default="data/storage.db", validation_alias=AliasChoices("SQLITE_PATH", "sqlite_path"))
+    PG_POOL_MIN_SIZE: int = Field(default=1, validation_alias=AliasChoices("PG_POOL_MIN_SIZE", "pg_pool_min_size"))
+    PG_POOL_MAX_SIZE: int = Field(default=10, validation_alias=AliasChoices("PG_POOL_MAX_SIZE", "pg_pool_max_size"))
+
+    # Version documents are deduplicated by content hash and stored as compressed keyframes + JSON patch
+    # deltas, with a new keyframe every N distinct versions (0 or 1 = no deltas, every blob compressed in full);
+    # compression: auto | zstd | zlib (zstd needs the zstandard package)
+    VERSION_KEYFRAME_EVERY: int = Field(
+        default=10,
+        validation_alias=AliasChoices("VERSION_KEYFRAME_EVERY", "version_keyframe_every"),
+    )
+    VERSION_COMPRESSION: str = Field(default="auto", validation_alias=AliasChoices("VERSION_COMPRESSION", "version_compression"))
+    # POST /versions/batch-load streams NDJSON above this many ids (and always for "all")
+    VERSION_BATCH_STREAM_OVER: int = Field(
+        default=50,
+        validation_alias=AliasChoices("VERSION_BATCH_STREAM_OVER", "version_batch_stream_over"),
+    )
+
+    # JSON codec for stored documents and responses: auto | orjson | msgspec | json
+    JSON_CODEC: str = Field(default="auto", validation_alias=AliasChoices("JSON_CODEC", "json_codec"))
+
     # pydantic-settings config
     model_config = SettingsConfigDict(
         env_file=".env",
@@ -0,0 +1,293 @@
+# app/latex_pool.py
+"""
+Pool of warm LaTeX compile workers.
+
+A TeX engine cannot compile more than one document per process, so a "warm"
+worker is a long-lived scratch directory holding a precompiled format of the
+template's static preamble (everything above PREAMBLE_MARKER). pdflatex/latexmk
+runs load that format with -fmt instead of re-reading geometry, hyperref,
+enumitem, titlesec, helvet, ... on every compile. tectonic manages its own
+format cache, so it simply gets the persistent directory.
+
+Workers are recycled (directory wiped, format re-dumped) after
+LATEX_WORKER_MAX_JOBS compiles or as soon as a compile fails or times out. A
+failed format-based compile is retried from scratch only when its log blames
+the format itself (a document error would just fail twice).
+"""
+from __future__ import annotations
+
+import asyncio
+import hashlib
+import os
+import re
+import shutil
+import signal
+import subprocess
+import tempfile
+import threading
+from pathlib import Path
+from typing import List, Optional
+
+from .config import settings
+
+PREAMBLE_MARKER = "% ---- static preamble ends here ----"
+FORMAT_NAME = "preamble"
+# Files a previous job may have left behind in the worker directory
+_JOB_OUTPUTS = ("resume.pdf", "resume.log", "resume.aux", "resume.out", "resume.fls",
+                "resume.fdb_latexmk", "resume.xdv", "resume.synctex.gz")
+# Log lines of a format pdflatex can't load (missing, corrupt, or dumped by another build)
+_FORMAT_TROUBLE = re.compile(rf"format file|{FORMAT_NAME}\.fmt", re.IGNORECASE)
+
+
+class LatexError(RuntimeError):
+    def __init__(self, message: str, log: str = ""):
+        super().__init__(message)
+        self.log = log
+
+
+class LatexTimeout(LatexError):
+    pass
+
+
+def split_preamble(tex: str) -> tuple[str, str] | None:
+    """Split tex into (static preamble, rest) at PREAMBLE_MARKER, or None if absent."""
+    i = tex.find(PREAMBLE_MARKER)
+    if i < 0: return None
+    return tex[:i], tex[i:]
+
+
+def kill_process_group(proc: subprocess.Popen) -> None:
+    """Kill the engine and anything it spawned (latexmk runs pdflatex as a child)."""
+    try:
+        if hasattr(os, "killpg"):
+            os.killpg(proc.pid, signal.SIGKILL)
+        else:
+            proc.kill()
+    except (ProcessLookupError, PermissionError, OSError):
+        pass
+
+
+def _run(cmd: List[str], cwd: Path, timeout: float) -> tuple[int, str]:
+    proc = subprocess.Popen(cmd, cwd=cwd, stdout=subprocess.PIPE, stderr=subprocess.PIPE,
+                            text=True, errors="ignore", start_new_session=True)
+    try:
+        out, err = proc.communicate(timeout=timeout)
+    except subprocess.TimeoutExpired:
+        kill_process_group(proc)
+        out, err = proc.communicate()
+        raise LatexTimeout(f"latex timed out after {timeout:g}s", (out or "") + "\n" + (err or ""))
+    return proc.returncode, (out or "") + "\n" + (err or "")
+
+
+async def _arun(cmd: List[str], cwd: Path, timeout: float) -> tuple[int, str]:
+    """asyncio twin of _run: the engine's process group is killed on timeout or task cancellation."""
+    proc = await asyncio.create_subprocess_exec(*cmd, cwd=cwd, stdout=subprocess.PIPE,
+                                                stderr=subprocess.PIPE, start_new_session=True)
+    try:
+        out, err = await asyncio.wait_for(proc.communicate(), timeout)
+    except asyncio.TimeoutError:
+        kill_process_group(proc)  # type: ignore[arg-type]
+        await proc.wait()
+        raise LatexTimeout(f"latex timed out after {timeout:g}s")
+    except BaseException:
+        kill_process_group(proc)  # type: ignore[arg-type]
+        raise
+    logs = out.decode("utf-8", "ignore") + "\n" + err.decode("utf-8", "ignore")
+    return proc.returncode or 0, logs
+
+
+class LatexWorker:
+    def __init__(self, name: str, preload_format: bool = True, pooled: bool = True):
+        self.dir = Path(tempfile.mkdtemp(prefix=f"latex-{name}-"))
+        self.jobs = 0
+        self.preload_format = preload_format
+        self.pooled = pooled  # False for overflow workers, closed after one job
+        self.used_format = False
+        self._fmt_digest: Optional[str] = None  # digest of the preamble dumped in self.dir
+
+    # ---------- per-job ----------
+    def command(self, tex: str, engine: str) -> List[str]:
+        """Write the job's input into the worker dir and return the engine command."""
+        for f in _JOB_OUTPUTS:
+            try: (self.dir / f).unlink()
+            except FileNotFoundError: pass
+        fmt = self._format_for(tex, engine)
+        self.used_format = fmt is not None
+        if fmt:
+            body = split_preamble(tex)[1]  # type: ignore[index]
+            (self.dir / "resume.tex").write_text(body, encoding="utf-8")
+        else:
+            (self.dir / "resume.tex").write_text(tex, encoding="utf-8")
+        return self._engine_cmd(engine, fmt)
+
+    def result(self, returncode: int, logs: str) -> bytes:
+        """Collect the PDF after the engine exited; raises LatexError with the log on failure."""
+        self.jobs += 1
+        pdf = self.dir / "resume.pdf"
+        if returncode != 0 or not pdf.exists():
+            log = self.dir / "resume.log"
+            if log.exists():
+                try: logs += "\n\n" + log.read_text(errors="ignore")
+                except OSError: pass
+            msg = f"latex failed ({returncode})" if returncode != 0 else "PDF not generated."
+            raise LatexError(msg, logs)
+        return pdf.read_bytes()
+
+    def compile(self, tex: str, engine: str, timeout: float) -> bytes:
+        cmd = self.command(tex, engine)
+        code, logs = _run(cmd, self.dir, timeout)
+        return self.result(code, logs)
+
+    async def acompile(self, tex: str, engine: str, timeout: float) -> bytes:
+        # Writing the input (and the one-off format dump) is blocking work; keep it off the loop.
+        cmd = await asyncio.to_thread(self.command, tex, engine)
+        code, logs = await _arun(cmd, self.dir, timeout)
+        return self.result(code, logs)
+
+    def close(self) -> None:
+        shutil.rmtree(self.dir, ignore_errors=True)
+
+    # ---------- preamble format ----------
+    @staticmethod
+    def _engine_cmd(engine: str, fmt: Optional[str]) -> List[str]:
+        if engine == "tectonic":
+            return ["tectonic", "--keep-intermediates", "--keep-logs", "resume.tex"]
+        if engine == "latexmk":
+            cmd = ["latexmk", "-pdf", "-interaction=nonstopmode"]
+            if fmt: cmd.append(f"-pdflatex=pdflatex -fmt={fmt} %O %S")
+            return cmd + ["resume.tex"]
+        if engine == "pdflatex":
+            cmd = ["pdflatex", "-interaction=nonstopmode"]
+            if fmt: cmd.append(f"-fmt={fmt}")
+            return cmd + ["resume.tex"]
+        raise LatexError("No LaTeX engine (tectonic/latexmk/pdflatex) found.")
+
+    def _format_for(self, tex: str, engine: str) -> Optional[str]:
+        """Name of a dumped format matching tex's static preamble, dumping it on first use."""
+        if not self.preload_format or engine not in ("pdflatex", "latexmk") or not shutil.which("pdflatex"):
+            return None
+        parts = split_preamble(tex)
+        if parts is None: return None
+        digest = hashlib.sha256(parts[0].encode("utf-8")).hexdigest()
+        if digest == self._fmt_digest:
+            return FORMAT_NAME
+        (self.dir / f"{FORMAT_NAME}.tex").write_text(parts[0] + "\n\\dump\n", encoding="utf-8")
+        try:
+            code, _ = _run(["pdflatex", "-ini", "-interaction=nonstopmode", f"-jobname={FORMAT_NAME}",
+                           "&pdflatex", f"{FORMAT_NAME}.tex"], self.dir, settings.LATEX_TIMEOUT)
+        except LatexError:
+            code = -1
+        if code != 0 or not (self.dir / f"{FORMAT_NAME}.fmt").exists():
+            # Fall back to full compiles for this worker; don't retry the dump every job.
+            self.preload_format = False
+            return None
+        self._fmt_digest = digest
+        return FORMAT_NAME
+
+
+class LatexPool:
+    """
+    Hands out warm workers. At most `size` pooled workers exist (and dump the
+    preamble format); if all are busy an overflow worker is created rather than
+    blocking, so concurrency is bounded by the caller, not here. Overflow workers
+    compile without a format and are closed after their job.
+    """
+    def __init__(self, size: int, max_jobs: int, timeout: float, preload_format: bool = True):
+        self.size = max(1, int(size))
+        self.max_jobs = max(1, int(max_jobs))
+        self.timeout = timeout
+        self.preload_format = preload_format
+        self._idle: List[LatexWorker] = []
+        self._pooled = 0  # pooled workers alive, idle or busy
+        self._lock = threading.Lock()
+        self._seq = 0
+        self.recycled = 0
+
+    def acquire(self) -> LatexWorker:
+        with self._lock:
+            if self._idle:
+                worker = self._idle.pop()
+                worker.preload_format = worker.preload_format and self.preload_format
+                return worker
+            self._seq += 1
+            name = f"w{self._seq}"
+            pooled = self._pooled < self.size
+            if pooled:
+                self._pooled += 1
+        return LatexWorker(name if pooled else f"x{name[1:]}", self.preload_format and pooled, pooled)
+
+    def release(self, worker: LatexWorker, crashed: bool = False) -> None:
+        with self._lock:
+            keep = worker.pooled and not crashed and worker.jobs < self.max_jobs
+            if keep:
+                self._idle.append(worker)
+            elif worker.pooled:
+                self._pooled -= 1
+                self.recycled += 1
+        if not keep:
+            worker.close()
+
+    def compile(self, tex: str, engine: str) -> bytes:
+        worker = self.acquire()
+        try:
+            pdf = worker.compile(tex, engine, self.timeout)
+        except LatexError as e:
+            self.release(worker, crashed=True)
+            if not _format_failed(worker, e):
+                raise
+            return self._compile_without_format(tex, engine)
+        except BaseException:
+            self.release(worker, crashed=True)
+            raise
+        self.release(worker)
+        return pdf
+
+    async def acompile(self, tex: str, engine: str) -> bytes:
+        worker = self.acquire()
+        try:
+            pdf = await worker.acompile(tex, engine, self.timeout)
+        except LatexError as e:
+            self.release(worker, crashed=True)
+            if not _format_failed(worker, e):
+                raise
+            return await asyncio.to_thread(self._compile_without_format, tex, engine)
+        except BaseException:
+            # Cancelled mid-compile: the worker dir may hold partial output, recycle it.
+            self.release(worker, crashed=True)
+            raise
+        self.release(worker)
+        return pdf
+
+    def _compile_without_format(self, tex: str, engine: str) -> bytes:
+        """Retry a failed format-based compile from scratch; if that works, the format is to blame."""
+        worker = LatexWorker("retry", preload_format=False)
+        try:
+            pdf = worker.compile(tex, engine, self.timeout)
+        finally:
+            worker.close()
+        self.preload_format = False
+        return pdf
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {"size": self.size, "idle": len(self._idle), "busy": self._pooled - len(self._idle), "recycled": self.recycled}
+
+    def close(self) -> None:
+        with self._lock:
+            idle, self._idle = self._idle, []
+            self._pooled -= len(idle)
+        for w in idle:
+            w.close()
+
+
+def _format_failed(worker: LatexWorker, error: LatexError) -> bool:
+    """Whether a failed compile is worth retrying without the preamble format."""
+    return worker.used_format and not isinstance(error, LatexTimeout) and bool(_FORMAT_TROUBLE.search(error.log))
+
+
+latex_pool = LatexPool(
+    settings.LATEX_POOL_SIZE,
+    settings.LATEX_WORKER_MAX_JOBS,
+    settings.LATEX_TIMEOUT,
+    settings.LATEX_PRELOAD_FORMAT,
+)
@@ -1,7 +1,7 @@
 # backend/app/models/schemas.py
 from __future__ import annotations
 from typing import Any, Dict, List, Literal, Optional, Type, cast
-from pydantic import BaseModel, Field, ConfigDict, model_validator
+from pydantic import BaseModel, Field, ConfigDict, TypeAdapter, model_validator
 
 # ---------- Primitives ----------
 class ProfileLink(BaseModel):
@@ -132,6 +132,10 @@ ITEMS_MAP: Dict[str, Type[BaseModel]] = {
     "skills": ItemBase,
 }
 
+# One list validator per section type, built once: a whole items list is coerced
+# in a single pydantic-core call instead of one model round-trip per item.
+ITEM_LIST_ADAPTERS: Dict[str, TypeAdapter] = {t: TypeAdapter(List[m]) for t, m in ITEMS_MAP.items()}
+
 class Section(BaseModel):
     id: Optional[str] = None
     type: SectionType
@@ -143,6 +147,7 @@ class Section(BaseModel):
     @classmethod
     def _defaults_and_item_coercion(cls, data: Any) -> Any:
         if not isinstance(data, dict): return data
+        data = dict(data)  # don't write into the caller's dict (patched docs share subtrees)
         t: str = cast(str, data.get("type") or "")
         if not (data.get("title") or "").strip():
             # A simple title default based on the type
@@ -150,8 +155,12 @@ class Section(BaseModel):
         model = ITEMS_MAP.get(t)
         raw_items = data.get("items") or []
         if model and isinstance(raw_items, list):
-            coerced = [model(**it).model_dump() if isinstance(it, dict) else it for it in raw_items]
-            data["items"] = coerced
+            if all(isinstance(it, dict) for it in raw_items):
+                adapter = ITEM_LIST_ADAPTERS[t]
+                data["items"] = adapter.dump_python(adapter.validate_python(raw_items))
+            else:
+                # Non-dict entries pass through untouched (and fail the items type check)
+                data["items"] = [model(**it).model_dump() if isinstance(it, dict) else it for it in raw_items]
         return data
 
 # ---------- Resume root ----------
@@ -197,10 +206,17 @@ class PatchRequest(BaseModel):
     base: ResumeForm
     ops: List[JsonPatchOp] = Field(default_factory=list)
     render: Optional[Literal["none", "tex", "pdf", "both"]] = "none"
+    # "inline": PDF bytes as base64 in rendered_pdf_b64
+    # "artifact": only rendered_pdf_id/rendered_pdf_url; fetch bytes from GET /render/artifacts/{id}
+    pdf_delivery: Optional[Literal["inline", "artifact"]] = "inline"
     model_config = ConfigDict(extra="allow")
 
 class PatchResponse(BaseModel):
     updated: ResumeForm
     rendered_tex: Optional[str] = None
     rendered_pdf_b64: Optional[str] = None
+    rendered_pdf_id: Optional[str] = None
+    rendered_pdf_url: Optional[str] = None
+    # Set instead of the PDF fields when the patch was saved but its PDF wasn't rendered
+    render_error: Optional[Dict[str, Any]] = None
     model_config = ConfigDict(extra="allow")
\ No newline at end of file
@@ -1,7 +1,52 @@
 # app/normalizers.py
 from __future__ import annotations
-from typing import Dict, Any, List
-from .models.schemas import ResumeForm
+import hashlib
+import threading
+from collections import OrderedDict
+from typing import Dict, Any, List, Optional, Set
+from .codec import dumps
+from .models.schemas import ResumeForm, Section, ITEMS_MAP
+
+BULLETED_TYPES = ("experience", "projects", "volunteer", "awards", "publications", "achievements", "talks")
+
+class NormalizedResume(dict):
+    """
+    A dict produced by normalize_resume. `digest` is its content hash at that time, so
+    later stages (workspace write, version overwrite, snapshot) can skip re-validation
+    as long as the content hasn't changed since.
+    """
+    __slots__ = ("digest",)
+
+def content_digest(doc: Dict[str, Any]) -> str:
+    """Hash of a document's JSON content (key order as stored)."""
+    return hashlib.blake2b(dumps(doc, default=str), digest_size=16).hexdigest()
+
+# Digests of recent normalize_resume outputs: lets plain dicts with the same content
+# (e.g. a draft read back from disk) skip validation too.
+_KNOWN_DIGESTS: "OrderedDict[str, None]" = OrderedDict()
+_KNOWN_MAX = 1024
+_known_lock = threading.Lock()
+
+def _mark_normalized(rf: Dict[str, Any], digest: str | None = None) -> NormalizedResume:
+    out = rf if isinstance(rf, NormalizedResume) else NormalizedResume(rf)
+    out.digest = digest or content_digest(out)
+    with _known_lock:
+        _KNOWN_DIGESTS[out.digest] = None
+        _KNOWN_DIGESTS.move_to_end(out.digest)
+        while len(_KNOWN_DIGESTS) > _KNOWN_MAX:
+            _KNOWN_DIGESTS.popitem(last=False)
+    return out
+
+def already_normalized(form: Any) -> NormalizedResume | None:
+    """Return form as a NormalizedResume if its content is a known normalize_resume output."""
+    if not isinstance(form, dict):
+        return None
+    digest = content_digest(form)
+    if isinstance(form, NormalizedResume) and getattr(form, "digest", None) == digest:
+        return form
+    with _known_lock:
+        known = digest in _KNOWN_DIGESTS
+    return _mark_normalized(form, digest) if known else None
 
 def dedupe_sorted(xs: List[str]) -> List[str]:
     """Sorts and removes duplicate strings from a list."""
@@ -11,7 +56,10 @@ def dedupe_sorted(xs: List[str]) -> List[str]:
 
 def normalize_resume(form: Dict[str, Any]) -> Dict[str, Any]:
     """Coerce shapes, dedupe skills, and handle variations in the AI's output."""
-    
+    done = already_normalized(form)
+    if done is not None:
+        return done
+
     # --- NEW: Ensure top-level string fields are not null ---
     # This prevents validation errors if the AI omits an optional field.
     for key in ["fullName", "title", "email", "phone", "location", "summary"]:
@@ -50,9 +98,151 @@ def normalize_resume(form: Dict[str, Any]) -> Dict[str, Any]:
     for sec in rf.get("sections", []):
         t = sec.get("type")
         for it in sec.get("items", []):
-            if t in ("experience", "projects", "volunteer", "awards", "publications", "achievements", "talks"):
-                if "bullets" not in it or not isinstance(it["bullets"], list):
-                    it["bullets"] = []
+            _fix_bullets(t, it)
+    return _mark_normalized(rf)
+
+def _fix_bullets(section_type: Optional[str], it: Dict[str, Any]) -> None:
+    if section_type in BULLETED_TYPES:
+        if "bullets" not in it or not isinstance(it["bullets"], list):
+            it["bullets"] = []
+        else:
+            it["bullets"] = [b for b in it["bullets"] if (b or "").strip()]
+
+def _normalize_section(sec: Any) -> Dict[str, Any]:
+    """One section exactly as normalize_resume would produce it."""
+    out = Section.model_validate(sec).model_dump()
+    for it in out.get("items", []):
+        _fix_bullets(out.get("type"), it)
+    return out
+
+def _normalize_item(section_type: str, it: Any) -> Dict[str, Any]:
+    model = ITEMS_MAP.get(section_type)
+    if model is None:
+        raise _FullNormalize()
+    out = model(**it).model_dump()
+    _fix_bullets(section_type, out)
+    return out
+
+# ------------------------------------------------------------------------------
+# Incremental normalization after a JSON patch
+# ------------------------------------------------------------------------------
+class _FullNormalize(Exception):
+    """Raised when an op's effect can't be tracked precisely; fall back to a full pass."""
+
+def _pointer(path: Any) -> List[str]:
+    if not isinstance(path, str) or (path and not path.startswith("/")):
+        raise _FullNormalize()
+    return [t.replace("~1", "/").replace("~0", "~") for t in path.split("/")[1:]] if path else []
+
+class _DirtyTracker:
+    """Which sections / items of the patched doc were touched, with indices kept current across ops."""
+    def __init__(self, n_sections: int):
+        self.n_sections = n_sections
+        self.top = False
+        self.sections: Set[int] = set()
+        self.items: Dict[int, Set[int]] = {}
+
+    def _index(self, tok: str, insert: bool) -> int:
+        if tok == "-" and insert:
+            return self.n_sections
+        if not tok.isdigit():
+            raise _FullNormalize()
+        return int(tok)
+
+    def _shift_sections(self, at: int, delta: int) -> None:
+        self.sections = {i + delta if i >= at else i for i in self.sections if not (delta < 0 and i == at)}
+        self.items = {(i + delta if i >= at else i): v for i, v in self.items.items() if not (delta < 0 and i == at)}
+        self.n_sections += delta
+
+    def _item(self, sec: int, tok: str, action: str) -> None:
+        if sec in self.sections:
+            return
+        if not tok.isdigit():  # "-" append: mark the section instead of tracking its length
+            self.sections.add(sec); self.items.pop(sec, None); return
+        j = int(tok)
+        marks = self.items.setdefault(sec, set())
+        if action == "add":
+            marks = {m + 1 if m >= j else m for m in marks}; marks.add(j)
+        elif action == "remove":
+            marks = {m - 1 if m > j else m for m in marks if m != j}
+        else:
+            marks.add(j)
+        self.items[sec] = marks
+
+    def touch(self, toks: List[str], action: str) -> None:
+        """Record one primitive change: action is "add", "remove" or "replace" at toks."""
+        if not toks:
+            raise _FullNormalize()
+        if toks[0] != "sections":
+            self.top = True
+            return
+        if len(toks) == 1:
+            raise _FullNormalize()
+        i = self._index(toks[1], insert=(action == "add" and len(toks) == 2))
+        if len(toks) == 2:
+            if action == "add":
+                self._shift_sections(i, +1); self.sections.add(i)
+            elif action == "remove":
+                self._shift_sections(i, -1)
+            else:
+                self.sections.add(i); self.items.pop(i, None)
+        elif toks[2] == "items" and len(toks) >= 4:
+            self._item(i, toks[3], action if len(toks) == 4 else "replace")
+        else:
+            self.sections.add(i); self.items.pop(i, None)
+
+def normalize_patched(base: Dict[str, Any], patched: Dict[str, Any], ops: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """
+    Normalize `patched` (= apply_json_patch(base, ops), base already normalized) by
+    re-running coercion only for the top-level fields, sections and items the ops
+    touched. Untouched subtrees are reused as-is. The result equals
+    normalize_resume(patched); anything the tracker can't follow falls back to that.
+    """
+    try:
+        base_secs = base.get("sections")
+        secs = patched.get("sections")
+        if not isinstance(base_secs, list) or not isinstance(secs, list):
+            raise _FullNormalize()
+        dirty = _DirtyTracker(len(base_secs))
+        for op in ops:
+            action = op.get("op")
+            path = _pointer(op.get("path"))
+            if action in ("add", "remove", "replace"):
+                dirty.touch(path, action)
+            elif action == "move":
+                dirty.touch(_pointer(op.get("from", op.get("from_"))), "remove")
+                dirty.touch(path, "add")
+            elif action == "copy":
+                dirty.touch(path, "add")
+            elif action != "test":
+                raise _FullNormalize()
+        if dirty.n_sections != len(secs):
+            raise _FullNormalize()
+
+        out_secs: List[Any] = []
+        for i, sec in enumerate(secs):
+            if i in dirty.sections:
+                out_secs.append(_normalize_section(sec))
+            elif i in dirty.items:
+                sec = dict(sec)
+                items = list(sec.get("items") or [])
+                for j in dirty.items[i]:
+                    if j >= len(items):
+                        raise _FullNormalize()
+                    if not isinstance(items[j], dict):
+                        sec = _normalize_section(secs[i]); break
+                    items[j] = _normalize_item(sec.get("type"), items[j])
                 else:
-                    it["bullets"] = [b for b in it["bullets"] if (b or "").strip()]
-    return rf
\ No newline at end of file
+                    sec["items"] = items
+                out_secs.append(sec)
+            else:
+                out_secs.append(sec)
+
+        if dirty.top:
+            top = dict(normalize_resume({**patched, "sections": []}))
+        else:
+            top = dict(patched)
+        top["sections"] = out_secs
+        return _mark_normalized(top)
+    except _FullNormalize:
+        return normalize_resume(patched)
\ No newline at end of file
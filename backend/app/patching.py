@@ -1,42 +1,272 @@
 # app/patching.py
+"""
+RFC 6902 JSON Patch with structural sharing.
+
+apply_json_patch never touches its input and never deep-copies it: for each op only
+the containers on the op's path are shallow-copied (once per patch call), and every
+other subtree is shared between the input and the result. Treat both documents as
+read-only afterwards, or copy before mutating them in place.
+"""
 from __future__ import annotations
-from typing import Any, Dict, List
 from copy import deepcopy
+from functools import lru_cache
+from typing import Any, Dict, List, Tuple
+
+@lru_cache(maxsize=4096)
+def parse_pointer(path: str) -> Tuple[str, ...]:
+    """RFC 6901 pointer -> unescaped reference tokens ("" is the whole document)."""
+    if not isinstance(path, str) or (path and not path.startswith("/")):
+        raise ValueError(f"Bad path: {path!r}")
+    if not path:
+        return ()
+    return tuple(t.replace("~1", "/").replace("~0", "~") for t in path[1:].split("/"))
+
+def _index(tok: str, size: int, path: str, allow_end: bool = False) -> int:
+    if allow_end and tok == "-":
+        return size
+    if not tok.isdigit() or (tok != "0" and tok.startswith("0")):
+        raise ValueError(f"Bad array index {tok!r} in {path}")
+    i = int(tok)
+    if i > size or (i == size and not allow_end):
+        raise ValueError(f"Array index out of range in {path}")
+    return i
+
+def _child(node: Any, tok: str, path: str) -> Any:
+    if isinstance(node, dict):
+        if tok not in node:
+            raise ValueError(f"Path not found: {path}")
+        return node[tok]
+    if isinstance(node, list):
+        return node[_index(tok, len(node), path)]
+    raise ValueError(f"Path not found: {path}")
+
+def resolve(doc: Any, path: str) -> Any:
+    """Value at `path`; raises ValueError if it doesn't exist."""
+    node = doc
+    for tok in parse_pointer(path):
+        node = _child(node, tok, path)
+    return node
+
+class _Patcher:
+    """Applies ops to a working root, copying each container at most once."""
+    def __init__(self, doc: Any):
+        self.root = doc
+        self._owned: Dict[int, Any] = {}  # id -> container we created (kept alive so ids stay unique)
+
+    def _own(self, node: Any) -> Any:
+        if id(node) in self._owned:
+            return node
+        if isinstance(node, dict):
+            node = dict(node)
+        elif isinstance(node, list):
+            node = list(node)
+        else:
+            return node
+        self._owned[id(node)] = node
+        return node
 
-try:
-    import jsonpatch
-except ImportError:
-    jsonpatch = None
+    def _parent(self, tokens: Tuple[str, ...], path: str) -> Any:
+        """Copy-on-write walk to the container holding the last token; returns that container."""
+        self.root = node = self._own(self.root)
+        for tok in tokens[:-1]:
+            child = _child(node, tok, path)
+            if not isinstance(child, (dict, list)):
+                raise ValueError(f"Path not found: {path}")
+            owned = self._own(child)
+            if owned is not child:
+                node[tok if isinstance(node, dict) else int(tok)] = owned
+            node = owned
+        if not isinstance(node, (dict, list)):
+            raise ValueError(f"Path not found: {path}")
+        return node
+
+    def add(self, path: str, value: Any) -> None:
+        tokens = parse_pointer(path)
+        if not tokens:
+            self.root = value
+            return
+        parent, last = self._parent(tokens, path), tokens[-1]
+        if isinstance(parent, list):
+            parent.insert(_index(last, len(parent), path, allow_end=True), value)
+        else:
+            parent[last] = value
+
+    def remove(self, path: str) -> Any:
+        tokens = parse_pointer(path)
+        if not tokens:
+            raise ValueError("Cannot remove the document root")
+        parent, last = self._parent(tokens, path), tokens[-1]
+        if isinstance(parent, list):
+            return parent.pop(_index(last, len(parent), path))
+        if last not in parent:
+            raise ValueError(f"Path not found: {path}")
+        return parent.pop(last)
+
+    def replace(self, path: str, value: Any) -> None:
+        tokens = parse_pointer(path)
+        if not tokens:
+            self.root = value
+            return
+        parent, last = self._parent(tokens, path), tokens[-1]
+        if isinstance(parent, list):
+            parent[_index(last, len(parent), path)] = value
+        elif last not in parent:
+            raise ValueError(f"Path not found: {path}")
+        else:
+            parent[last] = value
+
+    def apply(self, op: Dict[str, Any]) -> None:
+        action, path = op.get("op"), op.get("path")
+        if action == "add":
+            self.add(path, op.get("value"))
+        elif action == "remove":
+            self.remove(path)
+        elif action == "replace":
+            self.replace(path, op.get("value"))
+        elif action in ("move", "copy"):
+            src = op.get("from", op.get("from_"))
+            if src is None:
+                raise ValueError(f"'{action}' op needs 'from'")
+            if action == "move":
+                if src == path:
+                    resolve(self.root, src)
+                    return
+                if path.startswith(src + "/"):
+                    raise ValueError(f"Cannot move {src} into its own child {path}")
+                self.add(path, self.remove(src))
+            else:
+                self.add(path, deepcopy(resolve(self.root, src)))
+        elif action == "test":
+            if not _json_equal(resolve(self.root, path), op.get("value")):
+                raise ValueError(f"Test failed at {path}")
+        else:
+            raise ValueError(f"Unsupported op: {action}")
 
 def apply_json_patch(doc: Dict[str, Any], ops: List[Dict[str, Any]]) -> Dict[str, Any]:
     if not ops: return doc
-    base = deepcopy(doc)
-    if jsonpatch:
-        ops2 = []
-        for op in ops:
-            o = dict(op)
-            if "from_" in o: o["from"] = o.pop("from_")
-            ops2.append(o)
-        return jsonpatch.apply_patch(base, ops2, in_place=False)
-
-    # minimal fallback for add/replace/remove
+    patcher = _Patcher(doc)
     for op in ops:
-        action = op["op"]; path = op["path"]; value = op.get("value")
-        if not path.startswith("/"): raise ValueError(f"Bad path: {path}")
-        keys = [k for k in path.split("/")[1:] if k]
-        parent = base
-        for k in keys[:-1]:
-            parent = parent[int(k)] if isinstance(parent, list) else parent.setdefault(k, {})
-        last = keys[-1] if keys else None
-        if action == "replace":
-            (parent.__setitem__(int(last), value) if isinstance(parent, list) else parent.__setitem__(last, value))
-        elif action == "add":
-            if isinstance(parent, list):
-                parent.append(value) if last == "-" else parent.insert(int(last), value)
-            else:
-                parent[last] = value
-        elif action == "remove":
-            (parent.pop(int(last)) if isinstance(parent, list) else parent.pop(last, None))
+        patcher.apply(op)
+    return patcher.root
+
+def _escape(tok: Any) -> str:
+    return str(tok).replace("~", "~0").replace("/", "~1")
+
+def _same(x: Any, y: Any) -> bool:
+    """JSON equality (unlike ==, 1 / 1.0 / True are different values)."""
+    if x is y:
+        return True
+    if type(x) is not type(y):
+        return False
+    if isinstance(x, dict):
+        return len(x) == len(y) and all(k in y and _same(v, y[k]) for k, v in x.items())
+    if isinstance(x, list):
+        return len(x) == len(y) and all(_same(u, v) for u, v in zip(x, y))
+    return x == y
+
+def _json_equal(x: Any, y: Any) -> bool:
+    """RFC 6902 "test" equality: like _same, but 1 and 1.0 are the same number."""
+    if isinstance(x, bool) or isinstance(y, bool):
+        return x is y
+    if isinstance(x, (int, float)) and isinstance(y, (int, float)):
+        return x == y
+    if type(x) is not type(y):
+        return False
+    if isinstance(x, dict):
+        return len(x) == len(y) and all(k in y and _json_equal(v, y[k]) for k, v in x.items())
+    if isinstance(x, list):
+        return len(x) == len(y) and all(_json_equal(u, v) for u, v in zip(x, y))
+    return x == y
+
+# Aligning two lists is quadratic: past this many element pairs a list is replaced whole
+LIST_DIFF_MAX_PAIRS = 10_000
+
+def _match(x: Any, y: Any) -> bool:
+    """List elements that line up in a diff: equal, or dicts with the same "id"."""
+    if _same(x, y):
+        return True
+    return isinstance(x, dict) and isinstance(y, dict) and x.get("id") is not None and _same(x.get("id"), y.get("id"))
+
+def _align(a: List[Any], b: List[Any]) -> List[Tuple[int, int]]:
+    """Index pairs (i, j) of a longest common subsequence of a and b under _match."""
+    n, m = len(a), len(b)
+    match = [[_match(x, y) for y in b] for x in a]
+    lcs = [[0] * (m + 1) for _ in range(n + 1)]
+    for i in range(n - 1, -1, -1):
+        row, below = lcs[i], lcs[i + 1]
+        for j in range(m - 1, -1, -1):
+            row[j] = below[j + 1] + 1 if match[i][j] else max(below[j], row[j + 1])
+    pairs: List[Tuple[int, int]] = []
+    i = j = 0
+    while i < n and j < m:
+        if match[i][j] and lcs[i][j] == lcs[i + 1][j + 1] + 1:
+            pairs.append((i, j))
+            i += 1
+            j += 1
+        elif lcs[i + 1][j] >= lcs[i][j + 1]:
+            i += 1
         else:
-            raise ValueError(f"Unsupported op in fallback: {action}")
-    return base
+            j += 1
+    return pairs
+
+def _diff_list(a: List[Any], b: List[Any], path: str) -> List[Dict[str, Any]]:
+    """
+    Trim the common head and tail, then align the differing middle (_align): aligned
+    elements are diffed in place, as are runs of equally many unaligned ones between
+    them. Unequal runs become removes and adds, so an insertion never shows up as
+    edits to the elements after it (which would misplace a concurrent edit on rebase).
+    """
+    la, lb = len(a), len(b)
+    head = 0
+    while head < la and head < lb and _same(a[head], b[head]):
+        head += 1
+    tail = 0
+    while tail < la - head and tail < lb - head and _same(a[la - 1 - tail], b[lb - 1 - tail]):
+        tail += 1
+    mid_a, mid_b = a[head:la - tail], b[head:lb - tail]
+    if len(mid_a) * len(mid_b) > LIST_DIFF_MAX_PAIRS:
+        return [{"op": "replace", "path": path, "value": b}]
+    ops: List[Dict[str, Any]] = []
+    k = head  # index in the list as patched so far
+    i = j = 0
+    for ai, bj in _align(mid_a, mid_b) + [(len(mid_a), len(mid_b))]:
+        run_a, run_b = mid_a[i:ai], mid_b[j:bj]
+        if len(run_a) == len(run_b):
+            for x, y in zip(run_a, run_b):
+                ops.extend(diff_docs(x, y, f"{path}/{k}"))
+                k += 1
+        else:
+            ops.extend({"op": "remove", "path": f"{path}/{k}"} for _ in run_a)
+            for y in run_b:
+                ops.append({"op": "add", "path": f"{path}/{k}", "value": y})
+                k += 1
+        if ai < len(mid_a):
+            ops.extend(diff_docs(mid_a[ai], mid_b[bj], f"{path}/{k}"))
+            k += 1
+        i, j = ai + 1, bj + 1
+    return ops
+
+def diff_docs(a: Any, b: Any, path: str = "") -> List[Dict[str, Any]]:
+    """
+    RFC 6902 ops that turn `a` into `b` (apply_json_patch(a, diff_docs(a, b)) == b).
+    Shared subtrees (as left by apply_json_patch) are skipped by identity, so diffing
+    a document against its patched successor only walks the changed paths.
+    """
+    if a is b:
+        return []
+    if isinstance(a, dict) and isinstance(b, dict):
+        ops: List[Dict[str, Any]] = []
+        for k in a:
+            if k not in b:
+                ops.append({"op": "remove", "path": f"{path}/{_escape(k)}"})
+        for k, v in b.items():
+            if k not in a:
+                ops.append({"op": "add", "path": f"{path}/{_escape(k)}", "value": v})
+            else:
+                ops.extend(diff_docs(a[k], v, f"{path}/{_escape(k)}"))
+        return ops
+    if isinstance(a, list) and isinstance(b, list):
+        return _diff_list(a, b, path)
+    if _same(a, b):
+        return []
+    return [{"op": "replace", "path": path, "value": b}]
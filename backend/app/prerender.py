@@ -0,0 +1,140 @@
+# app/prerender.py
+"""
+Speculative PDF pre-rendering (opt-in via PRERENDER_ENABLED).
+
+After a successful workspace save/patch the editor almost always asks for
+/render/pdf of the same document next, so we compile the new revision in the
+background; the follow-up request is then a render cache hit.
+
+Per user there is at most one pending and one running pre-render. Scheduling a
+newer revision replaces the pending one, so a fast typist never queues more than
+a single compile. Background compiles also yield to interactive ones: a worker
+waits while the compile queue is saturated, then compiles on the app's event loop
+through compile_queue.slot(background=True), which caps them separately
+(COMPILE_BACKGROUND_MAX) and refuses them whenever an interactive compile would
+have to wait. Nothing is scheduled before startup() has recorded the loop.
+"""
+from __future__ import annotations
+
+import asyncio
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Optional, Set, Tuple
+
+from fastapi import HTTPException
+
+from .config import settings
+from .compile_queue import compile_queue
+from .rendering import render_tex, compile_pdf_async
+
+IDLE_POLL = 0.25  # seconds between checks while interactive compiles use every slot
+
+
+class Prerenderer:
+    def __init__(self, enabled: bool, workers: int, max_pending: int):
+        self.enabled = enabled
+        self.workers = max(1, int(workers))
+        self.max_pending = max(1, int(max_pending))
+        self._pending: "OrderedDict[str, Tuple[int, Dict[str, Any]]]" = OrderedDict()
+        self._running: Set[str] = set()
+        self._cond = threading.Condition()
+        self._threads: list[threading.Thread] = []
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._counters: Dict[str, int] = {
+            "scheduled": 0, "superseded": 0, "dropped": 0, "compiled": 0, "failed": 0,
+        }
+
+    def schedule(self, uid: str, rev: int, form: Dict[str, Any]) -> bool:
+        """Queue a background compile of `form` at `rev`; returns False if not queued."""
+        if not self.enabled:
+            return False
+        with self._cond:
+            if self._loop is None:
+                return False
+            if uid in self._pending:
+                if self._pending[uid][0] > rev:
+                    return False
+                self._counters["superseded"] += 1
+            elif len(self._pending) >= self.max_pending:
+                self._counters["dropped"] += 1
+                return False
+            self._pending[uid] = (rev, form)
+            self._pending.move_to_end(uid)
+            self._counters["scheduled"] += 1
+            self._ensure_threads()
+            self._cond.notify()
+        return True
+
+    async def startup(self) -> None:
+        """Called from the app's startup hook: compiles run on this loop."""
+        with self._cond:
+            self._loop = asyncio.get_running_loop()
+
+    async def shutdown(self) -> None:
+        with self._cond:
+            self._loop = None
+            self._pending.clear()
+
+    def _ensure_threads(self) -> None:
+        while len(self._threads) < self.workers:
+            t = threading.Thread(target=self._work, name=f"prerender-{len(self._threads)}", daemon=True)
+            self._threads.append(t)
+            t.start()
+
+    def _next(self) -> Tuple[str, int, Dict[str, Any]]:
+        with self._cond:
+            while True:
+                uid = next((u for u in self._pending if u not in self._running), None)
+                if uid is not None:
+                    rev, form = self._pending.pop(uid)
+                    self._running.add(uid)
+                    return uid, rev, form
+                self._cond.wait()
+
+    def _work(self) -> None:
+        while True:
+            uid, rev, form = self._next()
+            outcome: Optional[str] = "failed"
+            try:
+                outcome = self._compile(uid, form)
+            except Exception:
+                pass
+            finally:
+                with self._cond:
+                    if outcome:
+                        self._counters[outcome] += 1
+                    self._running.discard(uid)
+                    self._cond.notify_all()
+
+    def _compile(self, uid: str, form: Dict[str, Any]) -> Optional[str]:
+        """Compile form into the render cache; None if a newer revision made it moot."""
+        tex = render_tex(form)
+        while True:
+            self._wait_for_idle_slot()
+            with self._cond:
+                loop = self._loop
+                if loop is None or uid in self._pending:
+                    return None
+            try:
+                asyncio.run_coroutine_threadsafe(compile_pdf_async(tex, background=True), loop).result()
+                return "compiled"
+            except HTTPException as e:
+                if e.status_code != 503:
+                    raise
+                # An interactive compile took the free slot first: wait for the next one
+
+    @staticmethod
+    def _wait_for_idle_slot() -> None:
+        q = compile_queue
+        while q.waiting > 0 or q.running >= q.concurrency or q.background >= q.max_background:
+            time.sleep(IDLE_POLL)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._cond:
+            out: Dict[str, Any] = dict(self._counters)
+            out.update({"enabled": self.enabled, "pending": len(self._pending), "running": len(self._running)})
+        return out
+
+
+prerenderer = Prerenderer(settings.PRERENDER_ENABLED, settings.PRERENDER_WORKERS, settings.PRERENDER_MAX_PENDING)
@@ -0,0 +1,108 @@
+# app/rebase.py
+"""
+Rebase JSON patch ops written against an older revision onto the current one.
+
+Both sides are RFC 6902 op lists from the same base document: the client's ops
+and the server ops (from the workspace op log) that landed since the client's
+rev. Client ops are transformed past the server ops: array inserts/removals on
+the same list shift indices, and ops on disjoint paths pass through unchanged.
+An op whose path equals, contains or lies inside a path the server changed is a
+real conflict and is reported by its (client-side) path. Server ops must use
+concrete array indices (no "-"), as diff_docs produces.
+"""
+from __future__ import annotations
+
+from copy import copy
+from typing import Any, Dict, List, Optional, Tuple
+
+from .patching import parse_pointer, _escape
+
+Tokens = Tuple[str, ...]
+
+
+class RebaseConflict(Exception):
+    def __init__(self, paths: List[str]):
+        super().__init__(", ".join(paths))
+        self.paths = paths
+
+
+def _is_index(tok: str) -> bool:
+    return tok.isdigit() and (tok == "0" or not tok.startswith("0"))
+
+
+def _prefix(a: Tokens, b: Tokens) -> bool:
+    return len(a) <= len(b) and b[:len(a)] == a
+
+
+def _xform(toks: Tokens, kind: str, by: Tokens, by_kind: str, wins_ties: bool) -> Optional[Tokens]:
+    """
+    `toks` (an op of `kind`) re-expressed after `by` (an op of `by_kind`) has been
+    applied; None if the two overlap. `wins_ties` decides which of two inserts at
+    the same array index ends up first.
+    """
+    if by_kind == "read":
+        return toks  # reads don't change the document
+    if by_kind in ("add", "remove") and by and _is_index(by[-1]):
+        parent, i = by[:-1], int(by[-1])
+        n = len(parent)
+        if len(toks) > n and toks[:n] == parent and _is_index(toks[n]):
+            j = int(toks[n])
+            inserting = kind == "add" and len(toks) == n + 1
+            if by_kind == "add":
+                if j > i or (j == i and not (inserting and wins_ties)):
+                    j += 1
+            elif j > i:
+                j -= 1
+            elif j == i and not inserting:
+                return None
+            return toks[:n] + (str(j),) + toks[n + 1:]
+    if kind == "add" and toks and (toks[-1] == "-" or _is_index(toks[-1])):
+        parent = toks[:-1]
+        if len(by) > len(parent) and by[:len(parent)] == parent:
+            return toks  # inserting into a list doesn't overlap changes to its existing elements
+    if _prefix(toks, by) or _prefix(by, toks):
+        return None
+    return toks
+
+
+def _primitives(op: Dict[str, Any]) -> List[Tuple[str, str]]:
+    """(kind, field) steps an op performs, in order; kind is add/remove/replace/read."""
+    action = op.get("op")
+    if action == "move":
+        return [("remove", "from"), ("add", "path")]
+    if action == "copy":
+        return [("read", "from"), ("add", "path")]
+    if action == "test":
+        return [("read", "path")]
+    return [(action, "path")]
+
+
+def rebase_ops(client_ops: List[Dict[str, Any]], server_ops: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """Client ops rewritten to apply after server_ops. Raises RebaseConflict listing every overlapping path."""
+    server: List[Tuple[str, Tokens]] = [
+        (kind, parse_pointer(s[field] if field in s else s.get("from_")))
+        for s in server_ops for kind, field in _primitives(s) if kind != "read"
+    ]
+    out: List[Dict[str, Any]] = []
+    conflicts: List[str] = []
+    for op in client_ops:
+        new = copy(op)
+        if "from_" in new and "from" not in new:
+            new["from"] = new.pop("from_")
+        for kind, field in _primitives(new):
+            toks: Optional[Tokens] = parse_pointer(new[field])
+            for k, (s_kind, s_toks) in enumerate(server):
+                s_new = _xform(s_toks, s_kind, toks, kind, wins_ties=True)
+                toks = _xform(toks, kind, s_toks, s_kind, wins_ties=False)
+                if toks is None or s_new is None:
+                    toks = None
+                    break
+                server[k] = (s_kind, s_new)
+            if toks is None:
+                conflicts.append(op.get(field) if field == "path" else op.get("from", op.get("from_")))
+                break
+            new[field] = "/".join(("",) + tuple(_escape(t) for t in toks)) if toks else ""
+        out.append(new)
+    if conflicts:
+        raise RebaseConflict(list(dict.fromkeys(conflicts)))
+    return out
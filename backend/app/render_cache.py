@@ -0,0 +1,171 @@
+# app/render_cache.py
+"""
+Content-addressed cache for compiled PDFs.
+
+Two tiers:
+  - memory: LRU bounded by total bytes
+  - disk:   one file per key under RENDER_CACHE_DIR, evicted oldest-first
+            (by mtime, refreshed on every hit) once the directory exceeds its budget
+
+Keys are a sha256 over (template digest, engine, tex), so a byte-identical tex
+compiled by the same engine against the same template is only compiled once.
+"""
+from __future__ import annotations
+
+import hashlib
+import os
+import threading
+from collections import OrderedDict
+from pathlib import Path
+from typing import Dict, Optional
+
+from .config import settings
+
+
+def cache_key(tex: str, engine: str, template_digest: str = "") -> str:
+    h = hashlib.sha256()
+    for part in (template_digest, engine):
+        h.update(part.encode("utf-8")); h.update(b"\0")
+    h.update(tex.encode("utf-8"))
+    return h.hexdigest()
+
+
+class RenderCache:
+    def __init__(self, memory_bytes: int, disk_dir: Optional[str], disk_bytes: int):
+        self.memory_bytes = max(0, int(memory_bytes))
+        self.disk_dir = Path(disk_dir) if disk_dir else None
+        self.disk_bytes = max(0, int(disk_bytes))
+        self._mem: "OrderedDict[str, bytes]" = OrderedDict()
+        self._mem_used = 0
+        self._disk_used: Optional[int] = None  # computed lazily on first disk write
+        self._lock = threading.Lock()
+        self._counters: Dict[str, int] = {
+            "hits_memory": 0, "hits_disk": 0, "misses": 0, "puts": 0,
+            "evictions_memory": 0, "evictions_disk": 0,
+        }
+
+    # ---------- public API ----------
+    def get(self, key: str) -> Optional[bytes]:
+        with self._lock:
+            pdf = self._mem.get(key)
+            if pdf is not None:
+                self._mem.move_to_end(key)
+                self._counters["hits_memory"] += 1
+                return pdf
+        pdf = self._disk_get(key)
+        with self._lock:
+            if pdf is None:
+                self._counters["misses"] += 1
+                return None
+            self._counters["hits_disk"] += 1
+            self._mem_put(key, pdf)
+        return pdf
+
+    def put(self, key: str, pdf: bytes) -> None:
+        with self._lock:
+            self._counters["puts"] += 1
+            self._mem_put(key, pdf)
+        self._disk_put(key, pdf)
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            out = dict(self._counters)
+            out.update({
+                "memory_entries": len(self._mem),
+                "memory_bytes": self._mem_used,
+                "memory_limit_bytes": self.memory_bytes,
+                "disk_bytes": self._disk_used or 0,
+                "disk_limit_bytes": self.disk_bytes,
+            })
+        return out
+
+    def clear(self) -> None:
+        with self._lock:
+            self._mem.clear(); self._mem_used = 0
+
+    # ---------- memory tier (caller holds the lock) ----------
+    def _mem_put(self, key: str, pdf: bytes) -> None:
+        size = len(pdf)
+        if size > self.memory_bytes:
+            return
+        old = self._mem.pop(key, None)
+        if old is not None:
+            self._mem_used -= len(old)
+        self._mem[key] = pdf
+        self._mem_used += size
+        while self._mem_used > self.memory_bytes and self._mem:
+            _, evicted = self._mem.popitem(last=False)
+            self._mem_used -= len(evicted)
+            self._counters["evictions_memory"] += 1
+
+    # ---------- disk tier ----------
+    def _path(self, key: str) -> Path:
+        assert self.disk_dir is not None
+        return self.disk_dir / key[:2] / f"{key}.pdf"
+
+    def _disk_get(self, key: str) -> Optional[bytes]:
+        if not self.disk_dir or not self.disk_bytes:
+            return None
+        p = self._path(key)
+        try:
+            pdf = p.read_bytes()
+        except OSError:
+            return None
+        try: os.utime(p)  # refresh recency for eviction
+        except OSError: pass
+        return pdf
+
+    def _disk_put(self, key: str, pdf: bytes) -> None:
+        if not self.disk_dir or not self.disk_bytes or len(pdf) > self.disk_bytes:
+            return
+        p = self._path(key)
+        try:
+            p.parent.mkdir(parents=True, exist_ok=True)
+            existed = p.exists()
+            tmp = p.with_suffix(f".{os.getpid()}.{threading.get_ident()}.tmp")
+            tmp.write_bytes(pdf)
+            os.replace(tmp, p)
+        except OSError:
+            return
+        with self._lock:
+            if self._disk_used is None:
+                self._disk_used = self._scan_disk_usage()
+            elif not existed:
+                self._disk_used += len(pdf)
+            if self._disk_used > self.disk_bytes:
+                self._disk_evict()
+
+    def _scan_disk_usage(self) -> int:
+        total = 0
+        for f in self.disk_dir.glob("*/*.pdf"):  # type: ignore[union-attr]
+            try: total += f.stat().st_size
+            except OSError: pass
+        return total
+
+    def _disk_evict(self) -> None:
+        entries = []
+        for f in self.disk_dir.glob("*/*.pdf"):  # type: ignore[union-attr]
+            try:
+                st = f.stat()
+                entries.append((st.st_mtime, st.st_size, f))
+            except OSError:
+                pass
+        entries.sort(key=lambda e: e[0])
+        used = sum(e[1] for e in entries)
+        for _, size, f in entries:
+            if used <= self.disk_bytes:
+                break
+            try:
+                f.unlink()
+                used -= size
+                self._counters["evictions_disk"] += 1
+            except OSError:
+                pass
+        self._disk_used = used
+
+
+render_cache = RenderCache(
+    settings.RENDER_CACHE_MEMORY_BYTES,
+    settings.RENDER_CACHE_DIR,
+    settings.RENDER_CACHE_DISK_BYTES,
+)
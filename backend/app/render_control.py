@@ -0,0 +1,107 @@
+# app/render_control.py
+"""
+Cancellation for interactive renders.
+
+latest_wins: compiles are tagged with (user id, workspace rev). When a request
+for a strictly newer rev arrives for a user, compiles still queued or running for
+older revs of that user are cancelled; cancelling the task kills the LaTeX process
+group (see latex_pool._arun). The superseded request gets a 409 render_superseded.
+Requests for the rev already rendering run alongside it (identical tex shares one
+compile through rendering.compile_flight).
+
+cancel_on_disconnect: aborts the compile when the HTTP client goes away.
+"""
+from __future__ import annotations
+
+import asyncio
+import itertools
+from typing import Any, Awaitable, Dict, Optional, Set, Tuple, TypeVar
+
+from fastapi import HTTPException, Request
+
+T = TypeVar("T")
+
+DISCONNECT_POLL = 0.5  # seconds
+
+
+class LatestWins:
+    def __init__(self):
+        # uid -> ((rev, seq) of the newest claim, tasks running under that claim)
+        self._active: Dict[str, Tuple[Tuple[int, int], Set[asyncio.Task]]] = {}
+        self._superseded: Set[asyncio.Task] = set()
+        self._seq = itertools.count()
+        self._counters: Dict[str, int] = {"claims": 0, "joined": 0, "cancelled": 0, "rejected_stale": 0}
+
+    async def run(self, uid: str, rev: Optional[int], aw: Awaitable[T]) -> T:
+        """
+        Await `aw` as the newest render for `uid`; without a rev it counts as the current one.
+        Raises 409 render_superseded if a render for a newer rev of the same user cancels this one.
+        """
+        task = asyncio.current_task()
+        assert task is not None
+        cur = self._active.get(uid)
+        key = (int(rev) if rev is not None else (cur[0][0] if cur else 0), next(self._seq))
+        if cur and key[0] < cur[0][0]:
+            self._counters["rejected_stale"] += 1
+            _close(aw)
+            raise _superseded(cur[0][0])
+        if cur and key[0] == cur[0][0]:
+            cur[1].add(task)  # same rev: join the renders already running
+            self._counters["joined"] += 1
+        else:
+            if cur:
+                for older in cur[1]:
+                    self._superseded.add(older)
+                    older.cancel()
+                    self._counters["cancelled"] += 1
+            self._active[uid] = (key, {task})
+            self._counters["claims"] += 1
+        try:
+            return await aw
+        except asyncio.CancelledError:
+            if task in self._superseded:
+                if hasattr(task, "uncancel"): task.uncancel()
+                latest = self._active.get(uid)
+                raise _superseded(latest[0][0] if latest else key[0])
+            raise
+        finally:
+            self._superseded.discard(task)
+            entry = self._active.get(uid)
+            if entry and task in entry[1]:
+                entry[1].discard(task)
+                if not entry[1]:
+                    del self._active[uid]
+
+    def stats(self) -> Dict[str, Any]:
+        return {**self._counters, "active_users": len(self._active)}
+
+
+def _superseded(rev: int) -> HTTPException:
+    return HTTPException(status_code=409, detail={"error": "render_superseded", "serverRev": rev})
+
+
+def _close(aw: Awaitable[Any]) -> None:
+    # Avoid "coroutine was never awaited" warnings for work we refuse to start
+    close = getattr(aw, "close", None)
+    if close: close()
+
+
+async def cancel_on_disconnect(request: Request, aw: Awaitable[T]) -> T:
+    """Await `aw` in a child task and cancel it if the client disconnects first."""
+    task = asyncio.ensure_future(aw)
+    try:
+        while True:
+            done, _ = await asyncio.wait({task}, timeout=DISCONNECT_POLL)
+            if done:
+                return task.result()
+            if await request.is_disconnected():
+                task.cancel()
+                try: await task
+                except BaseException: pass
+                raise HTTPException(status_code=499, detail="client_closed_request")
+    except asyncio.CancelledError:
+        task.cancel()
+        raise
+
+
+latest_wins = LatestWins()
@@ -0,0 +1,134 @@
+# app/render_jobs.py
+"""
+Background render jobs: POST a form, get a job id back immediately, poll for status
+and download the PDF once it's done.
+
+Job records and finished PDFs live under RENDER_JOBS_DIR (one <id>.json plus
+<id>.pdf), so any API process can answer status/download requests, not only the
+one that ran the compile. Finished jobs are purged RENDER_JOB_TTL seconds after
+they complete.
+"""
+from __future__ import annotations
+
+import asyncio
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any, Dict, Optional, Set
+from uuid import uuid4
+
+from fastapi import HTTPException
+from starlette.concurrency import run_in_threadpool
+
+from .codec import read_json, write_json
+from .config import settings
+from .normalizers import normalize_resume
+from .rendering import render_tex, compile_pdf_async
+
+PURGE_INTERVAL = 60.0
+
+
+def _now() -> str:
+    return datetime.now(timezone.utc).isoformat()
+
+
+class RenderJobStore:
+    def __init__(self, root: str, ttl: int):
+        self.root = Path(root)
+        self.ttl = ttl
+        self._tasks: Set[asyncio.Task] = set()  # strong refs so running jobs aren't GC'd
+        self._last_purge = 0.0
+
+    # ---------- files ----------
+    def _meta_path(self, jid: str) -> Path: return self.root / f"{jid}.json"
+    def _pdf_path(self, jid: str) -> Path: return self.root / f"{jid}.pdf"
+
+    def _save(self, job: Dict[str, Any]) -> None:
+        self.root.mkdir(parents=True, exist_ok=True)
+        write_json(self._meta_path(job["id"]), job)
+
+    def get(self, jid: str, uid: str) -> Optional[Dict[str, Any]]:
+        if not jid.replace("-", "").isalnum():
+            return None
+        try:
+            job = read_json(self._meta_path(jid))
+        except (OSError, ValueError):
+            return None
+        if job.get("uid") != uid or self._expired(job):
+            return None
+        return job
+
+    def pdf(self, jid: str) -> Optional[bytes]:
+        try: return self._pdf_path(jid).read_bytes()
+        except OSError: return None
+
+    # ---------- lifecycle ----------
+    async def submit(self, form: Dict[str, Any], uid: str) -> Dict[str, Any]:
+        """Record a queued job and start it on the running event loop (disk work runs in the threadpool)."""
+        await run_in_threadpool(self.purge)
+        job = {"id": str(uuid4()), "uid": uid, "status": "queued", "createdAt": _now(),
+               "startedAt": None, "finishedAt": None, "error": None, "size": None,
+               "createdTs": time.time()}
+        await run_in_threadpool(self._save, job)
+        task = asyncio.get_running_loop().create_task(self._run(job, form))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+        return job
+
+    async def _run(self, job: Dict[str, Any], form: Dict[str, Any]) -> None:
+        job.update(status="running", startedAt=_now())
+        await run_in_threadpool(self._save, job)
+        try:
+            tex = await run_in_threadpool(lambda: render_tex(normalize_resume(form)))
+            while True:
+                try:
+                    pdf = await compile_pdf_async(tex)
+                    break
+                except HTTPException as e:
+                    if e.status_code != 503:
+                        raise
+                    # Compile queue is full: a background job can simply wait its turn
+                    await asyncio.sleep(float((e.headers or {}).get("Retry-After", 1)))
+            await run_in_threadpool(self._pdf_path(job["id"]).write_bytes, pdf)
+            job.update(status="done", size=len(pdf))
+        except Exception as e:
+            detail = e.detail if isinstance(e, HTTPException) else str(e)
+            job.update(status="failed", error=detail)
+        job["finishedAt"] = _now()
+        job["finishedTs"] = time.time()
+        await run_in_threadpool(self._save, job)
+
+    def _expired(self, job: Dict[str, Any]) -> bool:
+        # Unfinished jobs older than the TTL were orphaned by a restart; expire those too.
+        ts = job.get("finishedTs") or job.get("createdTs")
+        return ts is not None and time.time() - ts > self.ttl
+
+    def purge(self, force: bool = False) -> int:
+        """Drop finished jobs (record and PDF) older than the TTL; runs at most once per PURGE_INTERVAL."""
+        now = time.time()
+        if not force and now - self._last_purge < PURGE_INTERVAL:
+            return 0
+        self._last_purge = now
+        removed = 0
+        for p in self.root.glob("*.json"):
+            try:
+                job = read_json(p)
+            except (OSError, ValueError):
+                continue
+            if self._expired(job):
+                for f in (p, self._pdf_path(job.get("id", ""))):
+                    try: f.unlink()
+                    except OSError: pass
+                removed += 1
+        return removed
+
+
+def public_job(job: Dict[str, Any]) -> Dict[str, Any]:
+    """Job status as returned to clients."""
+    out = {k: job.get(k) for k in ("id", "status", "createdAt", "startedAt", "finishedAt", "error", "size")}
+    out["statusUrl"] = f"/api/render/jobs/{job['id']}"
+    out["downloadUrl"] = f"/api/render/jobs/{job['id']}/pdf" if job.get("status") == "done" else None
+    return out
+
+
+render_jobs = RenderJobStore(settings.RENDER_JOBS_DIR, settings.RENDER_JOB_TTL)
@@ -1,11 +1,19 @@
 # app/rendering.py
 from __future__ import annotations
-import shutil, subprocess, tempfile
+import hashlib, re, shutil, threading
+from datetime import date, datetime
+from functools import lru_cache
+from collections import OrderedDict
 from pathlib import Path
 from typing import Any, Dict
-from jinja2 import Environment, FileSystemLoader
+from jinja2 import Environment, FileSystemLoader, FileSystemBytecodeCache, Template, TemplateNotFound
 from fastapi import HTTPException
 from dateutil import parser as dateparser
+from .codec import dumps
+from .render_cache import render_cache, cache_key
+from .latex_pool import LatexError, latex_pool
+from .compile_queue import compile_queue
+from .singleflight import SingleFlight
 
 TEMPLATES = Path(__file__).parent / "templates"
 TEMPLATE_NAME = "editor.tex.jinja"
@@ -16,15 +24,41 @@ LATEX_SPECIALS = {
     "_": r"\_", "~": r"\textasciitilde{}", "^": r"\textasciicircum{}",
 }
 
+_LATEX_TABLE = str.maketrans(LATEX_SPECIALS)
+
 def latex_escape(text: Any) -> str:
     if text is None: return ""
-    s = str(text)
-    return "".join(LATEX_SPECIALS.get(ch, ch) for ch in s)
+    return (text if isinstance(text, str) else str(text)).translate(_LATEX_TABLE)
+
+MONTHS = ("Jan", "Feb", "Mar", "Apr", "May", "Jun", "Jul", "Aug", "Sep", "Oct", "Nov", "Dec")
+_ISO_MONTH = re.compile(r"([0-9]{4})-([0-9]{2})(?:-([0-9]{2}))?")  # ASCII only: int() would accept other digits
 
 def fmt_month(value: str | None) -> str:
     if not value: return ""
+    if isinstance(value, str):
+        # Fast path for the YYYY-MM / YYYY-MM-DD values the editor emits
+        m = _ISO_MONTH.fullmatch(value)
+        if m:
+            y, mo, d = int(m[1]), int(m[2]), int(m[3] or 1)
+            try:
+                date(y, mo, d)
+                return f"{MONTHS[mo - 1]} {m[1]}"
+            except ValueError:
+                pass
+        return _fmt_month_parsed(value)
+    return _fmt_month_uncached(value)
+
+@lru_cache(maxsize=4096)
+def _fmt_month_parsed(value: str) -> str:
+    return _fmt_month_uncached(value)
+
+# Fixed default so partial dates ("2020") don't pick up today's month, which would
+# make results depend on when they were first cached.
+_PARSE_DEFAULT = datetime(2000, 1, 1)
+
+def _fmt_month_uncached(value: Any) -> str:
     try:
-        dt = dateparser.parse(value + "-01" if len(value) == 7 else value)
+        dt = dateparser.parse(value + "-01" if len(value) == 7 else value, default=_PARSE_DEFAULT)
         return dt.strftime("%b %Y")
     except Exception:
         return latex_escape(value)
@@ -34,8 +68,11 @@ def date_range(item: Dict[str, Any]) -> str:
     e = "Present" if item.get("current") else fmt_month(item.get("end"))
     return " — ".join([p for p in (s, e) if p])
 
-def build_env() -> Environment:
-    env = Environment(loader=FileSystemLoader(str(TEMPLATES)), autoescape=False, trim_blocks=True, lstrip_blocks=True)
+def build_env(bytecode_cache: FileSystemBytecodeCache | None = None) -> Environment:
+    env = Environment(
+        loader=FileSystemLoader(str(TEMPLATES)), autoescape=False, trim_blocks=True, lstrip_blocks=True,
+        auto_reload=True, bytecode_cache=bytecode_cache,
+    )
     env.filters["tex"] = latex_escape
     env.filters["fmt_month"] = fmt_month
     env.filters["date_range"] = date_range
@@ -45,37 +82,155 @@ def load_template() -> str:
     p = TEMPLATES / TEMPLATE_NAME
     return p.read_text("utf-8") if p.exists() else r"% Missing editor.tex.jinja"
 
+class TemplateRegistry:
+    """
+    Process-wide compiled templates. One Environment is built lazily (or at startup
+    via warm()); Jinja keeps compiled templates in its cache and, with auto_reload,
+    only recompiles when the template file's mtime changes. Compiled bytecode is
+    also persisted so a fresh process skips the parse/compile step.
+    """
+    def __init__(self):
+        self._env: Environment | None = None
+        self._lock = threading.Lock()
+
+    @property
+    def env(self) -> Environment:
+        if self._env is None:
+            with self._lock:
+                if self._env is None:
+                    self._env = build_env(FileSystemBytecodeCache())
+        return self._env
+
+    def get(self, name: str = TEMPLATE_NAME) -> Template:
+        try:
+            return self.env.get_template(name)
+        except TemplateNotFound:
+            return self.env.from_string(r"% Missing " + name)
+
+    def warm(self) -> None:
+        self.get()
+
+templates = TemplateRegistry()
+
+class SectionFragmentCache:
+    """
+    Rendered tex per section, keyed by a hash of the section's normalized content.
+    render_tex stitches the document from these, so after a patch only the
+    sections whose content changed go through the template again.
+    """
+    def __init__(self, max_entries: int = 1024):
+        self.max_entries = max_entries
+        self._frags: "OrderedDict[str, str]" = OrderedDict()
+        self._modules: Dict[int, Any] = {}  # id(Template) -> (Template, module exposing the macros)
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def _macro(self, tpl: Template):
+        entry = self._modules.get(id(tpl))
+        if entry is None or entry[0] is not tpl:
+            # A reloaded template is a new object; drop fragments rendered by the old one
+            entry = (tpl, tpl.make_module({"form": {}}))
+            with self._lock:
+                self._modules = {id(tpl): entry}
+                self._frags.clear()
+        return entry[1].render_section
+
+    def renderer(self, tpl: Template):
+        macro = self._macro(tpl)
+        def section_tex(sec: Dict[str, Any]) -> str:
+            key = hashlib.blake2b(dumps(sec, sort_keys=True, default=str), digest_size=16).hexdigest()
+            with self._lock:
+                frag = self._frags.get(key)
+                if frag is not None:
+                    self._frags.move_to_end(key)
+                    self.hits += 1
+                    return frag
+                self.misses += 1
+            frag = str(macro(sec))
+            with self._lock:
+                self._frags[key] = frag
+                while len(self._frags) > self.max_entries:
+                    self._frags.popitem(last=False)
+            return frag
+        return section_tex
+
+    def stats(self) -> Dict[str, int]:
+        return {"hits": self.hits, "misses": self.misses, "entries": len(self._frags)}
+
+section_cache = SectionFragmentCache()
+
 def render_tex(form: Dict[str, Any]) -> str:
-    env = build_env()
-    tpl = env.from_string(load_template())
-    return tpl.render(form=form)
+    tpl = templates.get()
+    return tpl.render(form=form, section_tex=section_cache.renderer(tpl))
 
 def _has(cmd: str) -> bool:
     return shutil.which(cmd) is not None
 
+ENGINES = ("tectonic", "latexmk", "pdflatex")
+
+def _engine() -> str | None:
+    """First available engine in fallback order (tectonic > latexmk > pdflatex)."""
+    return next((e for e in ENGINES if _has(e)), None)
+
+_template_digest: Dict[str, Any] = {"mtime": None, "digest": ""}
+
+def template_digest() -> str:
+    """Hash of the template source; part of the render cache key."""
+    p = TEMPLATES / TEMPLATE_NAME
+    try: mtime = p.stat().st_mtime_ns
+    except OSError: return ""
+    if _template_digest["mtime"] != mtime:
+        _template_digest["digest"] = hashlib.sha256(p.read_bytes()).hexdigest()[:16]
+        _template_digest["mtime"] = mtime
+    return _template_digest["digest"]
+
+compile_flight = SingleFlight()
+
+def _compile_error(e: Exception) -> HTTPException:
+    logs = getattr(e, "log", "")
+    return HTTPException(status_code=500, detail={"error": str(e), "log": logs[-8000:]})
+
+def _cache_key(tex: str) -> tuple[str, str]:
+    engine = _engine()
+    if engine is None:
+        raise _compile_error(LatexError("No LaTeX engine (tectonic/latexmk/pdflatex) found."))
+    return engine, cache_key(tex, engine, template_digest())
+
+def pdf_artifact_id(tex: str) -> str:
+    """Content hash under which the PDF for tex is (or will be) held in the render cache."""
+    return _cache_key(tex)[1]
+
 def compile_pdf(tex: str) -> bytes:
-    with tempfile.TemporaryDirectory() as tmpd:
-        tmp = Path(tmpd)
-        (tmp / "resume.tex").write_text(tex, encoding="utf-8")
-        logs = ""
-        try:
-            if _has("tectonic"):
-                cmd = ["tectonic","--keep-intermediates","--keep-logs","resume.tex"]
-            elif _has("latexmk"):
-                cmd = ["latexmk","-pdf","-interaction=nonstopmode","resume.tex"]
-            elif _has("pdflatex"):
-                cmd = ["pdflatex","-interaction=nonstopmode","resume.tex"]
-            else:
-                raise RuntimeError("No LaTeX engine (tectonic/latexmk/pdflatex) found.")
-            proc = subprocess.run(cmd, cwd=tmp, capture_output=True, text=True, timeout=180)
-            logs = (proc.stdout or "") + "\n" + (proc.stderr or "")
-            if proc.returncode != 0: raise RuntimeError(f"latex failed ({proc.returncode})")
-            pdf = tmp / "resume.pdf"
-            if not pdf.exists(): raise RuntimeError("PDF not generated.")
-            return pdf.read_bytes()
-        except Exception as e:
-            log = tmp / "resume.log"
-            if log.exists():
-                try: logs += "\n\n" + log.read_text(errors="ignore")
-                except: pass
-            raise HTTPException(status_code=500, detail={"error": str(e), "log": logs[-8000:]})
+    """Compile tex to PDF, served from the render cache when the same tex was compiled before."""
+    engine, key = _cache_key(tex)
+    pdf = render_cache.get(key)
+    if pdf is None:
+        # Identical concurrent compiles share one engine run
+        pdf = compile_flight.do(key, lambda: _compile_and_cache(tex, engine, key))
+    return pdf
+
+def _compile_and_cache(tex: str, engine: str, key: str) -> bytes:
+    try: pdf = latex_pool.compile(tex, engine)
+    except Exception as e: raise _compile_error(e) from e
+    render_cache.put(key, pdf)
+    return pdf
+
+async def compile_pdf_async(tex: str, background: bool = False) -> bytes:
+    """
+    Async compile_pdf for request handlers: the engine runs as an asyncio subprocess
+    behind compile_queue, so a full queue fails fast with 503 instead of holding a thread.
+    background=True takes a low-priority slot (pre-renders; 503 unless one is free now).
+    """
+    engine, key = _cache_key(tex)
+    pdf = render_cache.get(key)
+    if pdf is None:
+        pdf = await compile_flight.ado(key, lambda: _acompile_and_cache(tex, engine, key, background))
+    return pdf
+
+async def _acompile_and_cache(tex: str, engine: str, key: str, background: bool = False) -> bytes:
+    async with compile_queue.slot(background):
+        try: pdf = await latex_pool.acompile(tex, engine)
+        except Exception as e: raise _compile_error(e) from e
+    render_cache.put(key, pdf)
+    return pdf
@@ -0,0 +1,253 @@
+# app/routers/live.py
+"""
+Live editing channel: a WebSocket per user workspace carrying JSON patch ops.
+
+Client -> server, one JSON message per edit:
+  {"id"?: any, "ops": JsonPatchOp[], "rev"?: int, "render"?: "none"|"tex"|"pdf"|"both"}
+  `rev` is the last rev the client received (hello/ack); stale revs are rebased
+  like X-Resume-Rev on /resume/patch.
+
+Server -> client:
+  {"type": "hello", "rev"}                                   on connect
+  {"type": "ack", "rev", "updatedAt", "ids", "tex"?}          after each applied batch
+  {"type": "pdf", "rev", "pdfId", "pdfUrl"}                   when a requested PDF is ready
+  {"type": "error", "status", "detail", "ids"}               batch rejected or message malformed (nothing saved)
+
+Messages arriving within LIVE_COALESCE_MS of each other (or while the previous
+batch is being saved) are applied as one apply-normalize-persist cycle, and the
+ack lists every message id it covers. A batch renders the strongest render mode
+any of its messages asked for ("both" is "pdf": the ack already carries the tex).
+"""
+from __future__ import annotations
+
+import asyncio
+from typing import Any, Dict, List, Optional, Set
+
+from fastapi import APIRouter, Depends, HTTPException, Query, WebSocket, WebSocketDisconnect
+from pydantic import TypeAdapter, ValidationError
+from starlette.concurrency import run_in_threadpool
+
+from ..config import settings
+from ..models.schemas import JsonPatchOp
+from ..normalizers import normalize_resume, normalize_patched
+from ..patching import apply_json_patch
+from ..prerender import prerenderer
+from ..render_control import latest_wins
+from ..rendering import render_tex, compile_pdf_async, pdf_artifact_id
+from .patch import _autosave
+from .versions import get_user_id
+from .workspace import _read_current, _write_current, _rebase, _user_lock
+
+router = APIRouter(prefix="/workspace", tags=["live"])
+
+_OPS = TypeAdapter(List[JsonPatchOp])
+RENDER_ORDER = ("none", "tex", "pdf")
+
+
+class LiveStats:
+    def __init__(self):
+        self.connections = 0
+        self._counters: Dict[str, int] = {
+            "connections_total": 0, "messages": 0, "ops": 0, "batches": 0, "rejected_batches": 0,
+        }
+
+    def opened(self) -> None:
+        self.connections += 1
+        self._counters["connections_total"] += 1
+
+    def closed(self) -> None:
+        self.connections -= 1
+
+    def batch(self, messages: int, ops: int, ok: bool) -> None:
+        c = self._counters
+        c["messages"] += messages
+        if ok:
+            c["batches"] += 1
+            c["ops"] += ops
+        else:
+            c["rejected_batches"] += 1
+
+    def stats(self) -> Dict[str, Any]:
+        out: Dict[str, Any] = {"connections": self.connections, **self._counters}
+        m, b = out["messages"], out["batches"] + out["rejected_batches"]
+        out["coalesce_ratio"] = (1 - b / m) if m else 0.0  # share of messages that didn't need their own save
+        return out
+
+
+live_stats = LiveStats()
+
+
+def _frame_problem(msg: Any) -> Optional[str]:
+    """Why a client message can't be batched, or None (op contents are validated when applied)."""
+    if not isinstance(msg, dict):
+        return "Message must be a JSON object"
+    ops = msg.get("ops")
+    if ops is not None and not (isinstance(ops, list) and all(isinstance(o, dict) for o in ops)):
+        return "'ops' must be a list of JSON patch ops"
+    rev = msg.get("rev")
+    if rev is not None and (isinstance(rev, bool) or not isinstance(rev, int)):
+        return "'rev' must be an integer"
+    return None
+
+
+def _render_mode(value: Any) -> str:
+    """A message's render mode; "both" (tex + pdf, as on /resume/patch) is "pdf", whose ack carries the tex."""
+    mode = "pdf" if value == "both" else (value or "none")
+    if mode not in RENDER_ORDER:
+        raise ValueError(f"Unsupported render mode: {value!r}")
+    return mode
+
+
+def _apply_batch(uid: str, ops: List[Dict[str, Any]], client_rev: Optional[int],
+                 own_revs: Set[int], render: str) -> Dict[str, Any]:
+    """Blocking part of a batch (rebase, apply, normalize, persist, tex); runs in the threadpool."""
+    with _user_lock(uid):
+        state = _read_current(uid)
+        rev = int(state["rev"])
+        if client_rev is not None and client_rev != rev:
+            # Revs this connection wrote already contain the client's earlier ops
+            base_rev = client_rev
+            while base_rev < rev and base_rev + 1 in own_revs:
+                base_rev += 1
+            if base_rev != rev:
+                ops = _rebase(uid, base_rev, ops, state)
+        base = normalize_resume(state["data"])
+        updated = normalize_patched(base, apply_json_patch(base, ops), ops)
+        saved = _write_current(uid, updated)
+        if render != "pdf":
+            prerenderer.schedule(uid, saved["rev"], saved["data"])
+        _autosave(uid, saved, updated)
+        tex = render_tex(updated) if render != "none" else None
+    return {"rev": saved["rev"], "updatedAt": saved["updatedAt"], "tex": tex}
+
+
+class _Connection:
+    def __init__(self, ws: WebSocket, uid: str):
+        self.ws = ws
+        self.uid = uid
+        self.inbox: "asyncio.Queue[Optional[Dict[str, Any]]]" = asyncio.Queue()
+        self.own_revs: Set[int] = set()
+        self.renders: Set[asyncio.Task] = set()
+        self._send_lock = asyncio.Lock()
+
+    async def send(self, msg: Dict[str, Any]) -> None:
+        async with self._send_lock:
+            await self.ws.send_json(msg)
+
+    async def read(self) -> None:
+        try:
+            while True:
+                try:
+                    msg = await self.ws.receive_json()
+                except ValueError:
+                    await self.send({"type": "error", "status": 400, "detail": "Malformed JSON", "ids": []})
+                    continue
+                problem = _frame_problem(msg)
+                if problem:
+                    ids = [msg.get("id")] if isinstance(msg, dict) else []
+                    await self.send({"type": "error", "status": 400, "detail": problem, "ids": ids})
+                    continue
+                await self.inbox.put(msg)
+        except (WebSocketDisconnect, RuntimeError):
+            await self.inbox.put(None)
+
+    async def next_batch(self) -> Optional[List[Dict[str, Any]]]:
+        first = await self.inbox.get()
+        if first is None:
+            return None
+        batch = [first]
+        n_ops = len(first.get("ops") or [])
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + settings.LIVE_COALESCE_MS / 1000
+        while n_ops < settings.LIVE_MAX_BATCH_OPS:
+            remaining = deadline - loop.time()
+            if not self.inbox.empty():
+                msg = self.inbox.get_nowait()
+            elif remaining <= 0:
+                break
+            else:
+                try:
+                    msg = await asyncio.wait_for(self.inbox.get(), remaining)
+                except asyncio.TimeoutError:
+                    break
+            if msg is None:
+                self.inbox.put_nowait(None)  # apply what we have, then stop
+                break
+            batch.append(msg)
+            n_ops += len(msg.get("ops") or [])
+        return batch
+
+    async def flush(self, batch: List[Dict[str, Any]]) -> None:
+        ids = [m.get("id") for m in batch]
+        ops: List[Dict[str, Any]] = []
+        try:
+            for m in batch:
+                ops.extend(o.model_dump(by_alias=True) for o in _OPS.validate_python(m.get("ops") or []))
+            render = max((_render_mode(m.get("render")) for m in batch), key=RENDER_ORDER.index)
+            client_rev = batch[0].get("rev")
+            res = await run_in_threadpool(
+                _apply_batch, self.uid, ops, int(client_rev) if client_rev is not None else None, self.own_revs, render,
+            )
+        except HTTPException as e:
+            live_stats.batch(len(batch), len(ops), ok=False)
+            await self.send({"type": "error", "status": e.status_code, "detail": e.detail, "ids": ids})
+            return
+        except (ValidationError, ValueError, TypeError) as e:
+            live_stats.batch(len(batch), len(ops), ok=False)
+            await self.send({"type": "error", "status": 400, "detail": str(e), "ids": ids})
+            return
+        live_stats.batch(len(batch), len(ops), ok=True)
+        self.own_revs.add(res["rev"])
+        ack = {"type": "ack", "rev": res["rev"], "updatedAt": res["updatedAt"], "ids": ids}
+        if render in ("tex", "pdf"):
+            ack["tex"] = res["tex"]
+        await self.send(ack)
+        if render == "pdf":
+            task = asyncio.ensure_future(self._render_pdf(res["rev"], res["tex"]))
+            self.renders.add(task)
+            task.add_done_callback(self.renders.discard)
+
+    async def _render_pdf(self, rev: int, tex: str) -> None:
+        try:
+            # A newer batch's PDF supersedes this one (409 render_superseded, dropped silently)
+            await latest_wins.run(self.uid, rev, compile_pdf_async(tex))
+            pdf_id = pdf_artifact_id(tex)
+            await self.send({"type": "pdf", "rev": rev, "pdfId": pdf_id, "pdfUrl": f"/api/render/artifacts/{pdf_id}"})
+        except HTTPException as e:
+            if not (isinstance(e.detail, dict) and e.detail.get("error") == "render_superseded"):
+                await self.send({"type": "error", "status": e.status_code, "detail": e.detail, "ids": []})
+        except Exception:
+            pass  # socket closed while compiling
+
+
+@router.websocket("/live")
+async def workspace_live(
+    websocket: WebSocket,
+    uid: str = Depends(get_user_id),
+    user: Optional[str] = Query(default=None, description="User id (browsers can't set X-User-Id on websockets)"),
+):
+    conn = _Connection(websocket, user or uid)
+    await websocket.accept()
+    live_stats.opened()
+    reader = asyncio.ensure_future(conn.read())
+    try:
+        state = await run_in_threadpool(_read_current, conn.uid)
+        await conn.send({"type": "hello", "rev": state["rev"]})
+        while True:
+            batch = await conn.next_batch()
+            if batch is None:
+                break
+            await conn.flush(batch)
+    except (WebSocketDisconnect, RuntimeError):
+        pass
+    finally:
+        live_stats.closed()
+        reader.cancel()
+        for t in list(conn.renders):
+            t.cancel()
+
+
+@router.get("/live/stats")
+def workspace_live_stats():
+    """Open live connections, messages/ops received and how many saves coalescing avoided."""
+    return live_stats.stats()
@@ -2,15 +2,19 @@
 from __future__ import annotations
 
 import base64
-from typing import Optional
+from typing import Optional, Tuple
 
-from fastapi import APIRouter, Depends, Header, HTTPException, Query
+from fastapi import APIRouter, Depends, Header, HTTPException, Query, Request
+from starlette.concurrency import run_in_threadpool
 
-from ..models.schemas import PatchRequest, PatchResponse, ResumeForm
-from ..normalizers import normalize_resume
+from ..codec import CodecJSONResponse
+from ..models.schemas import PatchRequest, PatchResponse
+from ..normalizers import normalize_resume, normalize_patched
 from ..patching import apply_json_patch
-from ..rendering import render_tex, compile_pdf
-from .workspace import _read_current, _write_current, _snapshot
+from ..prerender import prerenderer
+from ..render_control import latest_wins, cancel_on_disconnect
+from ..rendering import render_tex, compile_pdf_async, pdf_artifact_id
+from .workspace import _read_current, _write_current, _snapshot, _rebase, _user_lock
 from .versions import get_user_id
 from .versions import overwrite_version as _overwrite_version_inner  # reuse logic
 
@@ -18,8 +22,9 @@ router = APIRouter(prefix="/resume", tags=["patch"])
 
 
 @router.post("/patch", response_model=PatchResponse)
-def resume_patch(
+async def resume_patch(
     req: PatchRequest,
+    request: Request,
     uid: str = Depends(get_user_id),
     # Optional concurrency header from client
     x_resume_rev: Optional[int] = Header(None, convert_underscores=False),
@@ -32,8 +37,10 @@ def resume_patch(
     overwrite the selected version or snapshot depending on autosave mode.
 
     Request:
-      - body: PatchRequest { base?: ResumeForm, ops: JsonPatchOp[], render?: "none"|"tex"|"pdf"|"both" }
-      - headers: X-Resume-Rev (optional optimistic concurrency)
+      - body: PatchRequest { base?: ResumeForm, ops: JsonPatchOp[], render?: "none"|"tex"|"pdf"|"both",
+                             pdf_delivery?: "inline"|"artifact" }
+      - headers: X-Resume-Rev (optional optimistic concurrency; a stale rev gets its ops
+                 rebased onto the current workspace, 409 rev_conflict only for overlapping paths)
       - query: snapshot=1 (optional), name="..." (optional)
 
     Behavior:
@@ -42,60 +49,107 @@ def resume_patch(
       - If workspace autosaveMode == "overwrite_version" and a selectedVersionId exists,
         also overwrites that version file.
       - If autosaveMode == "snapshot_on_save" OR snapshot=1 is passed, also snapshot.
-      - If render is "tex"/"pdf"/"both", returns rendered outputs.
+      - If render is "tex"/"pdf"/"both", returns rendered outputs. With pdf_delivery="artifact"
+        the PDF is not inlined; the response carries rendered_pdf_id/rendered_pdf_url instead.
+      - The patch is saved before the PDF is compiled, so a render that can't be done (full
+        queue, compile error, superseded by a newer patch) still returns 200 with the saved
+        doc and no PDF fields, plus render_error {status, detail}; fetch the PDF later from
+        /render/pdf. Re-sending the ops would apply them twice.
     """
     try:
-        # --- 1) Determine base doc & check concurrency against workspace ---
-        ws_state = _read_current(uid)
-        base_doc = req.base.dict() if req.base else ws_state["data"]
-
-        if x_resume_rev is not None and int(x_resume_rev) != int(ws_state["rev"]):
-            # Client's base is stale vs current workspace
-            raise HTTPException(
-                status_code=409,
-                detail={"error": "rev_conflict", "serverRev": ws_state["rev"]},
-            )
-
-        # Normalize the base and apply ops (RFC6902)
-        base_norm = normalize_resume(base_doc)
-        ops = [o.dict(by_alias=True) for o in req.ops]
-        updated = apply_json_patch(base_norm, ops)
-        updated = normalize_resume(updated)
-
-        # --- 2) Always save updated JSON to workspace (bumps rev) ---
-        saved_ws = _write_current(uid, updated)
-
-        # --- 3) Autosave behavior (overwrite or snapshot) ---
-        mode = saved_ws.get("autosaveMode") or "workspace"
-        selected_vid = saved_ws.get("selectedVersionId")
-
-        # Overwrite the selected version file if mode demands and a selection exists
-        if mode == "overwrite_version" and selected_vid:
-            # Call the FastAPI function implementation directly (bypass DI) using __wrapped__
-            _overwrite_version_inner(
-                vid=selected_vid, payload=updated, uid=uid
-            )
-
-
-        # Snapshot on save if mode requires OR explicit snapshot query param is set
-        if mode == "snapshot_on_save" or snapshot:
-            _snapshot(uid, updated, name)
-
-        # --- 4) Build response (with optional render) ---
-        out: dict = {"updated": ResumeForm(**updated)}
-        if req.render in ("tex", "both"):
-            out["rendered_tex"] = render_tex(updated)
+        out, tex, rev = await run_in_threadpool(_patch_and_save, req, uid, x_resume_rev, snapshot, name)
         if req.render in ("pdf", "both"):
-            # Reuse tex if already rendered; otherwise render fresh
-            tex = out.get("rendered_tex") or render_tex(updated)
-            pdf_bytes = compile_pdf(tex)
-            out["rendered_pdf_b64"] = base64.b64encode(pdf_bytes).decode("ascii")
-
-        return out
+            try:
+                # A newer patch from the same user cancels this compile (render_error 409 render_superseded)
+                pdf_bytes = await cancel_on_disconnect(request, latest_wins.run(uid, rev, compile_pdf_async(tex)))
+            except HTTPException as e:
+                out["render_error"] = {"status": e.status_code, "detail": e.detail}
+                return CodecJSONResponse(content=out)
+            if req.pdf_delivery == "artifact":
+                # Bytes are served (cacheable, by content hash) from GET /render/artifacts/{id}
+                out["rendered_pdf_id"] = pdf_artifact_id(tex)
+                out["rendered_pdf_url"] = f"/api/render/artifacts/{out['rendered_pdf_id']}"
+            else:
+                out["rendered_pdf_b64"] = base64.b64encode(pdf_bytes).decode("ascii")
+
+        # The updated doc is already normalized; serialize it as-is rather than
+        # re-validating it through PatchResponse.
+        return CodecJSONResponse(content=out)
 
     except HTTPException:
-        # Bubble FastAPI HTTP errors (e.g., conflicts) unchanged
+        # Bubble FastAPI HTTP errors (e.g., conflicts, full render queue) unchanged
         raise
     except Exception as e:
         # Any other unexpected error
         raise HTTPException(status_code=400, detail=str(e))
+
+
+def _patch_and_save(
+    req: PatchRequest,
+    uid: str,
+    x_resume_rev: Optional[int],
+    snapshot: Optional[bool],
+    name: Optional[str],
+) -> Tuple[dict, Optional[str], int]:
+    """Blocking part of resume_patch (apply, normalize, persist, tex); runs in the threadpool."""
+    with _user_lock(uid):
+        return _patch_and_save_locked(req, uid, x_resume_rev, snapshot, name)
+
+
+def _patch_and_save_locked(
+    req: PatchRequest,
+    uid: str,
+    x_resume_rev: Optional[int],
+    snapshot: Optional[bool],
+    name: Optional[str],
+) -> Tuple[dict, Optional[str], int]:
+    # --- 1) Determine base doc & check concurrency against workspace ---
+    ws_state = _read_current(uid)
+    base_doc = req.base.dict() if req.base else ws_state["data"]
+    ops = [o.dict(by_alias=True) for o in req.ops]
+
+    if x_resume_rev is not None and int(x_resume_rev) != int(ws_state["rev"]):
+        # Client's base is stale vs current workspace: rebase its ops onto the
+        # current doc (409 rev_conflict with the paths if they overlap newer edits)
+        ops = _rebase(uid, int(x_resume_rev), ops, ws_state)
+        base_doc = ws_state["data"]
+
+    # Normalize the base and apply ops (RFC6902). Only the sections/items the ops
+    # touched are re-normalized; the result is a NormalizedResume, so the later
+    # stages below skip re-validating it.
+    base_norm = normalize_resume(base_doc)
+    updated = normalize_patched(base_norm, apply_json_patch(base_norm, ops), ops)
+
+    # --- 2) Always save updated JSON to workspace (bumps rev) ---
+    saved_ws = _write_current(uid, updated)
+    if req.render not in ("pdf", "both"):
+        # The editor usually asks for the PDF next; warm the render cache (if enabled)
+        prerenderer.schedule(uid, saved_ws["rev"], saved_ws["data"])
+
+    # --- 3) Autosave behavior (overwrite or snapshot) ---
+    _autosave(uid, saved_ws, updated, snapshot, name)
+
+    # --- 4) Build response (with optional tex render; PDF is compiled async by the caller) ---
+    out: dict = {"updated": updated, "rendered_tex": None, "rendered_pdf_b64": None,
+                 "rendered_pdf_id": None, "rendered_pdf_url": None}
+    tex = render_tex(updated) if req.render in ("tex", "pdf", "both") else None
+    if req.render in ("tex", "both"):
+        out["rendered_tex"] = tex
+    return out, tex, saved_ws["rev"]
+
+
+def _autosave(uid: str, saved_ws: dict, updated: dict, snapshot: Optional[bool] = False, name: Optional[str] = None) -> None:
+    """Apply the workspace autosave mode after a save (also used by the live channel)."""
+    mode = saved_ws.get("autosaveMode") or "workspace"
+    selected_vid = saved_ws.get("selectedVersionId")
+
+    # Overwrite the selected version file if mode demands and a selection exists
+    if mode == "overwrite_version" and selected_vid:
+        # Call the FastAPI function implementation directly (bypass DI) using __wrapped__
+        _overwrite_version_inner(
+            vid=selected_vid, payload=updated, uid=uid
+        )
+
+    # Snapshot on save if mode requires OR explicit snapshot query param is set
+    if mode == "snapshot_on_save" or snapshot:
+        _snapshot(uid, updated, name)
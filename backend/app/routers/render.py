@@ -1,10 +1,20 @@
 # backend/app/routers/render.py
 from __future__ import annotations
-import json
-from fastapi import APIRouter, HTTPException, Response
+import re
+from typing import Optional
+from fastapi import APIRouter, Depends, Header, HTTPException, Request, Response
+from starlette.concurrency import run_in_threadpool
+from ..codec import dumps
 from ..models.schemas import RenderRequest  # <-- Corrected import
 from ..normalizers import normalize_resume
-from ..rendering import render_tex, compile_pdf
+from ..rendering import render_tex, compile_pdf_async, section_cache, compile_flight
+from ..render_cache import render_cache
+from ..latex_pool import latex_pool
+from ..compile_queue import compile_queue
+from ..prerender import prerenderer
+from ..render_control import latest_wins, cancel_on_disconnect
+from ..render_jobs import render_jobs, public_job
+from .versions import get_user_id
 
 router = APIRouter(prefix="/render", tags=["render"])
 
@@ -22,18 +32,29 @@ def render_latex(req: RenderRequest):
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
+def _form_tex(req: RenderRequest) -> str:
+    # Use .model_dump() instead of the deprecated .dict()
+    return render_tex(normalize_resume(req.form.model_dump()))
+
 @router.post("/pdf")
-def render_pdf(req: RenderRequest):
+async def render_pdf(
+    req: RenderRequest,
+    request: Request,
+    uid: str = Depends(get_user_id),
+    # Optional workspace rev the form was taken from; newer revs cancel older in-flight renders
+    x_resume_rev: Optional[int] = Header(None, convert_underscores=False),
+):
     try:
-        # Use .model_dump() instead of the deprecated .dict()
-        form = normalize_resume(req.form.model_dump())
-        tex = render_tex(form)
-        pdf = compile_pdf(tex)
+        tex = await run_in_threadpool(_form_tex, req)
+        pdf = await cancel_on_disconnect(request, latest_wins.run(uid, x_resume_rev, compile_pdf_async(tex)))
         return Response(
             content=pdf,
             media_type="application/pdf",
             headers={"Content-Disposition": "attachment; filename=resume.pdf"}
         )
+    except HTTPException:
+        # Compile errors, queue-full 503s (with Retry-After) and superseded 409s pass through as-is
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
@@ -42,11 +63,76 @@ def export_json(req: RenderRequest):
     try:
         # Use .model_dump() instead of the deprecated .dict()
         form = normalize_resume(req.form.model_dump())
-        payload = json.dumps(form, ensure_ascii=False, indent=2).encode("utf-8")
+        payload = dumps(form, pretty=True)
         return Response(
             content=payload,
             media_type="application/json",
             headers={"Content-Disposition": "attachment; filename=resume.json"}
         )
     except Exception as e:
-        raise HTTPException(status_code=500, detail=str(e))
\ No newline at end of file
+        raise HTTPException(status_code=500, detail=str(e))
+
+@router.get("/stats")
+def render_stats():
+    """Render cache counters, section fragment reuse, compile queue depth/wait times and worker pool state."""
+    return {
+        "cache": render_cache.stats(),
+        "sections": section_cache.stats(),
+        "singleflight": compile_flight.stats(),
+        "queue": compile_queue.stats(),
+        "workers": latex_pool.stats(),
+        "prerender": prerenderer.stats(),
+        "cancellation": latest_wins.stats(),
+    }
+
+
+@router.post("/jobs", status_code=202)
+async def create_render_job(req: RenderRequest, uid: str = Depends(get_user_id)):
+    """Queue a PDF render and return its job id right away; poll GET /render/jobs/{id}."""
+    job = await render_jobs.submit(req.form.model_dump(), uid)
+    return public_job(job)
+
+@router.get("/jobs/{job_id}")
+def get_render_job(job_id: str, uid: str = Depends(get_user_id)):
+    job = render_jobs.get(job_id, uid)
+    if not job: raise HTTPException(404, "Render job not found")
+    return public_job(job)
+
+@router.get("/jobs/{job_id}/pdf")
+def download_render_job(job_id: str, uid: str = Depends(get_user_id)):
+    job = render_jobs.get(job_id, uid)
+    if not job: raise HTTPException(404, "Render job not found")
+    if job["status"] != "done":
+        raise HTTPException(409, detail={"error": "job_not_done", "status": job["status"]})
+    pdf = render_jobs.pdf(job_id)
+    if pdf is None: raise HTTPException(404, "Render job not found")
+    return Response(
+        content=pdf,
+        media_type="application/pdf",
+        headers={"Content-Disposition": "attachment; filename=resume.pdf"}
+    )
+
+
+_ARTIFACT_ID = re.compile(r"^[0-9a-f]{64}$")
+
+@router.get("/artifacts/{artifact_id}")
+def get_artifact(artifact_id: str, if_none_match: Optional[str] = Header(None)):
+    """
+    Compiled PDF by content hash (rendered_pdf_id from /resume/patch). The bytes behind an
+    id never change, so clients and proxies may cache them forever.
+    """
+    if not _ARTIFACT_ID.match(artifact_id):
+        raise HTTPException(404, "Artifact not found")
+    etag = f'"{artifact_id}"'
+    headers = {"ETag": etag, "Cache-Control": "public, max-age=31536000, immutable"}
+    if if_none_match and etag in [t.strip() for t in if_none_match.split(",")]:
+        return Response(status_code=304, headers=headers)
+    pdf = render_cache.get(artifact_id)
+    if pdf is None:
+        # Evicted from the render cache: the client should re-request a render
+        raise HTTPException(404, "Artifact not found")
+    return Response(
+        content=pdf,
+        media_type="application/pdf",
+        headers={**headers, "Content-Disposition": "inline; filename=resume.pdf"},
+    )
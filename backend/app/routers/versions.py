@@ -1,41 +1,41 @@
 # backend/app/routers/versions.py
 from __future__ import annotations
-import json
+import re
 from pathlib import Path
 from uuid import uuid4
 from datetime import datetime, timezone
-from typing import Any, Dict, List, Optional
-from fastapi import APIRouter, Depends, Header, HTTPException, Body
+from typing import Any, Dict, Iterator, List, Literal, Optional, Tuple, Union
+from fastapi import APIRouter, Depends, Header, HTTPException, Body, Query
+from fastapi.responses import StreamingResponse
 from pydantic import BaseModel
+from ..codec import dumps
+from ..config import settings
 from ..normalizers import normalize_resume
 # Import the Pydantic models for version creation
 from ..models.schemas import VersionCreate, VersionInDB
+from ..storage import store, VERSIONS_ROOT
 
 router = APIRouter(prefix="/versions", tags=["versions"])
-ROOT = Path("data/versions")
+ROOT = VERSIONS_ROOT
 
 def get_user_id(x_user_id: Optional[str] = Header(None)) -> str:
     return x_user_id or "demo"
 
 def _udir(uid: str) -> Path:
+    """Per-user directory (uploads; also the version files with STORAGE_BACKEND=file)."""
     p = ROOT / uid
     p.mkdir(parents=True, exist_ok=True)
     return p
 
-def _idx(uid: str) -> Path: return _udir(uid) / "index.json"
-
 def _read_idx(uid: str) -> List[Dict[str, Any]]:
-    p = _idx(uid)
-    if not p.exists(): return []
-    try: return json.loads(p.read_text("utf-8"))
-    except: return []
+    return store.list_versions(uid)
 
 def _write_idx(uid: str, rows: List[Dict[str, Any]]):
-    _idx(uid).write_text(json.dumps(rows, ensure_ascii=False, indent=2), encoding="utf-8")
+    store.write_index(uid, rows)
 
 # --- NEW ENDPOINT TO HANDLE VERSION CREATION ---
 @router.post("", response_model=VersionInDB)
-async def create_version(version: VersionCreate, uid: str = Depends(get_user_id)):
+def create_version(version: VersionCreate, uid: str = Depends(get_user_id)):
     """
     Saves a new version of the resume from the optimization flow.
     """
@@ -46,13 +46,8 @@ async def create_version(version: VersionCreate, uid: str = Depends(get_user_id)
         # Use 'created_at' for consistency
         meta = {"id": vid, "name": version.name, "created_at": created}
 
-        # Save the content of the new version to a file
-        (_udir(uid) / f"{vid}.json").write_text(json.dumps(data, ensure_ascii=False, indent=2), encoding="utf-8")
-        
-        # Update the index with the new version's metadata
-        rows = _read_idx(uid)
-        rows.insert(0, meta)
-        _write_idx(uid, rows)
+        # Save the content and put the new version's metadata at the top of the index
+        store.add_version(uid, meta, data)
         
         # Return the newly created version's data, conforming to the VersionInDB model
         return VersionInDB(id=vid, name=version.name, content=data)
@@ -67,16 +62,77 @@ def list_versions(uid: str = Depends(get_user_id)):
 
 @router.get("/load/{vid}")
 def load_version(vid: str, uid: str = Depends(get_user_id)):
-    p = _udir(uid) / f"{vid}.json"
-    if not p.exists(): raise HTTPException(404, "Version not found")
-    data = json.loads(p.read_text("utf-8"))
-    
-    rows = _read_idx(uid)
-    meta = next((r for r in rows if r.get("id") == vid), {})
+    found = store.get_version(uid, vid)
+    if found is None: raise HTTPException(404, "Version not found")
+    meta, data = found
 
     return {"data": normalize_resume(data), "id": vid, "name": meta.get("name")}
 
 
+class VersionBatchLoadRequest(BaseModel):
+    ids: Union[Literal["all"], List[str]]
+
+# Version ids are uuid4 strings; anything else (paths, doc names) never reaches the store
+_VERSION_ID = re.compile(r"[A-Za-z0-9][A-Za-z0-9_-]{0,127}")
+
+def _requested(uid: str, ids: Optional[List[str]]) -> Iterator[Tuple[str, Optional[Dict[str, Any]], Any]]:
+    """store.iter_versions for the valid ids, in request order; invalid ids come back with row None."""
+    if ids is None:
+        yield from store.iter_versions(uid)
+        return
+    found = store.iter_versions(uid, [vid for vid in ids if _VERSION_ID.fullmatch(vid)])
+    for vid in ids:
+        yield next(found) if _VERSION_ID.fullmatch(vid) else (vid, None, None)
+
+def _batch_items(uid: str, ids: Optional[List[str]]) -> Iterator[Dict[str, Any]]:
+    """/load items for each version (index read once); identical documents are normalized once."""
+    normalized: Dict[int, Any] = {}
+    seen: List[Any] = []  # keeps documents alive so their ids stay unique
+    try:
+        for vid, meta, data in _requested(uid, ids):
+            if meta is None:
+                yield {"id": vid, "error": "invalid_id"}
+                continue
+            if data is None:
+                yield {"id": vid, "error": "not_found"}
+                continue
+            try:
+                if isinstance(data, Exception):
+                    raise data
+                if id(data) not in normalized:
+                    normalized[id(data)] = normalize_resume(data)
+                    seen.append(data)
+            except Exception:
+                yield {"id": vid, "error": "unreadable"}  # one bad version doesn't cut the stream short
+                continue
+            yield {"data": normalized[id(data)], "id": vid, "name": meta.get("name")}
+    except Exception:
+        yield {"error": "batch_failed"}  # the store failed mid-batch: say so rather than truncate
+
+@router.post("/batch-load")
+def batch_load_versions(
+    request: VersionBatchLoadRequest,
+    uid: str = Depends(get_user_id),
+    format: Literal["auto", "json", "ndjson"] = Query(default="auto"),
+    accept: Optional[str] = Header(None),
+):
+    """
+    Load many versions in one call: {"ids": [...]} or {"ids": "all"} (every listed version, newest first).
+    Items look like /load responses; ids that aren't in the user's index give {"id", "error": "not_found"},
+    malformed ids {"id", "error": "invalid_id"} and undecodable versions {"id", "error": "unreadable"}.
+    Returns {"versions": [...]}, or one item per line as application/x-ndjson, streamed as
+    versions are read, for format=ndjson / Accept: application/x-ndjson / "all" / more than
+    VERSION_BATCH_STREAM_OVER ids.
+    """
+    ids = None if request.ids == "all" else request.ids
+    stream = format == "ndjson" or (format == "auto" and (
+        "application/x-ndjson" in (accept or "") or ids is None or len(ids) > settings.VERSION_BATCH_STREAM_OVER
+    ))
+    if not stream:
+        return {"versions": list(_batch_items(uid, ids))}
+    return StreamingResponse((dumps(item) + b"\n" for item in _batch_items(uid, ids)), media_type="application/x-ndjson")
+
+
 @router.post("/save")
 def save_version(
     payload: Dict[str, Any] = Body(...),
@@ -88,25 +144,19 @@ def save_version(
     created = datetime.now(timezone.utc).isoformat()
     meta = {"id": vid, "name": name or f"Resume {created[:10]}", "created_at": created}
 
-    (_udir(uid) / f"{vid}.json").write_text(json.dumps(data, ensure_ascii=False, indent=2), encoding="utf-8")
-    rows = _read_idx(uid); rows.insert(0, meta); _write_idx(uid, rows)
+    store.add_version(uid, meta, data)
     return meta
 
 @router.delete("/delete/{vid}")
 def delete_version(vid: str, uid: str = Depends(get_user_id)):
-    rows = [r for r in _read_idx(uid) if r["id"] != vid]
-    _write_idx(uid, rows)
-    p = _udir(uid) / f"{vid}.json"
-    if p.exists(): p.unlink()
+    store.delete_version(uid, vid)
     return {"ok": True}
 
 @router.post("/overwrite/{vid}")
 def overwrite_version(vid: str, payload: Dict[str, Any] = Body(...), uid: str = Depends(get_user_id)):
-    p = _udir(uid) / f"{vid}.json"
-    if not p.exists():
-        raise HTTPException(404, "Version not found")
     data = normalize_resume(payload)
-    p.write_text(json.dumps(data, ensure_ascii=False, indent=2), encoding="utf-8")
+    if not store.put_version_content(uid, vid, data):
+        raise HTTPException(404, "Version not found")
     return {"ok": True, "id": vid}
 
 
@@ -122,16 +172,7 @@ def rename_version(
     """
     Renames a specific version by updating its 'name' in the index.
     """
-    rows = _read_idx(uid)
-    version_found = False
-    for r in rows:
-        if r.get("id") == vid:
-            r["name"] = request.new_name
-            version_found = True
-            break
-    
-    if not version_found:
+    if not store.rename_version(uid, vid, request.new_name):
         raise HTTPException(status_code=404, detail="Version not found in index")
 
-    _write_idx(uid, rows)
     return {"message": "Version renamed successfully", "id": vid, "new_name": request.new_name}
\ No newline at end of file
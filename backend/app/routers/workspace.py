@@ -1,15 +1,20 @@
 # app/routers/workspace.py
 from __future__ import annotations
 
-import json
+import threading
 from datetime import datetime, timezone
-from pathlib import Path
-from typing import Any, Dict, Optional
+from typing import Any, Dict, List, Optional, Tuple
 
 from fastapi import APIRouter, Body, Depends, Header, HTTPException, Query
 
+from ..config import settings
 from ..normalizers import normalize_resume
-from .versions import get_user_id, _udir
+from ..patching import apply_json_patch, diff_docs
+from ..rebase import RebaseConflict, rebase_ops
+from ..storage import store
+from ..undo import undo_history
+from ..prerender import prerenderer
+from .versions import get_user_id
 from .versions import _read_idx, _write_idx  # imported for completeness (not strictly required here)
 
 router = APIRouter(prefix="/workspace", tags=["workspace"])
@@ -22,65 +27,98 @@ DEFAULT_META = {
     "updatedAt": None,            # ISO timestamp
     "selectedVersionId": None,    # currently selected version (if any)
     "autosaveMode": "workspace",  # "workspace" | "overwrite_version" | "snapshot_on_save"
+    "snapshotRev": None,          # rev current.json was written at (None: same as rev)
 }
 
+# Parsed state per user, valid while the stored "current.meta" document is unchanged.
+# The cached document is shared with callers: treat it as read-only.
+_STATE_CACHE: Dict[str, Tuple[Any, Dict[str, Any]]] = {}
+_user_locks: Dict[str, threading.RLock] = {}
+_user_locks_guard = threading.Lock()
+
 # ------------------------------------------------------------------------------
 # Helpers
 # ------------------------------------------------------------------------------
-def _current_paths(uid: str):
-    """Return paths to current.json and current.meta.json for a user."""
-    root = _udir(uid)
-    return root / "current.json", root / "current.meta.json"
+def _user_lock(uid: str) -> threading.RLock:
+    """Serializes a user's read-check-write sequences (reentrant: callers may hold it around _write_current)."""
+    with _user_locks_guard:
+        return _user_locks.setdefault(uid, threading.RLock())
 
 
 def _read_current(uid: str) -> Dict[str, Any]:
-    """Read current workspace state (json + meta). Creates empty defaults if missing."""
-    cur, meta = _current_paths(uid)
+    """Read current workspace state (snapshot + op log replay + meta). Creates empty defaults if missing."""
+    stamp = store.doc_token(uid, "current.meta")
+    cached = _STATE_CACHE.get(uid)
+    if cached is not None and stamp is not None and cached[0] == stamp:
+        return dict(cached[1])
 
     # Default empty resume
     data = {"fullName": "", "email": "", "phone": "", "sections": []}
-    if cur.exists():
-        try:
-            data = json.loads(cur.read_text("utf-8"))
-        except Exception:
-            # leave default data
-            pass
+    data = store.read_doc(uid, "current", default=data)
 
     meta_obj = DEFAULT_META.copy()
-    if meta.exists():
-        try:
-            m = json.loads(meta.read_text("utf-8"))
-            # only accept known keys
-            for k in DEFAULT_META.keys():
-                if k in m:
-                    meta_obj[k] = m[k]
-        except Exception:
-            pass
-
-    return {
+    m = store.read_doc(uid, "current.meta", default={})
+    if isinstance(m, dict):
+        # only accept known keys
+        for k in DEFAULT_META.keys():
+            if k in m:
+                meta_obj[k] = m[k]
+
+    # Replay log entries newer than the snapshot
+    rev = int(meta_obj["rev"] or 0)
+    snap_rev = rev if meta_obj["snapshotRev"] is None else int(meta_obj["snapshotRev"])
+    if snap_rev < rev:
+        for e in store.read_log(uid, upto=rev):
+            if e["rev"] > snap_rev:
+                data = apply_json_patch(data, e["ops"])
+
+    state = {
         "rev": meta_obj["rev"],
         "updatedAt": meta_obj["updatedAt"],
         "data": data,
         "selectedVersionId": meta_obj["selectedVersionId"],
         "autosaveMode": meta_obj["autosaveMode"],
+        "snapshotRev": snap_rev,
     }
+    if stamp is not None:
+        _STATE_CACHE[uid] = (stamp, state)
+    return dict(state)
 
 
 def _write_current(
     uid: str,
     data: Dict[str, Any],
     meta_overrides: Optional[Dict[str, Any]] = None,
+    step: Optional[Dict[str, int]] = None,
 ) -> Dict[str, Any]:
-    """Write the current workspace resume + meta; bump rev, set updatedAt."""
-    cur, meta = _current_paths(uid)
+    """
+    Record a new workspace revision: bump rev, set updatedAt, and append the diff from
+    the previous document (and its inverse) to the op log, where the undo history reads
+    it. Undo/redo pass step={"undo"|"redo": rev of the edit} to tag their entry. The
+    "current" snapshot is only rewritten (compacted) every WORKSPACE_COMPACT_EVERY
+    revisions or when meta fields change.
+    """
+    with _user_lock(uid):
+        return _write_current_locked(uid, data, meta_overrides, step)
+
+
+def _write_current_locked(uid: str, data: Dict[str, Any], meta_overrides: Optional[Dict[str, Any]],
+                          step: Optional[Dict[str, int]]) -> Dict[str, Any]:
     now = datetime.now(timezone.utc).isoformat()
 
     current = _read_current(uid)
     rev = int(current["rev"]) + 1
 
-    # Normalize and write resume JSON
+    # Normalize, then log the change (a small append) instead of rewriting the document
     data = normalize_resume(data)
-    cur.write_text(json.dumps(data, ensure_ascii=False, indent=2), encoding="utf-8")
+    ops, inv = diff_docs(current["data"], data), diff_docs(data, current["data"])
+    docs: Dict[str, Any] = {}
+    trim = None
+    snap_rev = current["snapshotRev"]
+    if meta_overrides or not store.has_doc(uid, "current") or rev - snap_rev >= settings.WORKSPACE_COMPACT_EVERY:
+        docs["current"] = data
+        snap_rev = rev
+        trim = (settings.WORKSPACE_OPLOG_KEEP, rev)
 
     # Build meta to write
     meta_obj = DEFAULT_META.copy()
@@ -94,17 +132,67 @@ def _write_current(
     )
     if meta_overrides:
         meta_obj.update(meta_overrides)
+    meta_obj["snapshotRev"] = snap_rev
 
-    meta.write_text(json.dumps(meta_obj, ensure_ascii=False), encoding="utf-8")
+    docs["current.meta"] = meta_obj
+    entry = {"rev": rev, "updatedAt": now, "ops": ops, "inv": inv, **(step or {})}
+    store.write_revision(uid, entry, docs, trim)
+    undo_history.record(uid, entry)
 
     # Return the full state (including meta fields for convenience)
-    return {
+    state = {
         "rev": rev,
         "updatedAt": now,
         "data": data,
         "selectedVersionId": meta_obj["selectedVersionId"],
         "autosaveMode": meta_obj["autosaveMode"],
+        "snapshotRev": snap_rev,
     }
+    stamp = store.doc_token(uid, "current.meta")
+    if stamp is not None:
+        _STATE_CACHE[uid] = (stamp, state)
+    return dict(state)
+
+
+def _history(uid: str, since: int, state: Dict[str, Any]) -> Optional[List[Dict[str, Any]]]:
+    """Log entries after `since` up to the current rev, or None if the log doesn't reach back that far."""
+    rev = int(state["rev"])
+    if since > rev:
+        return None
+    entries = [e for e in store.read_log(uid, upto=rev) if e["rev"] > since]
+    return entries if len(entries) == rev - since else None
+
+
+def _doc_at(uid: str, since: int, state: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+    """The workspace document as it was at rev `since` (current doc with inverse ops applied)."""
+    entries = _history(uid, since, state)
+    if entries is None or any("inv" not in e for e in entries):
+        return None
+    doc = state["data"]
+    for e in reversed(entries):
+        doc = apply_json_patch(doc, e["inv"])
+    return doc
+
+
+def _rev_conflict(state: Dict[str, Any], conflicts: List[str]) -> HTTPException:
+    return HTTPException(
+        status_code=409,
+        detail={"error": "rev_conflict", "serverRev": state["rev"], "conflicts": conflicts},
+    )
+
+
+def _rebase(uid: str, since: int, ops: List[Dict[str, Any]], state: Dict[str, Any]) -> List[Dict[str, Any]]:
+    """
+    Rebase ops written against rev `since` onto the current rev. Raises 409 rev_conflict
+    listing the overlapping paths, or with no paths if `since` is no longer in the log.
+    """
+    entries = _history(uid, since, state)
+    if entries is None:
+        raise _rev_conflict(state, [])
+    try:
+        return rebase_ops(ops, [op for e in entries for op in e["ops"]])
+    except RebaseConflict as e:
+        raise _rev_conflict(state, e.paths)
 
 
 def _snapshot(uid: str, data: Dict[str, Any], name: Optional[str] = None) -> Dict[str, Any]:
@@ -126,7 +214,33 @@ def workspace_get(uid: str = Depends(get_user_id)):
     """
     Get the current workspace (draft) JSON + meta for the authenticated user.
     """
-    return _read_current(uid)
+    state = _read_current(uid)
+    state.pop("snapshotRev", None)
+    return state
+
+
+@router.get("/changes")
+def workspace_changes(
+    since: int = Query(..., ge=0, description="Last rev the client has"),
+    uid: str = Depends(get_user_id),
+):
+    """
+    Ops the client is missing since `since`: {rev, updatedAt, reset: false, changes: [{rev, updatedAt, ops}]}.
+    Applying each entry's ops in order brings a document at `since` to `rev`.
+    If the log no longer reaches back that far (or `since` is ahead of the server),
+    returns {reset: true, data} with the full document instead.
+    """
+    state = _read_current(uid)
+    rev = int(state["rev"])
+    out: Dict[str, Any] = {"rev": rev, "updatedAt": state["updatedAt"], "reset": False, "changes": []}
+    if since == rev:
+        return out
+    entries = _history(uid, since, state)
+    if entries is None:
+        out.update(reset=True, data=state["data"])
+        return out
+    out["changes"] = [{"rev": e["rev"], "updatedAt": e.get("updatedAt"), "ops": e["ops"]} for e in entries]
+    return out
 
 
 @router.post("/save")
@@ -141,14 +255,21 @@ def workspace_save(
 ):
     """
     Save/overwrite the current workspace JSON. Bumps revision.
-    If X-Resume-Rev header is provided and mismatches, returns 409.
+    If X-Resume-Rev is provided and stale, the client's changes since that rev are
+    merged onto the current document; overlapping edits return 409 rev_conflict
+    with the conflicting paths.
     Optionally creates a version snapshot (?snapshot=1&name=...).
     """
-    current = _read_current(uid)
-    if x_resume_rev is not None and int(x_resume_rev) != int(current["rev"]):
-        raise HTTPException(status_code=409, detail={"error": "rev_conflict", "serverRev": current["rev"]})
-
-    out = _write_current(uid, payload)
+    with _user_lock(uid):
+        current = _read_current(uid)
+        if x_resume_rev is not None and int(x_resume_rev) != int(current["rev"]):
+            base = _doc_at(uid, int(x_resume_rev), current)
+            if base is None:
+                raise _rev_conflict(current, [])
+            ops = _rebase(uid, int(x_resume_rev), diff_docs(base, normalize_resume(payload)), current)
+            payload = apply_json_patch(current["data"], ops)
+        out = _write_current(uid, payload)
+    prerenderer.schedule(uid, out["rev"], out["data"])
 
     snap = _snapshot(uid, out["data"], name) if snapshot else None
     return {
@@ -160,6 +281,44 @@ def workspace_save(
     }
 
 
+def _step_history(uid: str, stack: str) -> Dict[str, Any]:
+    """Undo (stack="undo") or redo (stack="redo") one edit by applying its logged patch."""
+    with _user_lock(uid):
+        current = _read_current(uid)
+        undo, redo = undo_history.stacks(uid, int(current["rev"]))
+        src = undo if stack == "undo" else redo
+        if not src:
+            raise HTTPException(status_code=409, detail={"error": f"nothing_to_{stack}"})
+        entry = src[-1]
+        ops = entry["inv"] if stack == "undo" else entry["ops"]
+        try:
+            data = apply_json_patch(current["data"], ops)
+        except ValueError:
+            # The document was changed behind the history's back; it no longer applies
+            undo_history.clear(uid, int(current["rev"]))
+            raise HTTPException(status_code=409, detail={"error": "history_diverged", "serverRev": current["rev"]})
+        out = _write_current(uid, data, step={stack: entry["rev"]})
+        shift = -1 if stack == "undo" else 1
+        return {"rev": out["rev"], "updatedAt": out["updatedAt"], "ops": ops,
+                "undo": len(undo) + shift, "redo": len(redo) - shift}
+
+
+@router.post("/undo")
+def workspace_undo(uid: str = Depends(get_user_id)):
+    """
+    Revert the most recent edit. Returns {rev, updatedAt, ops, undo, redo}: `ops` is the
+    patch that was applied (clients at rev-1 can apply it instead of reloading), and
+    undo/redo are the remaining stack depths. 409 nothing_to_undo when the history is empty.
+    """
+    return _step_history(uid, "undo")
+
+
+@router.post("/redo")
+def workspace_redo(uid: str = Depends(get_user_id)):
+    """Re-apply the most recently undone edit (same response shape as /undo)."""
+    return _step_history(uid, "redo")
+
+
 @router.post("/snapshot")
 def workspace_snapshot(
     name: Optional[str] = Query(default=None),
@@ -183,10 +342,10 @@ def workspace_select(
     Pass no version_id to clear selection (start fresh with current data).
     """
     if version_id:
-        vp = _udir(uid) / f"{version_id}.json"
-        if not vp.exists():
+        found = store.get_version(uid, version_id)
+        if found is None:
             raise HTTPException(status_code=404, detail="Version not found")
-        data = json.loads(vp.read_text("utf-8"))
+        data = found[1]
         out = _write_current(uid, data, meta_overrides={"selectedVersionId": version_id})
         return {
             "ok": True,
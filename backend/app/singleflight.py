@@ -0,0 +1,123 @@
+# app/singleflight.py
+"""
+Single-flight: concurrent calls with the same key share one execution.
+
+The first caller for a key runs the work; callers arriving while it's in
+flight wait for it and get the same result (or the same exception). Blocking
+callers (do) and coroutines (ado) share one registry, so a compile started by
+a worker thread also serves the requests awaiting it on the event loop, and
+the other way round. An async waiter that is cancelled only detaches itself;
+shared async work is cancelled once no waiter (of either kind) is left, and a
+blocking caller whose shared work was cancelled that way runs it itself.
+"""
+from __future__ import annotations
+
+import asyncio
+import threading
+from typing import Any, Awaitable, Callable, Dict, List, Optional, TypeVar
+
+T = TypeVar("T")
+
+
+class _Call:
+    __slots__ = ("event", "result", "error", "task", "waiters", "blocking", "futures")
+
+    def __init__(self, task: Optional[asyncio.Future] = None):
+        self.event = threading.Event()
+        self.result: Any = None
+        self.error: BaseException | None = None
+        self.task = task  # the shared coroutine, or None when a blocking caller runs the work
+        self.waiters = 0  # async callers awaiting task
+        self.blocking = 0  # blocking callers waiting on event
+        self.futures: List[asyncio.Future] = []  # async callers waiting on a blocking leader
+
+
+def _resolve(fut: asyncio.Future, result: Any, error: BaseException | None) -> None:
+    if fut.done():
+        return
+    if error is not None:
+        fut.set_exception(error)
+    else:
+        fut.set_result(result)
+
+
+class SingleFlight:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._calls: Dict[str, _Call] = {}
+        self._counters: Dict[str, int] = {"calls": 0, "executions": 0, "coalesced": 0}
+
+    def _finish(self, key: str, call: _Call, result: Any, error: BaseException | None) -> None:
+        with self._lock:
+            if self._calls.get(key) is call:
+                del self._calls[key]
+            call.result, call.error = result, error
+            futures, call.futures = call.futures, []
+        call.event.set()
+        for fut in futures:
+            fut.get_loop().call_soon_threadsafe(_resolve, fut, result, error)
+
+    def _task_done(self, key: str, call: _Call, task: asyncio.Future) -> None:
+        if task.cancelled():
+            self._finish(key, call, None, asyncio.CancelledError())
+        elif task.exception() is not None:
+            self._finish(key, call, None, task.exception())
+        else:
+            self._finish(key, call, task.result(), None)
+
+    def do(self, key: str, fn: Callable[[], T]) -> T:
+        while True:
+            with self._lock:
+                self._counters["calls"] += 1
+                call = self._calls.get(key)
+                if call is None:
+                    call = self._calls[key] = _Call()
+                    self._counters["executions"] += 1
+                    break
+                call.blocking += 1
+                self._counters["coalesced"] += 1
+            call.event.wait()
+            if isinstance(call.error, asyncio.CancelledError):
+                continue  # async callers gave up on the shared work: run it here instead
+            if call.error is not None:
+                raise call.error
+            return call.result
+        try:
+            result = fn()
+        except BaseException as e:
+            self._finish(key, call, None, e)
+            raise
+        self._finish(key, call, result, None)
+        return result
+
+    async def ado(self, key: str, fn: Callable[[], Awaitable[T]]) -> T:
+        with self._lock:
+            self._counters["calls"] += 1
+            call = self._calls.get(key)
+            if call is None or (call.task is not None and call.task.done()):
+                call = self._calls[key] = _Call(asyncio.ensure_future(fn()))
+                call.task.add_done_callback(lambda t, c=call: self._task_done(key, c, t))
+                self._counters["executions"] += 1
+            else:
+                self._counters["coalesced"] += 1
+            if call.task is None:
+                fut = asyncio.get_running_loop().create_future()
+                call.futures.append(fut)
+        if call.task is None:
+            return await fut  # cancelling only detaches: a blocking leader can't be stopped
+        task = call.task
+        call.waiters += 1
+        try:
+            return await asyncio.shield(task)
+        except asyncio.CancelledError:
+            if not task.done() and call.waiters == 1 and not call.blocking:
+                task.cancel()  # last interested caller left: stop the shared work
+            raise
+        finally:
+            call.waiters -= 1
+
+    def stats(self) -> Dict[str, Any]:
+        out: Dict[str, Any] = dict(self._counters)
+        out["coalesce_ratio"] = (out["coalesced"] / out["calls"]) if out["calls"] else 0.0
+        out["in_flight"] = len(self._calls)
+        return out
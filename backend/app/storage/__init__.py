@@ -0,0 +1,40 @@
+# app/storage/__init__.py
+"""
+Persistence for versions and workspace state. `store` is the backend picked by
+STORAGE_BACKEND: "file" (default, data/versions/<uid>/), "sqlite" (SQLITE_PATH) or
+"postgres" (DATABASE_URL), wrapped in DeltaStore (content-addressed, delta-compressed
+version documents).
+Import existing file data with `python -m app.storage.migrate`.
+"""
+from __future__ import annotations
+
+from pathlib import Path
+
+from ..config import settings
+from .base import Store
+from .delta import DeltaStore
+from .file import FileStore
+from .postgres import PgRepository, PostgresStore, asyncpg_dsn
+from .sqlite import SqliteStore
+
+VERSIONS_ROOT = Path("data/versions")
+
+
+def make_backend(backend: str) -> Store:
+    backend = (backend or "file").strip().lower()
+    if backend == "file":
+        return FileStore(VERSIONS_ROOT)
+    if backend == "sqlite":
+        return SqliteStore(Path(settings.SQLITE_PATH))
+    if backend == "postgres":
+        return PostgresStore(asyncpg_dsn(settings.DATABASE_URL), settings.PG_POOL_MIN_SIZE, settings.PG_POOL_MAX_SIZE)
+    raise ValueError(f"Unknown STORAGE_BACKEND: {backend!r}")
+
+
+def make_store(backend: str) -> Store:
+    return DeltaStore(make_backend(backend), settings.VERSION_KEYFRAME_EVERY, settings.VERSION_COMPRESSION)
+
+
+store = make_store(settings.STORAGE_BACKEND)
+
+__all__ = ["Store", "FileStore", "SqliteStore", "PgRepository", "PostgresStore", "DeltaStore", "make_backend", "make_store", "store", "VERSIONS_ROOT"]
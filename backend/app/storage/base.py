@@ -0,0 +1,112 @@
+# app/storage/base.py
+"""
+Storage interface for per-user versions and workspace state.
+
+A store keeps, per user id:
+  - versions: an ordered index of {"id", "name", "created_at", ...} rows (newest
+    first) plus one resume document per version id;
+  - docs: small named JSON documents ("current", "current.meta", "undo");
+  - the workspace op log: {"rev", "updatedAt", "ops", "inv"} entries keyed by rev.
+
+Implementations: FileStore (the data/versions/<uid>/ tree), SqliteStore and
+PostgresStore.
+"""
+from __future__ import annotations
+
+from typing import Any, Dict, Hashable, Iterator, List, Optional, Tuple
+
+
+class Store:
+    # ---------- versions ----------
+    def list_versions(self, uid: str) -> List[Dict[str, Any]]:
+        """Index rows, newest first."""
+        raise NotImplementedError
+
+    def get_version(self, uid: str, vid: str) -> Optional[Tuple[Dict[str, Any], Any]]:
+        """(index row, document) for a version, or None. The row is {} if the version isn't indexed."""
+        raise NotImplementedError
+
+    def iter_versions(self, uid: str, vids: Optional[List[str]] = None) -> Iterator[Tuple[str, Dict[str, Any], Any]]:
+        """
+        (vid, index row, document) for each id in `vids`, or for every indexed version
+        (newest first) when vids is None, reading the index once. Only indexed versions
+        are read: ids missing from the index get ({}, None), as do versions without a
+        document. A document that can't be decoded is yielded as the exception raised.
+        """
+        rows = self.list_versions(uid)
+        by_id = {str(r.get("id")): r for r in rows}
+        for vid in (list(by_id) if vids is None else vids):
+            if vid not in by_id:
+                yield vid, {}, None
+                continue
+            found = self.get_version(uid, vid)
+            yield vid, by_id[vid], (found[1] if found is not None else None)
+
+    def add_version(self, uid: str, meta: Dict[str, Any], data: Any) -> None:
+        """Store a new version's document and put its row at the top of the index."""
+        raise NotImplementedError
+
+    def put_version_content(self, uid: str, vid: str, data: Any) -> bool:
+        """Replace an existing version's document; False if there is no such version."""
+        raise NotImplementedError
+
+    def rename_version(self, uid: str, vid: str, name: str) -> bool:
+        raise NotImplementedError
+
+    def delete_version(self, uid: str, vid: str) -> bool:
+        raise NotImplementedError
+
+    def write_index(self, uid: str, rows: List[Dict[str, Any]]) -> None:
+        """Replace the whole index (order and metadata); versions left out are dropped from it."""
+        raise NotImplementedError
+
+    # ---------- workspace documents ----------
+    def read_doc(self, uid: str, name: str, default: Any = None) -> Any:
+        raise NotImplementedError
+
+    def write_docs(self, uid: str, docs: Dict[str, Any]) -> None:
+        raise NotImplementedError
+
+    def delete_docs(self, uid: str, names: List[str]) -> None:
+        raise NotImplementedError
+
+    def doc_token(self, uid: str, name: str) -> Optional[Hashable]:
+        """Changes whenever the document's content does; None if it doesn't exist (used as a cache key)."""
+        raise NotImplementedError
+
+    def has_doc(self, uid: str, name: str) -> bool:
+        return self.doc_token(uid, name) is not None
+
+    # ---------- workspace op log ----------
+    def append_log(self, uid: str, entry: Dict[str, Any]) -> None:
+        raise NotImplementedError
+
+    def read_log(self, uid: str, upto: Optional[int] = None) -> List[Dict[str, Any]]:
+        """Entries in rev order, ignoring revs past `upto` (left behind by a write that died before its meta update)."""
+        raise NotImplementedError
+
+    def trim_log(self, uid: str, keep: int, upto: Optional[int] = None) -> None:
+        """Keep only the newest `keep` entries up to `upto`."""
+        raise NotImplementedError
+
+    def write_revision(self, uid: str, entry: Dict[str, Any], docs: Dict[str, Any],
+                       trim: Optional[Tuple[int, int]] = None) -> None:
+        """
+        Persist one workspace revision: the log entry, then the docs in the given order
+        (meta last, so a crash in between leaves the previous revision readable), then
+        the optional (keep, upto) log trim. Stores with transactions do this atomically.
+        """
+        self.append_log(uid, entry)
+        self.write_docs(uid, docs)
+        if trim is not None:
+            self.trim_log(uid, *trim)
+
+    async def startup(self) -> None:
+        """Called from the app's startup hook (open pools etc.)."""
+
+    async def shutdown(self) -> None:
+        """Called from the app's shutdown hook."""
+        self.close()
+
+    def close(self) -> None:
+        pass
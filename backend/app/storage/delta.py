@@ -0,0 +1,272 @@
+# app/storage/delta.py
+"""
+Content-addressed, delta-compressed version documents on top of any Store.
+
+A version's stored document is only a pointer, {"_blob": <hash>}, where the hash
+is the blake2b digest of the (key-sorted) resume JSON. Each distinct content is
+stored once, as the doc "blob.<hash>", in one of two forms:
+  {"c": "zstd" | "zlib", "z": "<base64>"}                 the full document, compressed (a keyframe)
+  {"key": <hash>, "ops": [...]} / {"key": <hash>, "c", "z"} JSON patch from a keyframe blob
+Identical snapshots therefore share a blob, and a version loads with at most
+two blob reads plus one patch (decoded blobs are cached: they never change).
+
+A new keyframe is cut once VERSION_KEYFRAME_EVERY blobs share the current one,
+or when a delta would be at least half the keyframe's compressed size; with
+VERSION_KEYFRAME_EVERY <= 1 every blob is a keyframe. The doc "versions.delta"
+counts references to each blob (versions pointing at it, plus delta blobs for a
+keyframe); a blob is deleted as soon as nothing references it any more. When
+that blob is the current keyframe, the next new blob starts a fresh one. State is
+written before the pointer on add and after it on delete, so an interrupted
+write can leak a blob but never drop one still in use.
+
+Documents stored before this layer (plain resumes) are returned as they are.
+"""
+from __future__ import annotations
+
+import base64
+import hashlib
+import threading
+import zlib
+from collections import OrderedDict
+from typing import Any, Dict, Hashable, Iterator, List, Optional, Tuple
+
+from ..codec import dumps, loads
+from ..patching import apply_json_patch, diff_docs
+from .base import Store
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+REF = "_blob"
+STATE_DOC = "versions.delta"
+BLOB_PREFIX = "blob."
+INLINE_DELTA_BYTES = 512  # smaller deltas stay plain JSON: compression + base64 wouldn't pay off
+BLOB_CACHE_SIZE = 256
+
+
+def _pick(requested: str) -> str:
+    available = (["zstd"] if zstandard is not None else []) + ["zlib"]
+    if requested in available:
+        return requested
+    return available[0]
+
+
+def _pack(raw: bytes, method: str) -> Dict[str, str]:
+    z = zstandard.ZstdCompressor(level=10).compress(raw) if method == "zstd" else zlib.compress(raw, 9)
+    return {"c": method, "z": base64.b64encode(z).decode("ascii")}
+
+
+def _unpack(rec: Dict[str, Any]) -> bytes:
+    z = base64.b64decode(rec["z"])
+    if rec.get("c") == "zstd":
+        if zstandard is None:
+            raise ValueError("zstd-compressed version needs the zstandard package")
+        return zstandard.ZstdDecompressor().decompress(z)
+    return zlib.decompress(z)
+
+
+def content_hash(data: Any) -> str:
+    return hashlib.blake2b(dumps(data, sort_keys=True), digest_size=16).hexdigest()
+
+
+class DeltaStore(Store):
+    def __init__(self, inner: Store, every: int, compression: str = "auto"):
+        self.inner = inner
+        self.every = max(0, int(every))
+        self.method = _pick((compression or "auto").lower())
+        self._cache: "OrderedDict[Tuple[str, str], Any]" = OrderedDict()
+        self._cache_lock = threading.Lock()
+        self._locks: Dict[str, threading.Lock] = {}
+        self._locks_guard = threading.Lock()
+
+    def _lock(self, uid: str) -> threading.Lock:
+        with self._locks_guard:
+            return self._locks.setdefault(uid, threading.Lock())
+
+    # ---------- reading ----------
+    def _cached(self, uid: str, name: str) -> Any:
+        """Decoded blob (or legacy keyframe) doc `name`; shared, so treat it as read-only."""
+        with self._cache_lock:
+            doc = self._cache.get((uid, name))
+            if doc is not None:
+                self._cache.move_to_end((uid, name))
+                return doc
+        rec = self.inner.read_doc(uid, name)
+        if not isinstance(rec, dict):
+            raise ValueError(f"Missing version blob {name}")
+        if "key" in rec:
+            ops = rec["ops"] if "ops" in rec else loads(_unpack(rec))
+            doc = apply_json_patch(self._cached(uid, BLOB_PREFIX + rec["key"]), ops)
+        else:
+            doc = loads(_unpack(rec))
+        with self._cache_lock:
+            self._cache[(uid, name)] = doc
+            while len(self._cache) > BLOB_CACHE_SIZE:
+                self._cache.popitem(last=False)
+        return doc
+
+    def _decode(self, uid: str, rec: Any) -> Any:
+        if isinstance(rec, dict) and REF in rec:
+            return self._cached(uid, BLOB_PREFIX + rec[REF])
+        return rec
+
+    # ---------- reference counting ----------
+    def _state(self, uid: str) -> Dict[str, Any]:
+        st = self.inner.read_doc(uid, STATE_DOC, default=None)
+        if not isinstance(st, dict):
+            st = {}
+        return {
+            "key": st.get("key"), "keySize": int(st.get("keySize") or 0), "n": int(st.get("n") or 0),
+            "refs": dict(st.get("refs") or {}),
+        }
+
+    def _store_blob(self, uid: str, data: Any, state: Dict[str, Any]) -> str:
+        """Hash of `data`'s blob, writing the blob if it's new; counts one reference for the caller."""
+        h = content_hash(data)
+        refs = state["refs"]
+        if h not in refs:
+            rec, kid = None, state["key"]
+            if self.every > 1 and kid and state["n"] < self.every - 1:
+                try:
+                    ops = diff_docs(self._cached(uid, BLOB_PREFIX + kid), data)
+                except ValueError:
+                    ops = None
+                if ops is not None:
+                    raw = dumps(ops)
+                    rec = {"key": kid, "ops": ops} if len(raw) <= INLINE_DELTA_BYTES else {"key": kid, **_pack(raw, self.method)}
+                    if len(rec.get("z", raw)) * 2 >= state["keySize"]:
+                        rec = None  # drifted too far from the keyframe: start a new one
+            if rec is None:
+                rec = _pack(dumps(data), self.method)
+                if self.every > 1:
+                    state.update(key=h, keySize=len(rec["z"]), n=0)
+            else:
+                state["n"] += 1
+                refs[kid] = refs.get(kid, 0) + 1
+            self.inner.write_docs(uid, {BLOB_PREFIX + h: rec})
+            refs[h] = 0
+        refs[h] += 1
+        return h
+
+    def _release(self, uid: str, state: Dict[str, Any], name: str, garbage: List[str]) -> None:
+        """Drop one reference to blob doc `name`; unreferenced blobs (and their keyframe refs) go to `garbage`."""
+        ref = name.split(".", 1)[1]
+        n = state["refs"].get(ref, 0) - 1
+        if n > 0:
+            state["refs"][ref] = n
+            return
+        state["refs"].pop(ref, None)
+        garbage.append(name)
+        if ref == state["key"]:
+            state.update(key=None, keySize=0, n=0)  # the next new blob is a keyframe
+        rec = self.inner.read_doc(uid, name)
+        if isinstance(rec, dict) and "key" in rec:
+            self._release(uid, state, BLOB_PREFIX + rec["key"], garbage)
+
+    def _release_record(self, uid: str, state: Dict[str, Any], rec: Any, garbage: List[str]) -> None:
+        if isinstance(rec, dict) and REF in rec:
+            self._release(uid, state, BLOB_PREFIX + rec[REF], garbage)
+
+    def _save_state(self, uid: str, state: Dict[str, Any], garbage: List[str] = ()) -> None:
+        self.inner.write_docs(uid, {STATE_DOC: state})
+        if garbage:
+            self.inner.delete_docs(uid, list(garbage))
+            with self._cache_lock:
+                for name in garbage:
+                    self._cache.pop((uid, name), None)
+
+    # ---------- versions ----------
+    def list_versions(self, uid: str) -> List[Dict[str, Any]]:
+        return self.inner.list_versions(uid)
+
+    def get_version(self, uid: str, vid: str) -> Optional[Tuple[Dict[str, Any], Any]]:
+        found = self.inner.get_version(uid, vid)
+        if found is None:
+            return None
+        return found[0], self._decode(uid, found[1])
+
+    def iter_versions(self, uid: str, vids: Optional[List[str]] = None) -> Iterator[Tuple[str, Dict[str, Any], Any]]:
+        for vid, meta, rec in self.inner.iter_versions(uid, vids):
+            if rec is not None and not isinstance(rec, Exception):
+                try:
+                    rec = self._decode(uid, rec)
+                except (ValueError, KeyError, TypeError) as e:
+                    rec = e  # one unreadable version doesn't end the batch
+            yield vid, meta, rec
+
+    def add_version(self, uid: str, meta: Dict[str, Any], data: Any) -> None:
+        with self._lock(uid):
+            state = self._state(uid)
+            h = self._store_blob(uid, data, state)
+            self._save_state(uid, state)
+            self.inner.add_version(uid, meta, {REF: h})
+
+    def put_version_content(self, uid: str, vid: str, data: Any) -> bool:
+        with self._lock(uid):
+            found = self.inner.get_version(uid, vid)
+            if found is None:
+                return False
+            state, garbage = self._state(uid), []
+            h = self._store_blob(uid, data, state)
+            self._save_state(uid, state)
+            if not self.inner.put_version_content(uid, vid, {REF: h}):
+                return False
+            self._release_record(uid, state, found[1], garbage)
+            self._save_state(uid, state, garbage)
+            return True
+
+    def rename_version(self, uid: str, vid: str, name: str) -> bool:
+        return self.inner.rename_version(uid, vid, name)
+
+    def delete_version(self, uid: str, vid: str) -> bool:
+        with self._lock(uid):
+            found = self.inner.get_version(uid, vid)
+            ok = self.inner.delete_version(uid, vid)
+            if found is not None:
+                state, garbage = self._state(uid), []
+                self._release_record(uid, state, found[1], garbage)
+                self._save_state(uid, state, garbage)
+            return ok
+
+    def write_index(self, uid: str, rows: List[Dict[str, Any]]) -> None:
+        self.inner.write_index(uid, rows)
+
+    # ---------- everything else is the inner store's ----------
+    def read_doc(self, uid: str, name: str, default: Any = None) -> Any:
+        return self.inner.read_doc(uid, name, default)
+
+    def write_docs(self, uid: str, docs: Dict[str, Any]) -> None:
+        self.inner.write_docs(uid, docs)
+
+    def delete_docs(self, uid: str, names: List[str]) -> None:
+        self.inner.delete_docs(uid, names)
+
+    def doc_token(self, uid: str, name: str) -> Optional[Hashable]:
+        return self.inner.doc_token(uid, name)
+
+    def has_doc(self, uid: str, name: str) -> bool:
+        return self.inner.has_doc(uid, name)
+
+    def append_log(self, uid: str, entry: Dict[str, Any]) -> None:
+        self.inner.append_log(uid, entry)
+
+    def read_log(self, uid: str, upto: Optional[int] = None) -> List[Dict[str, Any]]:
+        return self.inner.read_log(uid, upto)
+
+    def trim_log(self, uid: str, keep: int, upto: Optional[int] = None) -> None:
+        self.inner.trim_log(uid, keep, upto)
+
+    def write_revision(self, uid: str, entry: Dict[str, Any], docs: Dict[str, Any],
+                       trim: Optional[Tuple[int, int]] = None) -> None:
+        self.inner.write_revision(uid, entry, docs, trim)
+
+    async def startup(self) -> None:
+        await self.inner.startup()
+
+    async def shutdown(self) -> None:
+        await self.inner.shutdown()
+
+    def close(self) -> None:
+        self.inner.close()
@@ -0,0 +1,125 @@
+# app/storage/file.py
+"""
+The original on-disk layout, one directory per user under data/versions/<uid>/:
+index.json (version rows, newest first), <vid>.json per version, <name>.json per
+workspace document (current.json, current.meta.json, undo.json) and oplog.jsonl.
+"""
+from __future__ import annotations
+
+import hashlib
+import threading
+from pathlib import Path
+from typing import Any, Dict, Hashable, Iterator, List, Optional, Tuple
+
+from ..codec import read_json, write_json
+from . import oplog
+from .base import Store
+
+
+class FileStore(Store):
+    def __init__(self, root: Path):
+        self.root = Path(root)
+        self._index_lock = threading.Lock()  # index.json read-modify-write
+
+    def udir(self, uid: str) -> Path:
+        p = self.root / uid
+        p.mkdir(parents=True, exist_ok=True)
+        return p
+
+    def _read_index(self, uid: str) -> List[Dict[str, Any]]:
+        rows = read_json(self.udir(uid) / "index.json", default=[])
+        return rows if isinstance(rows, list) else []
+
+    # ---------- versions ----------
+    def list_versions(self, uid: str) -> List[Dict[str, Any]]:
+        return self._read_index(uid)
+
+    def get_version(self, uid: str, vid: str) -> Optional[Tuple[Dict[str, Any], Any]]:
+        p = self.udir(uid) / f"{vid}.json"
+        if not p.exists():
+            return None
+        data = read_json(p)
+        meta = next((r for r in self._read_index(uid) if r.get("id") == vid), {})
+        return meta, data
+
+    def iter_versions(self, uid: str, vids: Optional[List[str]] = None) -> Iterator[Tuple[str, Dict[str, Any], Any]]:
+        root = self.udir(uid)
+        by_id = {str(r.get("id")): r for r in self._read_index(uid)}
+        for vid in (list(by_id) if vids is None else vids):
+            if vid not in by_id:
+                yield vid, {}, None  # never build a path from an id the index doesn't hold
+                continue
+            yield vid, by_id[vid], read_json(root / f"{vid}.json", default=None)
+
+    def add_version(self, uid: str, meta: Dict[str, Any], data: Any) -> None:
+        write_json(self.udir(uid) / f"{meta['id']}.json", data)
+        with self._index_lock:
+            rows = self._read_index(uid)
+            rows.insert(0, meta)
+            self.write_index(uid, rows)
+
+    def put_version_content(self, uid: str, vid: str, data: Any) -> bool:
+        p = self.udir(uid) / f"{vid}.json"
+        if not p.exists():
+            return False
+        write_json(p, data)
+        return True
+
+    def rename_version(self, uid: str, vid: str, name: str) -> bool:
+        with self._index_lock:
+            rows = self._read_index(uid)
+            row = next((r for r in rows if r.get("id") == vid), None)
+            if row is None:
+                return False
+            row["name"] = name
+            self.write_index(uid, rows)
+        return True
+
+    def delete_version(self, uid: str, vid: str) -> bool:
+        with self._index_lock:
+            rows = self._read_index(uid)
+            kept = [r for r in rows if r.get("id") != vid]
+            self.write_index(uid, kept)
+        p = self.udir(uid) / f"{vid}.json"
+        existed = p.exists()
+        if existed:
+            p.unlink()
+        return existed or len(kept) != len(rows)
+
+    def write_index(self, uid: str, rows: List[Dict[str, Any]]) -> None:
+        write_json(self.udir(uid) / "index.json", rows)
+
+    # ---------- workspace documents ----------
+    def read_doc(self, uid: str, name: str, default: Any = None) -> Any:
+        return read_json(self.udir(uid) / f"{name}.json", default=default)
+
+    def write_docs(self, uid: str, docs: Dict[str, Any]) -> None:
+        root = self.udir(uid)
+        for name, obj in docs.items():
+            write_json(root / f"{name}.json", obj)
+
+    def delete_docs(self, uid: str, names: List[str]) -> None:
+        root = self.udir(uid)
+        for name in names:
+            (root / f"{name}.json").unlink(missing_ok=True)
+
+    def doc_token(self, uid: str, name: str) -> Optional[Hashable]:
+        # A content hash: (mtime, size) misses a same-size rewrite within the mtime granularity
+        try:
+            raw = (self.udir(uid) / f"{name}.json").read_bytes()
+        except OSError:
+            return None
+        return hashlib.blake2b(raw, digest_size=16).digest()
+
+    def has_doc(self, uid: str, name: str) -> bool:
+        return (self.udir(uid) / f"{name}.json").exists()
+
+    # ---------- workspace op log ----------
+    def append_log(self, uid: str, entry: Dict[str, Any]) -> None:
+        oplog.append(self.udir(uid), entry)
+
+    def read_log(self, uid: str, upto: Optional[int] = None) -> List[Dict[str, Any]]:
+        return oplog.read(self.udir(uid), upto)
+
+    def trim_log(self, uid: str, keep: int, upto: Optional[int] = None) -> None:
+        oplog.trim(self.udir(uid), keep, upto)
@@ -0,0 +1,105 @@
+# app/storage/migrate.py
+"""
+Copy a data/versions/<uid>/ tree into another store:
+
+    python -m app.storage.migrate [--src data/versions] [--db data/storage.db]
+    python -m app.storage.migrate --to postgres [--dsn postgresql://...]   (default: DATABASE_URL)
+
+For every user directory: every version document (including ones missing from
+the index), the index in order, the workspace documents (with version blobs)
+and the op log. Stored documents are copied as they are, blob pointers included. Re-running
+overwrites what an earlier run imported, so it is safe to repeat before switching
+STORAGE_BACKEND.
+"""
+from __future__ import annotations
+
+import argparse
+from pathlib import Path
+from typing import Dict
+
+import anyio
+import anyio.to_thread
+
+from ..codec import read_json
+from .base import Store
+from .delta import BLOB_PREFIX, STATE_DOC
+from .file import FileStore
+from .postgres import PostgresStore, asyncpg_dsn
+from .sqlite import SqliteStore
+
+DOC_NAMES = ("current", "current.meta", "undo", STATE_DOC)
+
+
+def _is_doc(name: str) -> bool:
+    return name in DOC_NAMES or name.startswith(BLOB_PREFIX)
+
+
+def migrate_user(src: FileStore, dst: Store, uid: str) -> Dict[str, int]:
+    root = src.root / uid
+    versions = 0
+    for p in sorted(root.glob("*.json")):
+        if p.stem == "index" or _is_doc(p.stem):
+            continue
+        data = read_json(p, default=None)
+        if data is not None:
+            dst.add_version(uid, {"id": p.stem}, data)
+            versions += 1
+    # Then the real order and metadata; files missing from the index stay loadable by id but unlisted
+    rows = src.list_versions(uid)
+    dst.write_index(uid, rows)
+    names = list(DOC_NAMES) + sorted(p.stem for p in root.glob("*.json") if p.stem.startswith(BLOB_PREFIX))
+    docs = {name: src.read_doc(uid, name) for name in names}
+    dst.write_docs(uid, {k: v for k, v in docs.items() if v is not None})
+    log = src.read_log(uid)
+    for entry in log:
+        dst.append_log(uid, entry)
+    return {"versions": versions, "indexed": len(rows), "log": len(log)}
+
+
+def migrate(src_root: Path, dst: Store) -> Dict[str, Dict[str, int]]:
+    src = FileStore(src_root)
+    report: Dict[str, Dict[str, int]] = {}
+    if src_root.is_dir():
+        for d in sorted(src_root.iterdir()):
+            if d.is_dir():
+                report[d.name] = migrate_user(src, dst, d.name)
+    return report
+
+
+async def _migrate_postgres(src_root: Path, dsn: str) -> Dict[str, Dict[str, int]]:
+    dst = PostgresStore(dsn)
+    await dst.startup()
+    try:
+        # PostgresStore's sync methods call back into this loop from a worker thread
+        return await anyio.to_thread.run_sync(migrate, src_root, dst)
+    finally:
+        await dst.shutdown()
+
+
+def main(argv=None) -> None:
+    from ..config import settings
+
+    ap = argparse.ArgumentParser(description="Import data/versions into a SQLite or Postgres store")
+    ap.add_argument("--src", default="data/versions", help="versions root (default: data/versions)")
+    ap.add_argument("--to", choices=("sqlite", "postgres"), default="sqlite", help="target store (default: sqlite)")
+    ap.add_argument("--db", default=settings.SQLITE_PATH, help=f"SQLite file (default: {settings.SQLITE_PATH})")
+    ap.add_argument("--dsn", default=None, help="Postgres DSN (default: DATABASE_URL)")
+    args = ap.parse_args(argv)
+    if args.to == "postgres":
+        target = asyncpg_dsn(args.dsn or settings.DATABASE_URL)
+        report = anyio.run(_migrate_postgres, Path(args.src), target)
+        target = target.split("@")[-1]  # don't print the password
+    else:
+        target = args.db
+        dst = SqliteStore(Path(args.db))
+        try:
+            report = migrate(Path(args.src), dst)
+        finally:
+            dst.close()
+    for uid, n in report.items():
+        print(f"{uid}: {n['versions']} versions ({n['indexed']} indexed), {n['log']} log entries")
+    print(f"migrated {len(report)} users into {target}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,64 @@
+# app/storage/oplog.py
+"""
+Append-only per-user operation log (oplog.jsonl next to current.json), as kept by FileStore.
+
+One line per workspace revision: {"rev", "updatedAt", "ops", "inv"} where ops is
+the RFC 6902 patch from the previous revision's document to this one and inv the
+patch back (used to rebuild older revisions for rebasing stale writes). current.json
+is a snapshot at meta["snapshotRev"]; the document at meta["rev"] is that
+snapshot with the newer log entries replayed on top. The log is trimmed to the
+last WORKSPACE_OPLOG_KEEP entries whenever the snapshot is rewritten.
+"""
+from __future__ import annotations
+
+import os
+import threading
+from pathlib import Path
+from typing import Any, Dict, List
+
+from ..codec import dumps, loads
+
+LOG_NAME = "oplog.jsonl"
+
+_append_lock = threading.Lock()
+
+
+def log_path(root: Path) -> Path:
+    return root / LOG_NAME
+
+
+def append(root: Path, entry: Dict[str, Any]) -> None:
+    line = dumps(entry) + b"\n"
+    with _append_lock, open(log_path(root), "ab") as f:
+        f.write(line)
+
+
+def read(root: Path, upto: int | None = None) -> List[Dict[str, Any]]:
+    """
+    Log entries in rev order. A rev written twice (left behind by a write that died
+    before its meta update) resolves to the later line; entries past `upto` are ignored.
+    """
+    try:
+        raw = log_path(root).read_bytes()
+    except OSError:
+        return []
+    by_rev: Dict[int, Dict[str, Any]] = {}
+    for line in raw.splitlines():
+        try:
+            e = loads(line)
+            rev = int(e["rev"])
+        except (ValueError, KeyError, TypeError):
+            continue  # torn last line after a crash
+        if upto is None or rev <= upto:
+            by_rev[rev] = e
+    return [by_rev[r] for r in sorted(by_rev)]
+
+
+def trim(root: Path, keep: int, upto: int | None = None) -> None:
+    """Rewrite the log with only its newest `keep` entries."""
+    entries = read(root, upto)[-keep:] if keep > 0 else []
+    p = log_path(root)
+    tmp = p.with_name(f".{p.name}.{os.getpid()}.{threading.get_ident()}.tmp")
+    tmp.write_bytes(b"".join(dumps(e) + b"\n" for e in entries))
+    with _append_lock:
+        os.replace(tmp, p)
@@ -0,0 +1,264 @@
+# app/storage/postgres.py
+"""
+Postgres store (STORAGE_BACKEND=postgres) on asyncpg, using the tables from
+db/init/30_versions.sql and settings.DATABASE_URL.
+
+PgRepository is the async repository: one asyncpg pool, opened by the app's
+startup hook and closed on shutdown, and JSONB columns encoded with app.codec.
+Every query is a fixed SQL string, so asyncpg prepares it once per connection
+and reuses the prepared statement from its statement cache.
+
+PostgresStore adapts it to the sync Store interface used by the routers: each
+call runs the coroutine on the event loop that owns the pool (anyio.from_thread),
+so it has to be made from a worker thread (sync endpoints, run_in_threadpool).
+"""
+from __future__ import annotations
+
+import asyncio
+import secrets
+from typing import Any, Dict, Hashable, List, Optional, Tuple
+
+import anyio.from_thread
+
+from ..codec import dumps, loads
+from .base import Store
+
+try:
+    import asyncpg  # optional: only needed for STORAGE_BACKEND=postgres
+except ImportError:
+    asyncpg = None
+
+Q_LIST = "SELECT meta FROM versions WHERE uid = $1 ORDER BY seq DESC"
+Q_GET = (
+    "SELECT c.body, v.meta FROM version_contents c LEFT JOIN versions v ON v.uid = c.uid AND v.vid = c.vid "
+    "WHERE c.uid = $1 AND c.vid = $2"
+)
+Q_ALL = (
+    "SELECT v.vid, v.meta, c.body FROM versions v LEFT JOIN version_contents c ON c.uid = v.uid AND c.vid = v.vid "
+    "WHERE v.uid = $1 ORDER BY v.seq DESC"
+)
+Q_MANY = (
+    "SELECT v.vid, v.meta, c.body FROM versions v LEFT JOIN version_contents c ON c.uid = v.uid AND c.vid = v.vid "
+    "WHERE v.uid = $1 AND v.vid = ANY($2::text[])"
+)
+Q_LOCK_USER = "SELECT pg_advisory_xact_lock(hashtext($1))"
+Q_PUT_CONTENT = (
+    "INSERT INTO version_contents (uid, vid, body) VALUES ($1, $2, $3) "
+    "ON CONFLICT (uid, vid) DO UPDATE SET body = excluded.body"
+)
+Q_ADD_ROW = (
+    "INSERT INTO versions (uid, vid, seq, meta) "
+    "VALUES ($1, $2, (SELECT COALESCE(MAX(seq), 0) + 1 FROM versions WHERE uid = $1), $3) "
+    "ON CONFLICT (uid, vid) DO UPDATE SET seq = excluded.seq, meta = excluded.meta"
+)
+Q_UPDATE_CONTENT = "UPDATE version_contents SET body = $3 WHERE uid = $1 AND vid = $2"
+Q_RENAME = "UPDATE versions SET meta = jsonb_set(meta, '{name}', to_jsonb($3::text)) WHERE uid = $1 AND vid = $2"
+Q_DELETE_ROW = "DELETE FROM versions WHERE uid = $1 AND vid = $2"
+Q_DELETE_CONTENT = "DELETE FROM version_contents WHERE uid = $1 AND vid = $2"
+Q_CLEAR_INDEX = "DELETE FROM versions WHERE uid = $1"
+Q_INDEX_ROW = "INSERT INTO versions (uid, vid, seq, meta) VALUES ($1, $2, $3, $4) ON CONFLICT (uid, vid) DO NOTHING"
+Q_READ_DOC = "SELECT body FROM workspace_docs WHERE uid = $1 AND name = $2"
+Q_WRITE_DOC = (
+    "INSERT INTO workspace_docs (uid, name, stamp, body) VALUES ($1, $2, $3, $4) "
+    "ON CONFLICT (uid, name) DO UPDATE SET stamp = excluded.stamp, body = excluded.body"
+)
+Q_DELETE_DOCS = "DELETE FROM workspace_docs WHERE uid = $1 AND name = ANY($2::text[])"
+Q_DOC_TOKEN = "SELECT stamp FROM workspace_docs WHERE uid = $1 AND name = $2"
+Q_APPEND_LOG = (
+    "INSERT INTO workspace_oplog (uid, rev, entry) VALUES ($1, $2, $3) "
+    "ON CONFLICT (uid, rev) DO UPDATE SET entry = excluded.entry"
+)
+Q_READ_LOG = "SELECT entry FROM workspace_oplog WHERE uid = $1 AND ($2::bigint IS NULL OR rev <= $2) ORDER BY rev"
+Q_TRIM_AFTER = "DELETE FROM workspace_oplog WHERE uid = $1 AND rev > $2"
+Q_TRIM_KEEP = (
+    "DELETE FROM workspace_oplog WHERE uid = $1 AND rev NOT IN "
+    "(SELECT rev FROM workspace_oplog WHERE uid = $1 ORDER BY rev DESC LIMIT $2)"
+)
+
+
+def asyncpg_dsn(url: str) -> str:
+    """DATABASE_URL is SQLAlchemy-style (postgresql+asyncpg://); asyncpg wants plain postgresql://."""
+    scheme, sep, rest = url.partition("://")
+    return f"{scheme.split('+', 1)[0]}{sep}{rest}"
+
+
+async def _init_connection(conn) -> None:
+    # JSONB binary format is a version byte (1) followed by the JSON text
+    await conn.set_type_codec(
+        "jsonb", schema="pg_catalog", format="binary",
+        encoder=lambda obj: b"\x01" + dumps(obj), decoder=lambda raw: loads(raw[1:]),
+    )
+
+
+class PgRepository:
+    def __init__(self, dsn: str, min_size: int = 1, max_size: int = 10):
+        self.dsn = dsn
+        self.min_size = min_size
+        self.max_size = max_size
+        self.pool = None
+
+    async def open(self) -> None:
+        if asyncpg is None:
+            raise RuntimeError("STORAGE_BACKEND=postgres needs asyncpg (pip install asyncpg)")
+        if self.pool is None:
+            self.pool = await asyncpg.create_pool(
+                self.dsn, min_size=self.min_size, max_size=self.max_size, init=_init_connection,
+            )
+
+    async def close(self) -> None:
+        if self.pool is not None:
+            pool, self.pool = self.pool, None
+            await pool.close()
+
+    def _pool(self):
+        if self.pool is None:
+            raise RuntimeError("Postgres pool is not open (the app's startup hook opens it)")
+        return self.pool
+
+    # ---------- versions ----------
+    async def list_versions(self, uid: str) -> List[Dict[str, Any]]:
+        return [r[0] for r in await self._pool().fetch(Q_LIST, uid)]
+
+    async def get_version(self, uid: str, vid: str) -> Optional[Tuple[Dict[str, Any], Any]]:
+        row = await self._pool().fetchrow(Q_GET, uid, vid)
+        if row is None:
+            return None
+        return (row[1] if row[1] is not None else {}), row[0]
+
+    async def get_versions(self, uid: str, vids: Optional[List[str]] = None) -> List[Tuple[str, Dict[str, Any], Any]]:
+        """Like Store.iter_versions, in one query."""
+        if vids is None:
+            return [(r[0], r[1], r[2]) for r in await self._pool().fetch(Q_ALL, uid)]
+        found = {r[0]: (r[1], r[2]) for r in await self._pool().fetch(Q_MANY, uid, list(vids))}
+        return [(vid, *found.get(vid, ({}, None))) for vid in vids]
+
+    async def add_version(self, uid: str, meta: Dict[str, Any], data: Any) -> None:
+        async with self._pool().acquire() as conn, conn.transaction():
+            await conn.execute(Q_LOCK_USER, uid)  # serializes seq allocation per user
+            await conn.execute(Q_PUT_CONTENT, uid, str(meta["id"]), data)
+            await conn.execute(Q_ADD_ROW, uid, str(meta["id"]), meta)
+
+    async def put_version_content(self, uid: str, vid: str, data: Any) -> bool:
+        return await self._pool().execute(Q_UPDATE_CONTENT, uid, vid, data) != "UPDATE 0"
+
+    async def rename_version(self, uid: str, vid: str, name: str) -> bool:
+        return await self._pool().execute(Q_RENAME, uid, vid, name) != "UPDATE 0"
+
+    async def delete_version(self, uid: str, vid: str) -> bool:
+        async with self._pool().acquire() as conn, conn.transaction():
+            a = await conn.execute(Q_DELETE_ROW, uid, vid)
+            b = await conn.execute(Q_DELETE_CONTENT, uid, vid)
+        return a != "DELETE 0" or b != "DELETE 0"
+
+    async def write_index(self, uid: str, rows: List[Dict[str, Any]]) -> None:
+        n = len(rows)
+        async with self._pool().acquire() as conn, conn.transaction():
+            await conn.execute(Q_LOCK_USER, uid)
+            await conn.execute(Q_CLEAR_INDEX, uid)
+            await conn.executemany(Q_INDEX_ROW, [(uid, str(m.get("id")), n - i, m) for i, m in enumerate(rows)])
+
+    # ---------- workspace documents ----------
+    async def read_doc(self, uid: str, name: str, default: Any = None) -> Any:
+        row = await self._pool().fetchrow(Q_READ_DOC, uid, name)
+        return default if row is None else row[0]
+
+    async def write_docs(self, uid: str, docs: Dict[str, Any], conn=None) -> None:
+        args = [(uid, name, secrets.randbits(62), obj) for name, obj in docs.items()]
+        await (conn or self._pool()).executemany(Q_WRITE_DOC, args)
+
+    async def delete_docs(self, uid: str, names: List[str]) -> None:
+        await self._pool().execute(Q_DELETE_DOCS, uid, list(names))
+
+    async def doc_token(self, uid: str, name: str) -> Optional[Hashable]:
+        return await self._pool().fetchval(Q_DOC_TOKEN, uid, name)
+
+    # ---------- workspace op log ----------
+    async def append_log(self, uid: str, entry: Dict[str, Any], conn=None) -> None:
+        await (conn or self._pool()).execute(Q_APPEND_LOG, uid, int(entry["rev"]), entry)
+
+    async def read_log(self, uid: str, upto: Optional[int] = None) -> List[Dict[str, Any]]:
+        return [r[0] for r in await self._pool().fetch(Q_READ_LOG, uid, upto)]
+
+    async def trim_log(self, uid: str, keep: int, upto: Optional[int] = None, conn=None) -> None:
+        if conn is None:
+            async with self._pool().acquire() as conn, conn.transaction():
+                return await self.trim_log(uid, keep, upto, conn)
+        if upto is not None:
+            await conn.execute(Q_TRIM_AFTER, uid, upto)
+        await conn.execute(Q_TRIM_KEEP, uid, max(0, keep))
+
+    async def write_revision(self, uid: str, entry: Dict[str, Any], docs: Dict[str, Any],
+                             trim: Optional[Tuple[int, int]] = None) -> None:
+        async with self._pool().acquire() as conn, conn.transaction():
+            await self.append_log(uid, entry, conn)
+            await self.write_docs(uid, docs, conn)
+            if trim is not None:
+                await self.trim_log(uid, *trim, conn=conn)
+
+
+class PostgresStore(Store):
+    def __init__(self, dsn: str, min_size: int = 1, max_size: int = 10):
+        self.repo = PgRepository(dsn, min_size, max_size)
+
+    async def startup(self) -> None:
+        await self.repo.open()
+
+    async def shutdown(self) -> None:
+        await self.repo.close()
+
+    def _run(self, fn, *args):
+        try:
+            asyncio.get_running_loop()
+        except RuntimeError:
+            return anyio.from_thread.run(fn, *args)
+        raise RuntimeError(
+            "PostgresStore called on the event loop thread: use a sync (def) endpoint or run_in_threadpool"
+        )
+
+    def list_versions(self, uid):
+        return self._run(self.repo.list_versions, uid)
+
+    def get_version(self, uid, vid):
+        return self._run(self.repo.get_version, uid, vid)
+
+    def iter_versions(self, uid, vids=None):
+        return iter(self._run(self.repo.get_versions, uid, vids))
+
+    def add_version(self, uid, meta, data):
+        self._run(self.repo.add_version, uid, meta, data)
+
+    def put_version_content(self, uid, vid, data):
+        return self._run(self.repo.put_version_content, uid, vid, data)
+
+    def rename_version(self, uid, vid, name):
+        return self._run(self.repo.rename_version, uid, vid, name)
+
+    def delete_version(self, uid, vid):
+        return self._run(self.repo.delete_version, uid, vid)
+
+    def write_index(self, uid, rows):
+        self._run(self.repo.write_index, uid, rows)
+
+    def read_doc(self, uid, name, default=None):
+        return self._run(self.repo.read_doc, uid, name, default)
+
+    def write_docs(self, uid, docs):
+        self._run(self.repo.write_docs, uid, docs)
+
+    def delete_docs(self, uid, names):
+        self._run(self.repo.delete_docs, uid, names)
+
+    def doc_token(self, uid, name):
+        return self._run(self.repo.doc_token, uid, name)
+
+    def append_log(self, uid, entry):
+        self._run(self.repo.append_log, uid, entry)
+
+    def read_log(self, uid, upto=None):
+        return self._run(self.repo.read_log, uid, upto)
+
+    def trim_log(self, uid, keep, upto=None):
+        self._run(self.repo.trim_log, uid, keep, upto)
+
+    def write_revision(self, uid, entry, docs, trim=None):
+        self._run(self.repo.write_revision, uid, entry, docs, trim)
@@ -0,0 +1,219 @@
+# app/storage/sqlite.py
+"""
+Single-file SQLite store (WAL mode): readers never block the writer, every
+multi-row change (new version + index, workspace revision + meta + log trim) is
+one transaction, and versions are looked up by (uid, vid) primary key instead of
+scanning index.json.
+
+Tables:
+  versions(uid, vid, seq, meta)   the index; seq orders it (higher = newer)
+  contents(uid, vid, body)        version documents (kept apart so listing never reads them)
+  docs(uid, name, stamp, body)    workspace documents; stamp changes on every write
+  oplog(uid, rev, entry)          workspace op log
+Bodies are JSON bytes from app.codec; only the small `versions` rows live in a
+WITHOUT ROWID table, since large records there would be read on every scan. As with index.json and <vid>.json files, an
+index row may lack a document and a document may be missing from the index.
+"""
+from __future__ import annotations
+
+import secrets
+import sqlite3
+import threading
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Any, Dict, Hashable, Iterator, List, Optional, Tuple
+
+from ..codec import dumps, loads
+from .base import Store
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS versions (
+    uid TEXT NOT NULL, vid TEXT NOT NULL, seq INTEGER NOT NULL, meta BLOB NOT NULL,
+    PRIMARY KEY (uid, vid)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS versions_by_seq ON versions (uid, seq);
+CREATE TABLE IF NOT EXISTS contents (
+    uid TEXT NOT NULL, vid TEXT NOT NULL, body BLOB NOT NULL,
+    PRIMARY KEY (uid, vid)
+);
+CREATE TABLE IF NOT EXISTS docs (
+    uid TEXT NOT NULL, name TEXT NOT NULL, stamp INTEGER NOT NULL, body BLOB NOT NULL,
+    PRIMARY KEY (uid, name)
+);
+CREATE TABLE IF NOT EXISTS oplog (
+    uid TEXT NOT NULL, rev INTEGER NOT NULL, entry BLOB NOT NULL,
+    PRIMARY KEY (uid, rev)
+);
+"""
+
+
+class SqliteStore(Store):
+    def __init__(self, path: Path):
+        self.path = Path(path)
+        self._local = threading.local()
+        self._conns: List[sqlite3.Connection] = []
+        self._lock = threading.Lock()
+        self._ready = False
+
+    # ---------- connections ----------
+    def _conn(self) -> sqlite3.Connection:
+        """One connection per thread (autocommit; transactions are explicit)."""
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            conn = sqlite3.connect(str(self.path), timeout=30, isolation_level=None, check_same_thread=False)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            with self._lock:
+                if not self._ready:
+                    conn.executescript(SCHEMA)
+                    self._ready = True
+                self._conns.append(conn)
+            self._local.conn = conn
+        return conn
+
+    @contextmanager
+    def _tx(self) -> Iterator[sqlite3.Connection]:
+        conn = self._conn()
+        conn.execute("BEGIN IMMEDIATE")  # take the write lock up front: no upgrade deadlocks
+        try:
+            yield conn
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+        conn.execute("COMMIT")
+
+    def close(self) -> None:
+        with self._lock:
+            for conn in self._conns:
+                conn.close()
+            self._conns.clear()
+        self._local = threading.local()
+
+    # ---------- versions ----------
+    def list_versions(self, uid: str) -> List[Dict[str, Any]]:
+        rows = self._conn().execute("SELECT meta FROM versions WHERE uid = ? ORDER BY seq DESC", (uid,))
+        return [loads(m) for (m,) in rows]
+
+    def get_version(self, uid: str, vid: str) -> Optional[Tuple[Dict[str, Any], Any]]:
+        row = self._conn().execute(
+            "SELECT c.body, v.meta FROM contents c LEFT JOIN versions v ON v.uid = c.uid AND v.vid = c.vid "
+            "WHERE c.uid = ? AND c.vid = ?", (uid, vid),
+        ).fetchone()
+        if row is None:
+            return None
+        return (loads(row[1]) if row[1] is not None else {}), loads(row[0])
+
+    def iter_versions(self, uid: str, vids: Optional[List[str]] = None) -> Iterator[Tuple[str, Dict[str, Any], Any]]:
+        if vids is not None:
+            yield from super().iter_versions(uid, vids)
+            return
+        rows = self._conn().execute(
+            "SELECT v.vid, v.meta, c.body FROM versions v LEFT JOIN contents c ON c.uid = v.uid AND c.vid = v.vid "
+            "WHERE v.uid = ? ORDER BY v.seq DESC", (uid,),
+        ).fetchall()
+        for vid, meta, body in rows:
+            yield vid, loads(meta), (loads(body) if body is not None else None)
+
+    def add_version(self, uid: str, meta: Dict[str, Any], data: Any) -> None:
+        vid = str(meta["id"])
+        with self._tx() as conn:
+            conn.execute("INSERT OR REPLACE INTO contents (uid, vid, body) VALUES (?, ?, ?)", (uid, vid, dumps(data)))
+            conn.execute(
+                "INSERT OR REPLACE INTO versions (uid, vid, seq, meta) VALUES "
+                "(?, ?, (SELECT COALESCE(MAX(seq), 0) + 1 FROM versions WHERE uid = ?), ?)",
+                (uid, vid, uid, dumps(meta)),
+            )
+
+    def put_version_content(self, uid: str, vid: str, data: Any) -> bool:
+        cur = self._conn().execute("UPDATE contents SET body = ? WHERE uid = ? AND vid = ?", (dumps(data), uid, vid))
+        return cur.rowcount > 0
+
+    def rename_version(self, uid: str, vid: str, name: str) -> bool:
+        with self._tx() as conn:
+            row = conn.execute("SELECT meta FROM versions WHERE uid = ? AND vid = ?", (uid, vid)).fetchone()
+            if row is None:
+                return False
+            meta = loads(row[0])
+            meta["name"] = name
+            conn.execute("UPDATE versions SET meta = ? WHERE uid = ? AND vid = ?", (dumps(meta), uid, vid))
+        return True
+
+    def delete_version(self, uid: str, vid: str) -> bool:
+        with self._tx() as conn:
+            n = conn.execute("DELETE FROM versions WHERE uid = ? AND vid = ?", (uid, vid)).rowcount
+            n += conn.execute("DELETE FROM contents WHERE uid = ? AND vid = ?", (uid, vid)).rowcount
+        return n > 0
+
+    def write_index(self, uid: str, rows: List[Dict[str, Any]]) -> None:
+        n = len(rows)
+        with self._tx() as conn:
+            conn.execute("DELETE FROM versions WHERE uid = ?", (uid,))
+            conn.executemany(
+                "INSERT OR REPLACE INTO versions (uid, vid, seq, meta) VALUES (?, ?, ?, ?)",
+                [(uid, str(meta.get("id")), n - i, dumps(meta)) for i, meta in enumerate(rows)],
+            )
+
+    # ---------- workspace documents ----------
+    def read_doc(self, uid: str, name: str, default: Any = None) -> Any:
+        row = self._conn().execute("SELECT body FROM docs WHERE uid = ? AND name = ?", (uid, name)).fetchone()
+        if row is None:
+            return default
+        try:
+            return loads(row[0])
+        except ValueError:
+            return default
+
+    def _write_docs(self, conn: sqlite3.Connection, uid: str, docs: Dict[str, Any]) -> None:
+        conn.executemany(
+            "INSERT OR REPLACE INTO docs (uid, name, stamp, body) VALUES (?, ?, ?, ?)",
+            [(uid, name, secrets.randbits(62), dumps(obj)) for name, obj in docs.items()],
+        )
+
+    def write_docs(self, uid: str, docs: Dict[str, Any]) -> None:
+        with self._tx() as conn:
+            self._write_docs(conn, uid, docs)
+
+    def delete_docs(self, uid: str, names: List[str]) -> None:
+        with self._tx() as conn:
+            conn.executemany("DELETE FROM docs WHERE uid = ? AND name = ?", [(uid, name) for name in names])
+
+    def doc_token(self, uid: str, name: str) -> Optional[Hashable]:
+        row = self._conn().execute("SELECT stamp FROM docs WHERE uid = ? AND name = ?", (uid, name)).fetchone()
+        return row[0] if row else None
+
+    # ---------- workspace op log ----------
+    def append_log(self, uid: str, entry: Dict[str, Any]) -> None:
+        self._conn().execute(
+            "INSERT OR REPLACE INTO oplog (uid, rev, entry) VALUES (?, ?, ?)", (uid, int(entry["rev"]), dumps(entry)),
+        )
+
+    def read_log(self, uid: str, upto: Optional[int] = None) -> List[Dict[str, Any]]:
+        if upto is None:
+            rows = self._conn().execute("SELECT entry FROM oplog WHERE uid = ? ORDER BY rev", (uid,))
+        else:
+            rows = self._conn().execute("SELECT entry FROM oplog WHERE uid = ? AND rev <= ? ORDER BY rev", (uid, upto))
+        return [loads(e) for (e,) in rows]
+
+    def _trim_log(self, conn: sqlite3.Connection, uid: str, keep: int, upto: Optional[int]) -> None:
+        if upto is not None:
+            conn.execute("DELETE FROM oplog WHERE uid = ? AND rev > ?", (uid, upto))
+        conn.execute(
+            "DELETE FROM oplog WHERE uid = ? AND rev NOT IN "
+            "(SELECT rev FROM oplog WHERE uid = ? ORDER BY rev DESC LIMIT ?)",
+            (uid, uid, max(0, keep)),
+        )
+
+    def trim_log(self, uid: str, keep: int, upto: Optional[int] = None) -> None:
+        with self._tx() as conn:
+            self._trim_log(conn, uid, keep, upto)
+
+    def write_revision(self, uid: str, entry: Dict[str, Any], docs: Dict[str, Any],
+                       trim: Optional[Tuple[int, int]] = None) -> None:
+        with self._tx() as conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO oplog (uid, rev, entry) VALUES (?, ?, ?)", (uid, int(entry["rev"]), dumps(entry)),
+            )
+            self._write_docs(conn, uid, docs)
+            if trim is not None:
+                self._trim_log(conn, uid, *trim)
@@ -0,0 +1,135 @@
+# app/undo.py
+"""
+Per-user undo/redo history of workspace edits, derived from the op log.
+
+Every log entry already holds the forward patch of its revision ("ops") and its
+inverse ("inv"), as computed by _write_current. Undo applies the inverse of the
+newest undoable edit and redo re-applies its ops; both are written as ordinary
+revisions whose log entries are tagged {"undo": rev} / {"redo": rev} with the rev
+of the edit they step over. Stepping through the log builds both stacks: an edit
+pushes itself for undo and clears the redo stack, an undo step moves its edit to
+the redo stack and a redo step moves it back. Nothing beyond those tags is stored
+per edit, so a write stays one small log append.
+
+The stacks are kept in memory per user and advanced by record() as each revision
+is written, so undo/redo don't re-read the log; it is replayed only to rebuild
+them (first use, or after another process wrote revisions this one didn't see).
+
+The undo stack holds at most WORKSPACE_UNDO_DEPTH edits whose ops and inverses
+serialize to at most WORKSPACE_UNDO_BYTES (oldest go first), and reaches back
+only as far as the op log does (WORKSPACE_OPLOG_KEEP revisions). The store's
+"undo" document is written only when the history is dropped: {"floor": rev}
+hides every entry up to rev.
+
+Callers hold the workspace user lock, so there is no locking here.
+"""
+from __future__ import annotations
+
+from typing import Any, Dict, List, Optional, Tuple
+
+from .codec import dumps
+from .config import settings
+from .storage import store
+
+DOC_NAME = "undo"
+
+Stacks = Tuple[List[Dict[str, Any]], List[Dict[str, Any]]]
+
+
+class _History:
+    """Both stacks as of `rev`, plus the serialized size of every edit they hold."""
+
+    def __init__(self, floor: int):
+        self.floor = floor
+        self.rev = 0
+        self.undo: List[Dict[str, Any]] = []
+        self.redo: List[Dict[str, Any]] = []
+        self.sizes: Dict[int, int] = {}
+        self.total = 0
+
+    def forget(self, entries: List[Dict[str, Any]], n: Optional[int] = None) -> None:
+        """Drop the first n (default: all) entries of one of the stacks."""
+        n = len(entries) if n is None else n
+        for e in entries[:n]:
+            self.total -= self.sizes.pop(e["rev"], 0)
+        del entries[:n]
+
+
+class UndoHistory:
+    def __init__(self, depth: int, max_bytes: int, reach: int):
+        self.depth = max(0, int(depth))
+        self.max_bytes = max(0, int(max_bytes))
+        self.reach = max(0, int(reach))
+        self._cache: Dict[str, _History] = {}
+
+    def _floor(self, uid: str) -> int:
+        raw = store.read_doc(uid, DOC_NAME, default={})
+        return int(raw.get("floor") or 0) if isinstance(raw, dict) else 0
+
+    def _step(self, h: _History, e: Dict[str, Any]) -> None:
+        """Advance h over one log entry."""
+        h.rev = e["rev"]
+        if e["rev"] <= h.floor:
+            return
+        for tag, src, dst in (("undo", h.undo, h.redo), ("redo", h.redo, h.undo)):
+            if tag in e:
+                if src and src[-1]["rev"] == e[tag]:
+                    dst.append(src.pop())
+                else:
+                    h.forget(h.undo)  # stepped over an edit the log no longer has
+                    h.forget(h.redo)
+                break
+        else:
+            if e.get("ops"):  # a meta-only revision leaves nothing to undo
+                h.forget(h.redo)
+                if "inv" not in e:
+                    h.forget(h.undo)  # written before inverses were logged
+                else:
+                    size = len(dumps(e["ops"])) + len(dumps(e["inv"]))
+                    h.undo.append(e)
+                    h.sizes[e["rev"]] = size
+                    h.total += size
+        # Oldest edits go first: past the depth or byte budget, or already trimmed from the log
+        while h.undo and (
+            len(h.undo) > self.depth or h.total > self.max_bytes or h.undo[0]["rev"] <= h.rev - self.reach
+        ):
+            h.forget(h.undo, 1)
+
+    def stacks(self, uid: str, rev: int) -> Stacks:
+        """(undo, redo) log entries as of `rev`; the top of each stack is its last entry."""
+        if not self.depth:
+            return [], []
+        floor = self._floor(uid)
+        h = self._cache.get(uid)
+        if h is None or h.floor != floor or h.rev > rev:
+            h, since = _History(floor), None
+        else:
+            since = h.rev
+        if h.rev < rev:
+            entries = [e for e in store.read_log(uid, upto=rev) if since is None or e["rev"] > since]
+            if since is not None and (not entries or entries[0]["rev"] != since + 1):
+                # The log no longer continues from the cached rev: rebuild from scratch
+                h, entries = _History(floor), store.read_log(uid, upto=rev)
+            for e in entries:
+                self._step(h, e)
+            h.rev = rev
+        self._cache[uid] = h
+        return list(h.undo), list(h.redo)
+
+    def record(self, uid: str, entry: Dict[str, Any]) -> None:
+        """A revision was just written: advance the cached stacks over its log entry."""
+        h = self._cache.get(uid)
+        if h is None:
+            return
+        if h.rev == entry["rev"] - 1:
+            self._step(h, entry)
+        else:
+            del self._cache[uid]
+
+    def clear(self, uid: str, rev: int) -> None:
+        """Forget everything up to `rev` (the document no longer matches the history)."""
+        store.write_docs(uid, {DOC_NAME: {"floor": rev}})
+        self._cache.pop(uid, None)
+
+
+undo_history = UndoHistory(settings.WORKSPACE_UNDO_DEPTH, settings.WORKSPACE_UNDO_BYTES, settings.WORKSPACE_OPLOG_KEEP)
@@ -0,0 +1,9 @@
+"""
+Micro-benchmarks for the backend hot paths. Run one from backend/, e.g.
+
+    python -m benchmarks.bench_render_tex
+
+Each prints per-call timings for the current code next to the implementation it
+replaced (reproduced inline), on the synthetic resumes in benchmarks._common.
+They aren't tests: pytest doesn't collect them and nothing asserts on timings.
+"""
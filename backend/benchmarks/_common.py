@@ -0,0 +1,60 @@
+# benchmarks/_common.py
+"""Synthetic resumes and a timing helper shared by the benchmarks."""
+from __future__ import annotations
+
+import random
+import time
+from typing import Any, Callable, Dict
+
+SECTION_TYPES = (
+    "experience", "projects", "education", "certifications", "awards", "publications", "volunteer",
+    "courses", "languages", "interests", "references", "achievements", "patents", "talks", "custom", "skillsets",
+)
+
+
+def _item(i: int) -> Dict[str, Any]:
+    # Fields of every item type at once, so each section type finds what its template reads
+    return {
+        "role": f"Role {i} & co", "company": f"Comp_{i}", "name": f"Name #{i}", "title": f"Title {i}",
+        "start": f"20{10 + i % 10}-0{1 + i % 9}", "end": f"20{11 + i % 10}-0{1 + i % 9}-15",
+        "date": f"20{10 + i % 10}-0{1 + i % 9}", "school": "MIT", "degree": "BSc", "content": "Custom ~ text",
+        "bullets": [f"Did thing {j} with 50% gain & $ savings" for j in range(4)],
+        "languages": ["Python", "C"], "tools": ["Git"],
+    }
+
+
+def big_resume(n_sections: int = 12, n_items: int = 20, seed: int = 0) -> Dict[str, Any]:
+    """A raw (un-normalized) resume with n_sections sections of n_items items each."""
+    rnd = random.Random(seed)
+    sections = []
+    for s in range(n_sections):
+        items = [_item(i) for i in range(n_items)]
+        rnd.shuffle(items)
+        sections.append({"id": f"s{s}", "type": SECTION_TYPES[s % len(SECTION_TYPES)], "title": "", "items": items})
+    return {
+        "fullName": "Ada Lovelace", "title": "Engineer", "email": "a@b.c", "phone": "1", "location": "London",
+        "summary": "Summary_text", "skills": ["b", "a", "a"], "profiles": ["https://x.y"], "sections": sections,
+    }
+
+
+def resume_with_items(n: int) -> Dict[str, Any]:
+    """A raw resume with n items in total, spread over up to 10 sections."""
+    per = max(1, n // 10)
+    return big_resume(n_sections=max(1, n // per), n_items=per)
+
+
+def per_call(fn: Callable[[], Any], min_time: float = 0.5) -> float:
+    """Seconds per call of fn, averaged over at least min_time of repeated calls (after one warm-up)."""
+    fn()
+    calls, elapsed = 0, 0.0
+    start = time.perf_counter()
+    while elapsed < min_time:
+        fn()
+        calls += 1
+        elapsed = time.perf_counter() - start
+    return elapsed / calls
+
+
+def report(label: str, seconds: float, unit: str = "ms") -> None:
+    scale = {"ms": 1e3, "us": 1e6}[unit]
+    print(f"  {label:<44} {seconds * scale:10.2f} {unit}")
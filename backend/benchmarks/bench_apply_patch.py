@@ -0,0 +1,84 @@
+# benchmarks/bench_apply_patch.py
+"""
+apply_json_patch ops/sec on a large normalized resume (12 sections x 20 items).
+
+  before: deepcopy of the document, then jsonpatch.apply_patch(in_place=False)
+          (a second copy); without jsonpatch, the old add/replace/remove fallback
+  after:  path-copying patcher that shares untouched subtrees
+"""
+from __future__ import annotations
+
+from copy import deepcopy
+
+from app.normalizers import normalize_resume
+from app.patching import apply_json_patch
+
+from ._common import big_resume, per_call
+
+try:
+    import jsonpatch
+except ImportError:
+    jsonpatch = None
+
+
+def apply_json_patch_copying(doc, ops):
+    if not ops: return doc
+    base = deepcopy(doc)
+    if jsonpatch:
+        ops2 = []
+        for op in ops:
+            o = dict(op)
+            if "from_" in o: o["from"] = o.pop("from_")
+            ops2.append(o)
+        return jsonpatch.apply_patch(base, ops2, in_place=False)
+    for op in ops:
+        action, path, value = op["op"], op["path"], op.get("value")
+        keys = [k for k in path.split("/")[1:] if k]
+        parent = base
+        for k in keys[:-1]:
+            parent = parent[int(k)] if isinstance(parent, list) else parent.setdefault(k, {})
+        last = keys[-1]
+        if action == "replace":
+            parent[int(last) if isinstance(parent, list) else last] = value
+        elif action == "add":
+            if isinstance(parent, list):
+                parent.append(value) if last == "-" else parent.insert(int(last), value)
+            else:
+                parent[last] = value
+        elif action == "remove":
+            parent.pop(int(last)) if isinstance(parent, list) else parent.pop(last, None)
+        else:
+            raise ValueError(f"Unsupported op in fallback: {action}")
+    return base
+
+
+def main() -> None:
+    doc = normalize_resume(big_resume())
+    cases = {
+        "replace 1 bullet": [{"op": "replace", "path": "/sections/3/items/5/bullets/0", "value": "x"}],
+        "5 mixed ops": [
+            {"op": "replace", "path": "/fullName", "value": "N"},
+            {"op": "add", "path": "/sections/2/items/-", "value": {"role": "r"}},
+            {"op": "remove", "path": "/sections/4/items/1"},
+            {"op": "move", "from": "/sections/0", "path": "/sections/5"},
+            {"op": "test", "path": "/sections/1/type", "value": doc["sections"][2]["type"]},
+        ],
+    }
+    print("apply_json_patch, 12 sections x 20 items:")
+    for name, ops in cases.items():
+        try:
+            expected = apply_json_patch_copying(doc, ops)
+        except ValueError as e:  # the old fallback (no jsonpatch) lacks move/test
+            expected = None
+            print(f"  {name:<18} before n/a ({e})")
+        else:
+            assert apply_json_patch(doc, ops) == expected
+        for label, fn in (("before", apply_json_patch_copying), ("after", apply_json_patch)):
+            if label == "before" and expected is None:
+                continue
+            seconds = per_call(lambda: fn(doc, ops))
+            print(f"  {name:<18} {label:<6} {seconds * 1e6:10.1f} us/patch {len(ops) / seconds:12,.0f} ops/s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,56 @@
+# benchmarks/bench_filters.py
+"""
+Template filters over a 50-item resume section: one pass escapes every string
+field and bullet, or formats every item's start/end dates.
+
+  before: per-character dict lookup + join; dateutil.parser on every date
+  after:  str.translate table; YYYY-MM(-DD) fast path, memoized dateutil fallback
+"""
+from __future__ import annotations
+
+from dateutil import parser as dateparser
+
+from app.normalizers import normalize_resume
+from app.rendering import LATEX_SPECIALS, date_range, fmt_month, latex_escape
+
+from ._common import big_resume, per_call, report
+
+
+def latex_escape_per_char(text):
+    if text is None: return ""
+    return "".join(LATEX_SPECIALS.get(ch, ch) for ch in str(text))
+
+
+def fmt_month_dateutil(value):
+    if not value: return ""
+    try:
+        return dateparser.parse(value + "-01" if len(value) == 7 else value).strftime("%b %Y")
+    except Exception:
+        return latex_escape_per_char(value)
+
+
+def date_range_dateutil(item):
+    s = fmt_month_dateutil(item.get("start"))
+    e = "Present" if item.get("current") else fmt_month_dateutil(item.get("end"))
+    return " — ".join([p for p in (s, e) if p])
+
+
+def main() -> None:
+    items = normalize_resume(big_resume(n_sections=1, n_items=50))["sections"][0]["items"]
+    strings = [v for it in items for v in it.values() if isinstance(v, str)] + [b for it in items for b in it["bullets"]]
+    dates = [d for it in items for d in (it["start"], it["end"])]
+    assert [latex_escape(s) for s in strings] == [latex_escape_per_char(s) for s in strings]
+    assert [fmt_month(d) for d in dates] == [fmt_month_dateutil(d) for d in dates]
+
+    print(f"filters, one pass over 50 items ({len(strings)} strings, {len(dates)} dates):")
+    for name, before, after, args in (
+        ("latex_escape", latex_escape_per_char, latex_escape, strings),
+        ("fmt_month", fmt_month_dateutil, fmt_month, dates),
+        ("date_range", date_range_dateutil, date_range, items),
+    ):
+        report(f"{name} before", per_call(lambda: [before(a) for a in args]), "us")
+        report(f"{name} after", per_call(lambda: [after(a) for a in args]), "us")
+
+
+if __name__ == "__main__":
+    main()
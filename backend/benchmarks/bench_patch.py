@@ -0,0 +1,70 @@
+# benchmarks/bench_patch.py
+"""
+POST /api/resume/patch latency on a large resume (12 sections x 20 items), one
+bullet replaced per request, with autosave to the workspace only and with
+overwrite_version (the selected version rewritten too). Uses the default store
+in a temporary directory.
+
+  before: the same request with the normalize-once shortcuts switched off, so
+          every stage re-validates the whole document and the response is
+          rebuilt through PatchResponse
+  after:  the current pipeline
+"""
+from __future__ import annotations
+
+import os
+import tempfile
+from contextlib import ExitStack
+from unittest import mock
+
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from app import normalizers
+from app.codec import CodecJSONResponse
+from app.models.schemas import PatchResponse
+from app.normalizers import normalize_resume
+from app.routers import patch, versions, workspace
+
+from ._common import big_resume, per_call, report
+
+
+def revalidate_everywhere() -> ExitStack:
+    stack = ExitStack()
+    stack.enter_context(mock.patch.object(normalizers, "already_normalized", lambda form: None))
+    stack.enter_context(mock.patch.object(patch, "normalize_patched", lambda base, patched, ops: normalize_resume(patched)))
+    stack.enter_context(mock.patch.object(
+        patch, "CodecJSONResponse", lambda content: CodecJSONResponse(PatchResponse(**content).model_dump()),
+    ))
+    return stack
+
+
+def main() -> None:
+    os.chdir(tempfile.mkdtemp())
+    app = FastAPI()
+    for r in (workspace.router, patch.router, versions.router):
+        app.include_router(r, prefix="/api")
+    client = TestClient(app, headers={"X-User-Id": "bench"})
+    base = big_resume()
+    assert client.post("/api/workspace/save", json=base).status_code == 200
+    base = client.get("/api/workspace/get").json()["data"]
+    edits = iter(range(10**9))
+
+    def one_patch():
+        op = {"op": "replace", "path": "/sections/3/items/0/bullets/1", "value": f"edit {next(edits)}"}
+        r = client.post("/api/resume/patch", json={"base": base, "ops": [op]})
+        assert r.status_code == 200, r.text
+
+    print("POST /api/resume/patch, 12 sections x 20 items, 1 op:")
+    for mode in ("workspace", "overwrite_version"):
+        if mode == "overwrite_version":
+            vid = client.post("/api/versions/save", json=base).json()["id"]
+            client.post("/api/workspace/select", params={"version_id": vid})
+            client.post("/api/workspace/mode", params={"mode": mode})
+        with revalidate_everywhere():
+            report(f"{mode}, before", per_call(one_patch, 2.0))
+        report(f"{mode}, after", per_call(one_patch, 2.0))
+
+
+if __name__ == "__main__":
+    main()
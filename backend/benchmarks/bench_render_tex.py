@@ -0,0 +1,42 @@
+# benchmarks/bench_render_tex.py
+"""
+render_tex latency on a large resume (12 sections x 20 items).
+
+  before:     a new Environment, the template re-read and compiled on every call
+  registry:   the process-wide TemplateRegistry, every section rendered
+  + sections: also SectionFragmentCache, one section changed since the last render
+"""
+from __future__ import annotations
+
+from app.normalizers import normalize_resume
+from app.rendering import build_env, load_template, render_tex, section_cache
+
+from ._common import big_resume, per_call, report
+
+
+def render_tex_per_request(form):
+    return build_env().from_string(load_template()).render(form=form)
+
+
+def main() -> None:
+    form = normalize_resume(big_resume())
+    assert render_tex_per_request(form) == render_tex(form)
+
+    def registry_only():
+        section_cache._frags.clear()
+        render_tex(form)
+
+    edits = iter(range(10**9))
+
+    def one_section_changed():
+        form["sections"][0] = dict(form["sections"][0], title=f"Experience {next(edits)}")
+        render_tex(form)
+
+    print("render_tex, 12 sections x 20 items:")
+    report("before (per-request Environment + compile)", per_call(lambda: render_tex_per_request(form)))
+    report("registry (all sections rendered)", per_call(registry_only))
+    report("registry + section cache (1 section changed)", per_call(one_section_changed))
+
+
+if __name__ == "__main__":
+    main()
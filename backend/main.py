@@ -2,8 +2,12 @@ from fastapi import FastAPI, Request
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.responses import JSONResponse
 
+from app.codec import CodecJSONResponse
 from app.config import settings
-from app.routers import health, workspace, render, patch, versions, files, chat, resumes
+from app.prerender import prerenderer
+from app.rendering import templates
+from app.storage import store
+from app.routers import health, workspace, live, render, patch, versions, files, chat, resumes
 
 # Enhanced metadata for auto-generated API docs
 tags_metadata = [
@@ -21,7 +25,8 @@ app = FastAPI(
     title="Smart Editor Backend",
     version="3.0.0",
     description="The backend API for the Smart Resume Editor application.",
-    openapi_tags=tags_metadata
+    openapi_tags=tags_metadata,
+    default_response_class=CodecJSONResponse,
 )
 
 # --- Middleware ---
@@ -40,12 +45,15 @@ app.add_middleware(
 @app.on_event("startup")
 async def startup_event():
     print("Application startup: Initializing resources...")
-    # Example: await database.connect()
+    templates.warm()  # compile the LaTeX template once up front
+    await store.startup()  # opens the Postgres pool when STORAGE_BACKEND=postgres
+    await prerenderer.startup()  # pre-render compiles are dispatched onto this loop
 
 @app.on_event("shutdown")
 async def shutdown_event():
     print("Application shutdown: Cleaning up resources...")
-    # Example: await database.disconnect()
+    await prerenderer.shutdown()
+    await store.shutdown()
 
 # --- Global Exception Handler ---
 # Catches any unhandled exceptions and returns a standardized 500 error
@@ -63,6 +71,7 @@ app.include_router(health.router, tags=["Health"])
 
 # All other business logic routers are prefixed with /api
 app.include_router(workspace.router, prefix="/api", tags=["Workspace"])
+app.include_router(live.router, prefix="/api", tags=["Workspace"])
 app.include_router(render.router, prefix="/api", tags=["Rendering"])
 app.include_router(patch.router, prefix="/api", tags=["Resumes"]) # Renamed tag for clarity
 app.include_router(versions.router, prefix="/api", tags=["Versions"])
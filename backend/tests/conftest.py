@@ -0,0 +1,5 @@
+import sys
+from pathlib import Path
+
+# Tests import the backend as `app`, wherever pytest is started from
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
@@ -0,0 +1,50 @@
+"""DeltaStore: content-addressed blobs are shared while referenced and deleted once nothing uses them."""
+import random
+
+from app.storage import DeltaStore, FileStore
+
+
+def _resume(rnd, n):
+    return {"fullName": "Ada", "sections": [{"type": "experience", "items": [
+        {"role": f"Role {i}", "bullets": [f"b{rnd.randrange(4)}"]} for i in range(n)]}]}
+
+
+def _blob_files(root, uid):
+    return sorted(p.name for p in (root / uid).glob("blob.*.json"))
+
+
+def test_no_blobs_left_after_deleting_every_version(tmp_path):
+    store, rnd = DeltaStore(FileStore(tmp_path), 10), random.Random(0)
+    docs = {f"v{i}": _resume(rnd, 5 + i % 7) for i in range(40)}
+    for vid, doc in docs.items():
+        store.add_version("u", {"id": vid, "name": vid}, doc)
+    store.put_version_content("u", "v3", _resume(rnd, 30))
+    docs["v3"] = store.get_version("u", "v3")[1]
+    for i, vid in enumerate(list(docs)):
+        if i % 2:
+            store.delete_version("u", vid)
+            del docs[vid]
+    assert all(store.get_version("u", vid)[1] == doc for vid, doc in docs.items())
+    for vid in list(docs):
+        store.delete_version("u", vid)
+    assert _blob_files(tmp_path, "u") == []
+    assert store.read_doc("u", "versions.delta")["refs"] == {}
+
+    # A fresh save after everything was deleted starts a new keyframe
+    again = _resume(rnd, 3)
+    store.add_version("u", {"id": "again", "name": "again"}, again)
+    assert store.get_version("u", "again")[1] == again
+    assert len(_blob_files(tmp_path, "u")) == 1
+
+
+def test_identical_snapshots_share_one_blob(tmp_path):
+    store = DeltaStore(FileStore(tmp_path), 10)
+    doc = _resume(random.Random(1), 8)
+    for i in range(5):
+        store.add_version("u", {"id": f"v{i}", "name": str(i)}, doc)
+    assert len(_blob_files(tmp_path, "u")) == 1
+    for i in range(4):
+        store.delete_version("u", f"v{i}")
+    assert store.get_version("u", "v4")[1] == doc
+    store.delete_version("u", "v4")
+    assert _blob_files(tmp_path, "u") == []
@@ -0,0 +1,33 @@
+"""FileStore.doc_token must change with the content, not just with mtime/size."""
+import os
+
+from app.routers import workspace
+from app.storage import FileStore
+
+
+def test_same_size_rewrite_changes_the_token(tmp_path):
+    s = FileStore(tmp_path)
+    s.write_docs("u", {"current.meta": {"rev": 1}})
+    p = tmp_path / "u" / "current.meta.json"
+    st = p.stat()
+    token = s.doc_token("u", "current.meta")
+    s.write_docs("u", {"current.meta": {"rev": 2}})
+    os.utime(p, ns=(st.st_atime_ns, st.st_mtime_ns))  # same size, same mtime
+    assert p.stat().st_size == st.st_size
+    assert s.doc_token("u", "current.meta") != token
+    assert s.doc_token("u", "missing") is None and not s.has_doc("u", "missing")
+
+
+def test_read_current_sees_a_same_size_rewrite(tmp_path, monkeypatch):
+    s = FileStore(tmp_path)
+    monkeypatch.setattr(workspace, "store", s)
+    workspace._STATE_CACHE.clear()
+    meta = {"rev": 1, "snapshotRev": 1}
+    s.write_docs("u", {"current": {"fullName": "Ada"}, "current.meta": meta})
+    assert workspace._read_current("u")["data"]["fullName"] == "Ada"
+    stamps = [(tmp_path / "u" / f"{n}.json").stat() for n in ("current", "current.meta")]
+    s.write_docs("u", {"current": {"fullName": "Bob"}, "current.meta": {"rev": 2, "snapshotRev": 2}})
+    for n, st in zip(("current", "current.meta"), stamps):
+        os.utime(tmp_path / "u" / f"{n}.json", ns=(st.st_atime_ns, st.st_mtime_ns))
+    state = workspace._read_current("u")
+    assert (state["rev"], state["data"]["fullName"]) == (2, "Bob")
@@ -0,0 +1,23 @@
+"""Workspace live socket: malformed frames get an error frame and the session carries on."""
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from app.routers import live, workspace
+
+
+def test_malformed_frames_get_error_frames(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)  # the default file store lives under ./data
+    app = FastAPI()
+    app.include_router(workspace.router, prefix="/api")
+    app.include_router(live.router, prefix="/api")
+    with TestClient(app).websocket_connect("/api/workspace/live?user=live-test") as ws:
+        rev = ws.receive_json()["rev"]
+        ws.send_text("{not json")
+        assert ws.receive_json()["status"] == 400
+        for bad in ({"id": 1, "ops": 5}, {"id": 2, "ops": [1]}, {"id": 3, "ops": [], "rev": "7"}, [1, 2]):
+            ws.send_json(bad)
+            err = ws.receive_json()
+            assert err["type"] == "error" and err["status"] == 400
+        ws.send_json({"id": "ok", "rev": rev, "ops": [{"op": "replace", "path": "/fullName", "value": "Ada"}]})
+        ack = ws.receive_json()
+        assert ack["type"] == "ack" and ack["ids"] == ["ok"] and ack["rev"] == rev + 1
@@ -0,0 +1,80 @@
+"""normalize_patched (re-normalize only the touched paths) must match a full normalize_resume."""
+import copy
+import random
+
+import pytest
+
+from app.normalizers import content_digest, normalize_patched, normalize_resume
+from app.patching import apply_json_patch
+
+TYPES = ["experience", "projects", "education", "skills", "awards", "custom"]
+
+
+def _resume(rnd: random.Random, n_sections: int = 4, n_items: int = 3):
+    sections = []
+    for s in range(n_sections):
+        items = [{
+            "role": f"Role {i}", "company": f"Comp_{i}", "title": f"Title {i}",
+            "start": f"20{10 + i % 10}-0{1 + i % 9}", "end": "2021-03-15",
+            "bullets": [f"Did thing {j}" for j in range(rnd.randint(0, 3))] + rnd.choice([[], [""], [" "]]),
+            "languages": ["Python", "C", "Python"],
+        } for i in range(n_items)]
+        sections.append({"id": f"s{s}", "type": TYPES[s % len(TYPES)], "title": "", "items": items})
+    return {"fullName": "Ada Lovelace", "summary": "Summary", "skills": ["b", "a", "a"], "sections": sections}
+
+
+def _item(rnd: random.Random):
+    return {"company": rnd.choice(["A", "B"]), "bullets": rnd.choice([["x", " ", ""], None, ["y"]]),
+            "start": "2020-01", "title": "t"}
+
+
+def _op(rnd: random.Random, doc):
+    secs = doc["sections"]
+    k = rnd.random()
+    if k < 0.1:
+        return {"op": "replace", "path": "/fullName", "value": f"N{rnd.random()}"}
+    if k < 0.2:
+        at = rnd.choice([str(rnd.randint(0, len(secs))), "-"])
+        value = {"type": rnd.choice(TYPES), "title": rnd.choice(["", "T"]), "items": [_item(rnd)]}
+        return {"op": "add", "path": f"/sections/{at}", "value": value}
+    if k < 0.28 and secs:
+        return {"op": "remove", "path": f"/sections/{rnd.randrange(len(secs))}"}
+    if k < 0.33 and len(secs) > 1:
+        return {"op": "move", "from": f"/sections/{rnd.randrange(len(secs))}", "path": f"/sections/{rnd.randrange(len(secs))}"}
+    if k < 0.36 and secs:
+        return {"op": "copy", "from": f"/sections/{rnd.randrange(len(secs))}", "path": f"/sections/{rnd.randrange(len(secs) + 1)}"}
+    if k < 0.4 and secs:
+        return {"op": "replace", "path": f"/sections/{rnd.randrange(len(secs))}/title", "value": ""}
+    with_items = [i for i, s in enumerate(secs) if s.get("items")]
+    if not with_items:
+        return {"op": "replace", "path": "/summary", "value": "s"}
+    i = rnd.choice(with_items)
+    n = len(secs[i]["items"])
+    k = rnd.random()
+    if k < 0.3:
+        at = rnd.choice([str(rnd.randint(0, n)), "-"])
+        return {"op": "add", "path": f"/sections/{i}/items/{at}", "value": _item(rnd)}
+    if k < 0.5:
+        return {"op": "remove", "path": f"/sections/{i}/items/{rnd.randrange(n)}"}
+    if k < 0.6 and n > 1:
+        return {"op": "move", "from": f"/sections/{i}/items/{rnd.randrange(n)}", "path": f"/sections/{i}/items/{rnd.randrange(n)}"}
+    if k < 0.8:
+        return {"op": "replace", "path": f"/sections/{i}/items/{rnd.randrange(n)}/bullets", "value": ["a", "", " "]}
+    return {"op": "add", "path": f"/sections/{i}/items/{rnd.randrange(n)}/role", "value": "r"}
+
+
+@pytest.mark.parametrize("seed", range(5))
+def test_incremental_matches_full_normalization(seed):
+    rnd = random.Random(seed)
+    doc = normalize_resume(_resume(rnd))
+    for _ in range(400):
+        ops, cur = [], copy.deepcopy(doc)
+        for _ in range(rnd.randint(1, 5)):
+            op = _op(rnd, cur)
+            ops.append(op)
+            cur = apply_json_patch(cur, [op])
+        patched = apply_json_patch(doc, ops)
+        incremental, full = normalize_patched(doc, patched, ops), normalize_resume(patched)
+        assert incremental == full, ops
+        assert content_digest(incremental) == content_digest(full)
+        doc = full if len(full["sections"]) < 12 else normalize_resume(_resume(rnd))
@@ -0,0 +1,47 @@
+"""/resume/patch saves before rendering: a render that can't happen must not look like a failed save."""
+import pytest
+from fastapi import FastAPI, HTTPException
+from fastapi.testclient import TestClient
+
+from app.routers import patch, workspace
+
+
+@pytest.fixture
+def client(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)  # the default file store lives under ./data
+    app = FastAPI()
+    app.include_router(workspace.router, prefix="/api")
+    app.include_router(patch.router, prefix="/api")
+    return TestClient(app, headers={"X-User-Id": "patch-test"})
+
+
+def _patch(client, value):
+    base = client.get("/api/workspace/get").json()
+    return client.post(
+        "/api/resume/patch",
+        json={"base": base["data"], "ops": [{"op": "replace", "path": "/fullName", "value": value}], "render": "pdf"},
+        headers={"X-Resume-Rev": str(base["rev"])},
+    )
+
+
+def test_full_queue_returns_the_saved_patch(client, monkeypatch):
+    async def full(tex):
+        raise HTTPException(503, detail={"error": "render_queue_full", "retryAfter": 2}, headers={"Retry-After": "2"})
+    monkeypatch.setattr(patch, "compile_pdf_async", full)
+    rev = client.get("/api/workspace/get").json()["rev"]
+    r = _patch(client, "Ada")
+    assert r.status_code == 200
+    body = r.json()
+    assert body["updated"]["fullName"] == "Ada" and body.get("rendered_pdf_b64") is None
+    assert body["render_error"]["status"] == 503
+    assert client.get("/api/workspace/get").json()["rev"] == rev + 1
+
+
+def test_superseded_render_returns_the_saved_patch(client, monkeypatch):
+    async def superseded(tex):
+        raise HTTPException(409, detail={"error": "render_superseded", "serverRev": 99})
+    monkeypatch.setattr(patch, "compile_pdf_async", superseded)
+    r = _patch(client, "Grace")
+    assert r.status_code == 200
+    assert r.json()["updated"]["fullName"] == "Grace"
+    assert r.json()["render_error"] == {"status": 409, "detail": {"error": "render_superseded", "serverRev": 99}}
@@ -0,0 +1,127 @@
+"""
+PostgresStore against a stub asyncpg (runs without a database): queries run on the
+event loop that owns the pool while the sync store calls wait in worker threads, so
+slow queries never stall the loop. The real-database tests are in test_postgres_store.py.
+"""
+import asyncio
+import threading
+import time
+import types
+from contextlib import asynccontextmanager
+
+import anyio
+import anyio.to_thread
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from app.routers import versions
+from app.storage import DeltaStore, PostgresStore
+from app.storage import postgres as pg_module
+
+QUERY_DELAY = 0.1
+
+
+class StubConnection:
+    """Answers every query with no rows after QUERY_DELAY, recording the thread it ran on."""
+
+    def __init__(self, threads):
+        self.threads = threads
+
+    async def _query(self):
+        self.threads.add(threading.get_ident())
+        await asyncio.sleep(QUERY_DELAY)
+
+    async def fetch(self, sql, *args):
+        await self._query()
+        return []
+
+    async def fetchrow(self, sql, *args):
+        await self._query()
+        return None
+
+    async def fetchval(self, sql, *args):
+        await self._query()
+        return None
+
+    async def execute(self, sql, *args):
+        await self._query()
+        return "OK"
+
+    async def executemany(self, sql, args):
+        await self._query()
+
+    @asynccontextmanager
+    async def transaction(self):
+        yield
+
+
+class StubPool(StubConnection):
+    @asynccontextmanager
+    async def acquire(self):
+        yield StubConnection(self.threads)
+
+    async def close(self):
+        pass
+
+
+@pytest.fixture
+def threads(monkeypatch):
+    seen = set()
+
+    async def create_pool(dsn, **kwargs):
+        return StubPool(seen)
+
+    monkeypatch.setattr(pg_module, "asyncpg", types.SimpleNamespace(create_pool=create_pool))
+    return seen
+
+
+def test_store_calls_leave_the_loop_free(threads):
+    store = PostgresStore("postgresql://stub", 1, 4)
+    gaps = []
+
+    async def heartbeat():
+        last = time.perf_counter()
+        while True:
+            await asyncio.sleep(0.005)
+            now = time.perf_counter()
+            gaps.append(now - last)
+            last = now
+
+    async def main():
+        await store.startup()
+        beat = asyncio.create_task(heartbeat())
+        t0 = time.perf_counter()
+        async with anyio.create_task_group() as tg:
+            for i in range(8):
+                tg.start_soon(anyio.to_thread.run_sync, store.list_versions, f"u{i}")
+        elapsed = time.perf_counter() - t0
+        beat.cancel()
+        with pytest.raises(RuntimeError, match="event loop thread"):
+            store.read_doc("u", "current")
+        await store.shutdown()
+        return elapsed, threading.get_ident()
+
+    elapsed, loop_thread = anyio.run(main)
+    assert threads == {loop_thread}  # every query ran on the pool's loop
+    assert elapsed < 4 * QUERY_DELAY  # the 8 calls overlapped instead of queueing on the loop
+    assert gaps and max(gaps) < QUERY_DELAY * 0.8  # the loop kept ticking while queries were pending
+
+
+def test_version_endpoint_runs_store_calls_off_the_loop(threads, monkeypatch):
+    store = DeltaStore(PostgresStore("postgresql://stub", 1, 4), 10)
+    monkeypatch.setattr(versions, "store", store)
+
+    @asynccontextmanager
+    async def lifespan(_app):
+        await store.startup()
+        yield
+        await store.shutdown()
+
+    app = FastAPI(lifespan=lifespan)
+    app.include_router(versions.router, prefix="/api")
+    with TestClient(app, headers={"X-User-Id": "stub-user"}) as client:
+        r = client.post("/api/versions", json={"name": "cv", "content": {"fullName": "Ada"}})
+        assert r.status_code == 200, r.text
+        assert client.get("/api/versions/list").status_code == 200
+    assert threads
@@ -0,0 +1,56 @@
+"""Pre-render compiles go through compile_queue at background priority, on the app's loop."""
+import asyncio
+import threading
+
+import anyio
+import pytest
+from fastapi import HTTPException
+
+from app import prerender
+from app.compile_queue import CompileQueue
+from app.prerender import Prerenderer
+
+
+def test_background_slot_never_waits():
+    async def main():
+        q = CompileQueue(1, 4, 1, 1)
+        async with q.slot():
+            with pytest.raises(HTTPException) as e:
+                async with q.slot(background=True):
+                    pass
+            assert e.value.status_code == 503
+        async with q.slot(background=True):
+            assert q.stats()["background"] == 1
+            with pytest.raises(HTTPException):
+                async with q.slot(background=True):
+                    pass
+        stats = q.stats()
+        assert (stats["background_admitted"], stats["background_rejected"], stats["rejected"]) == (1, 2, 0)
+    anyio.run(main)
+
+
+def test_prerender_compiles_on_the_loop_in_a_background_slot(monkeypatch):
+    calls = []
+
+    async def fake_compile(tex, background=False):
+        calls.append((tex, background, threading.get_ident()))
+        return b"%PDF"
+
+    monkeypatch.setattr(prerender, "compile_pdf_async", fake_compile)
+    monkeypatch.setattr(prerender, "render_tex", lambda form: f"tex:{form['fullName']}")
+    p = Prerenderer(True, 1, 4)
+    assert not p.schedule("u", 1, {"fullName": "A"})  # no loop recorded yet
+
+    async def main():
+        await p.startup()
+        assert p.schedule("u", 2, {"fullName": "B"})
+        for _ in range(200):
+            if p.stats()["compiled"]:
+                break
+            await asyncio.sleep(0.01)
+        await p.shutdown()
+
+    loop_thread = threading.get_ident()
+    anyio.run(main)
+    assert calls == [("tex:B", True, loop_thread)]
+    assert p.stats()["compiled"] == 1 and p.stats()["failed"] == 0
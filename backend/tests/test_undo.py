@@ -0,0 +1,67 @@
+"""Undo/redo stacks kept incrementally must match a cold replay of the op log."""
+import random
+
+import pytest
+from fastapi import HTTPException
+
+from app import undo
+from app.routers import workspace
+from app.undo import UndoHistory
+
+
+@pytest.fixture
+def history(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)  # the default file store lives under ./data
+    h = UndoHistory(depth=5, max_bytes=10_000, reach=12)
+    monkeypatch.setattr(undo, "undo_history", h)
+    monkeypatch.setattr(workspace, "undo_history", h)
+    workspace._STATE_CACHE.clear()
+    return h
+
+
+def _revs(stacks):
+    return [[e["rev"] for e in s] for s in stacks]
+
+
+def test_incremental_stacks_match_a_replay(history):
+    rng = random.Random(7)
+    uid = "undo-test"
+    workspace._write_current(uid, {"fullName": "start"})
+    for i in range(80):
+        action = rng.choice(["edit", "edit", "undo", "redo"])
+        if action == "edit":
+            workspace._write_current(uid, {"fullName": f"edit {i}", "summary": "x" * rng.randint(0, 3000)})
+        else:
+            try:
+                workspace._step_history(uid, action)
+            except HTTPException as e:
+                assert e.status_code == 409
+        rev = int(workspace._read_current(uid)["rev"])
+        cold = UndoHistory(history.depth, history.max_bytes, history.reach)
+        assert _revs(history.stacks(uid, rev)) == _revs(cold.stacks(uid, rev))
+
+
+def test_byte_budget_drops_the_oldest_edits(history):
+    uid = "undo-bytes"
+    for i in range(4):
+        workspace._write_current(uid, {"fullName": f"v{i}", "summary": str(i) * 3000})
+    undo_stack, _ = history.stacks(uid, int(workspace._read_current(uid)["rev"]))
+    # Every edit after the first swaps a 3000-char summary in both its ops and its
+    # inverse (~6 KB), so only the newest fits in 10 KB
+    assert [e["rev"] for e in undo_stack] == [4]
+    assert history._cache[uid].total <= history.max_bytes
+
+
+def test_undo_and_redo_do_not_replay_the_log(history, monkeypatch):
+    uid = "undo-warm"
+    for i in range(3):
+        workspace._write_current(uid, {"fullName": f"v{i}"})
+    history.stacks(uid, int(workspace._read_current(uid)["rev"]))
+
+    def no_replay(*args, **kwargs):
+        raise AssertionError("op log replayed")
+    monkeypatch.setattr(undo.store, "read_log", no_replay)
+    assert workspace._step_history(uid, "undo")["undo"] == 2
+    assert workspace._step_history(uid, "redo")["redo"] == 0
+    workspace._write_current(uid, {"fullName": "v3"})
+    assert _revs(history.stacks(uid, int(workspace._read_current(uid)["rev"]))) == [[1, 2, 3, 6], []]
@@ -0,0 +1,51 @@
+"""POST /versions/batch-load: only the caller's indexed versions are read, and bad items don't end the batch."""
+import json
+
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from app.routers import versions
+from app.storage import DeltaStore, FileStore
+
+
+@pytest.fixture
+def client(tmp_path, monkeypatch):
+    store = DeltaStore(FileStore(tmp_path / "versions"), 10)
+    monkeypatch.setattr(versions, "store", store)
+    app = FastAPI()
+    app.include_router(versions.router, prefix="/api")
+    c = TestClient(app)
+    c.store, c.root = store, tmp_path / "versions"
+    return c
+
+
+def _save(client, uid, name, doc):
+    r = client.post("/api/versions/save", params={"name": name}, json=doc, headers={"X-User-Id": uid})
+    return r.json()["id"]
+
+
+def test_ids_cannot_reach_other_users_or_documents(client):
+    _save(client, "victim", "secret", {"fullName": "Victim"})
+    client.store.write_docs("victim", {"current": {"fullName": "Victim workspace"}})
+    client.store.write_docs("attacker", {"current": {"fullName": "Own workspace"}})
+    ids = ["../victim/current", "..\\victim\\current", "current", "index", "versions.delta"]
+    r = client.post("/api/versions/batch-load", json={"ids": ids}, headers={"X-User-Id": "attacker"})
+    assert r.status_code == 200
+    items = r.json()["versions"]
+    assert [i["id"] for i in items] == ids
+    assert all("data" not in i for i in items)
+    assert [i["error"] for i in items[:2]] == ["invalid_id", "invalid_id"]
+
+
+def test_unreadable_version_gets_an_error_item(client):
+    uid = "u"
+    good = _save(client, uid, "good", {"fullName": "A"})
+    bad = _save(client, uid, "bad", {"fullName": "B"})
+    ref = json.loads((client.root / uid / f"{bad}.json").read_text())["_blob"]
+    (client.root / uid / f"blob.{ref}.json").unlink()
+    client.store._cache.clear()
+    r = client.post("/api/versions/batch-load", params={"format": "ndjson"}, json={"ids": "all"}, headers={"X-User-Id": uid})
+    items = [json.loads(line) for line in r.text.splitlines()]
+    assert items[0] == {"id": bad, "error": "unreadable"}
+    assert items[1]["id"] == good and items[1]["data"]["fullName"] == "A"
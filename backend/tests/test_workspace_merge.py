@@ -0,0 +1,67 @@
+"""A stale full save (x_resume_rev header) is merged onto newer edits by diffing and rebasing it."""
+import copy
+
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from app.routers import patch, workspace
+
+
+@pytest.fixture
+def client(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)  # the default file store lives under ./data
+    app = FastAPI()
+    app.include_router(workspace.router, prefix="/api")
+    app.include_router(patch.router, prefix="/api")
+    return TestClient(app, headers={"X-User-Id": "merge-test"})
+
+
+def _section(name):
+    return {"type": "experience", "title": name, "items": [{"company": name, "bullets": [f"{name} bullet"]}]}
+
+
+def test_stale_save_inserting_a_section_keeps_a_concurrent_edit_in_place(client):
+    base = {"fullName": "Ada", "sections": [_section("A"), _section("B")]}
+    assert client.post("/api/workspace/save", json=base).status_code == 200
+    base = client.get("/api/workspace/get").json()
+    base_rev = base["rev"]
+
+    # Tab 1 edits a bullet of section A
+    r = client.post(
+        "/api/resume/patch",
+        json={"base": base["data"], "ops": [{"op": "replace", "path": "/sections/0/items/0/bullets/0", "value": "tab 1 edit"}]},
+        headers={"x_resume_rev": str(base_rev)},
+    )
+    assert r.status_code == 200, r.text
+
+    # Tab 2, still at base_rev, inserts X in front and renames B
+    stale = copy.deepcopy(base["data"])
+    stale["sections"].insert(0, _section("X"))
+    stale["sections"][2]["title"] = "B2"
+    r = client.post("/api/workspace/save", json=stale, headers={"x_resume_rev": str(base_rev)})
+    assert r.status_code == 200, r.text
+
+    sections = client.get("/api/workspace/get").json()["data"]["sections"]
+    assert [s["title"] for s in sections] == ["X", "A", "B2"]
+    assert [s["items"][0]["bullets"] for s in sections] == [["X bullet"], ["tab 1 edit"], ["B bullet"]]
+
+
+def test_stale_save_removing_an_edited_section_conflicts(client):
+    base = {"fullName": "Ada", "sections": [_section("A"), _section("B")]}
+    assert client.post("/api/workspace/save", json=base).status_code == 200
+    base = client.get("/api/workspace/get").json()
+
+    r = client.post(
+        "/api/resume/patch",
+        json={"base": base["data"], "ops": [{"op": "replace", "path": "/sections/0/items/0/bullets/0", "value": "tab 1 edit"}]},
+        headers={"x_resume_rev": str(base["rev"])},
+    )
+    assert r.status_code == 200, r.text
+
+    # Tab 2 replaces A with two new sections: A's edit must not land on either of them
+    stale = copy.deepcopy(base["data"])
+    stale["sections"][0:1] = [_section("X"), _section("Y")]
+    r = client.post("/api/workspace/save", json=stale, headers={"x_resume_rev": str(base["rev"])})
+    assert r.status_code == 409
+    assert r.json()["detail"]["error"] == "rev_conflict"
@@ -0,0 +1,43 @@
+\set ON_ERROR_STOP on
+\connect tellermade
+
+-- Versions and workspace state for STORAGE_BACKEND=postgres (backend/app/storage/postgres.py).
+-- Runs on first init of the data volume; for an existing database apply it by hand:
+--   psql -U postgres -f db/init/30_versions.sql
+
+-- Version index rows ({"id","name","created_at",...}); seq orders a user's list (higher = newer)
+CREATE TABLE IF NOT EXISTS versions (
+  uid  TEXT   NOT NULL,
+  vid  TEXT   NOT NULL,
+  seq  BIGINT NOT NULL,
+  meta JSONB  NOT NULL,
+  PRIMARY KEY (uid, vid)
+);
+CREATE INDEX IF NOT EXISTS versions_by_seq ON versions (uid, seq DESC);
+
+-- Version documents (apart from the index so listing never reads them)
+CREATE TABLE IF NOT EXISTS version_contents (
+  uid  TEXT  NOT NULL,
+  vid  TEXT  NOT NULL,
+  body JSONB NOT NULL,
+  PRIMARY KEY (uid, vid)
+);
+
+-- Workspace documents: "current" (snapshot), "current.meta", "undo"; stamp changes on every write
+CREATE TABLE IF NOT EXISTS workspace_docs (
+  uid   TEXT   NOT NULL,
+  name  TEXT   NOT NULL,
+  stamp BIGINT NOT NULL,
+  body  JSONB  NOT NULL,
+  PRIMARY KEY (uid, name)
+);
+
+-- Workspace op log: {"rev","updatedAt","ops","inv"} per revision
+CREATE TABLE IF NOT EXISTS workspace_oplog (
+  uid   TEXT   NOT NULL,
+  rev   BIGINT NOT NULL,
+  entry JSONB  NOT NULL,
+  PRIMARY KEY (uid, rev)
+);
+
+GRANT SELECT, INSERT, UPDATE, DELETE ON versions, version_contents, workspace_docs, workspace_oplog TO tm_app;